@@ -0,0 +1,9 @@
+"""
+isaacsim-links 性能测试
+
+- tree: 按参数生成合成的 Isaac Sim site-packages 目录树
+- run: 在合成目录树上计时各个场景，结果以 JSON 输出，便于跨提交对比
+- bench_discovery: 旧的递归遍历与 scandir 扫描引擎的系统调用对比
+
+用法: python -m benchmarks --preset isaacsim-4.5 --output results.json
+"""
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+包发现性能测试：对比旧的递归 Path 遍历与基于 os.scandir 的扫描引擎
+
+在临时目录中生成约 10k 个目录的合成扩展树，统计两种实现的文件系统调用次数与耗时。
+
+用法: python benchmarks/bench_discovery.py [--dirs 10000] [--repeat 3]
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from isaacsim_links.core import find_all_init_paths  # noqa: E402
+from isaacsim_links.instrument import Instrumentation  # noqa: E402
+
+# 需要计数的 os 层调用（pathlib 的 exists/is_dir/is_file/iterdir 都经由这些函数，
+# Python 3.10 上经由 pathlib._NormalAccessor，由 Instrumentation 一并统计）
+COUNTED_CALLS = ["stat", "lstat", "listdir", "scandir"]
+
+
+def legacy_find_all_init_paths(base_dir: Path, module_namespace: list[str]) -> list:
+    """旧版本的递归实现，仅作为基准对照"""
+    found_paths = []
+
+    def collect_init_files(directory: Path):
+        init_file = directory / "__init__.py"
+        if init_file.exists() and init_file.is_file():
+            rel_path = directory.relative_to(namespace_dir)
+            found_paths.append((directory, rel_path, namespace_dir.name))
+        else:
+            for item in directory.iterdir():
+                if item.is_dir():
+                    collect_init_files(item)
+
+    for ns in module_namespace:
+        namespace_dir = base_dir / ns.rstrip(".")
+        if not namespace_dir.exists() or not namespace_dir.is_dir():
+            continue
+        collect_init_files(namespace_dir)
+    return found_paths
+
+
+def build_tree(root: Path, total_dirs: int, fanout: int = 10, depth: int = 3):
+    """生成合成扩展树：每个扩展的命名空间下是 fanout^depth 的目录树，叶子目录为包"""
+    per_ext = sum(fanout**level for level in range(depth + 1))
+    ext_count = max(1, total_dirs // per_ext)
+    ext_dirs = []
+    for e in range(ext_count):
+        ext_dir = root / f"isaacsim.synthetic.ext{e}"
+        ext_dirs.append(ext_dir)
+        level_dirs = [ext_dir / "isaacsim"]
+        level_dirs[0].mkdir(parents=True)
+        for level in range(depth):
+            next_dirs = []
+            for parent in level_dirs:
+                for i in range(fanout):
+                    child = parent / f"d{level}_{i}"
+                    child.mkdir()
+                    next_dirs.append(child)
+            level_dirs = next_dirs
+        for leaf in level_dirs:
+            (leaf / "__init__.py").touch()
+    return ext_dirs, ext_count * per_ext
+
+
+def count_calls(func, *args):
+    """临时包装文件系统函数，统计调用次数"""
+    collector = Instrumentation()
+    with collector.activate():
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+    totals = collector.total_calls()
+    counts = {name: totals.get(name, 0) for name in COUNTED_CALLS}
+    return result, counts, elapsed
+
+
+def run(ext_dirs, finder, repeat):
+    best = None
+    for _ in range(repeat):
+
+        def scan():
+            found = []
+            for ext_dir in ext_dirs:
+                found.extend(finder(ext_dir, ["isaacsim."]))
+            return found
+
+        found, counts, elapsed = count_calls(scan)
+        if best is None or elapsed < best[2]:
+            best = (found, counts, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="包发现引擎的系统调用对比")
+    parser.add_argument("--dirs", type=int, default=10000, help="合成目录数量")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最快一次")
+    args = parser.parse_args()
+
+    import logging
+
+    logging.getLogger("isaacsim_links").setLevel(logging.WARNING)
+
+    root = Path(tempfile.mkdtemp(prefix="isaacsim_links_bench_"))
+    try:
+        ext_dirs, dir_count = build_tree(root, args.dirs)
+        print(f"合成目录树: {len(ext_dirs)} 个扩展, {dir_count} 个目录")
+
+        legacy = run(ext_dirs, legacy_find_all_init_paths, args.repeat)
+        current = run(ext_dirs, find_all_init_paths, args.repeat)
+
+        assert sorted(legacy[0]) == sorted(current[0]), "两种实现的结果不一致"
+
+        for label, (found, counts, elapsed) in (
+            ("legacy (Path 递归)", legacy),
+            ("scandir (迭代)", current),
+        ):
+            total = sum(counts.values())
+            detail = ", ".join(f"{k}={v}" for k, v in counts.items())
+            print(
+                f"{label:<20} 包={len(found):>6}  调用={total:>7} ({detail})  "
+                f"耗时={elapsed * 1000:.1f}ms"
+            )
+        ratio = sum(legacy[1].values()) / max(1, sum(current[1].values()))
+        print(f"系统调用减少倍数: {ratio:.1f}x")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
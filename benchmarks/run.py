@@ -0,0 +1,175 @@
+"""
+在合成目录树上计时 isaacsim-links 的各个场景，结果以 JSON 输出
+
+每轮按顺序执行以下场景，前一个场景的结果就是后一个场景的初始状态:
+
+- discover: 不使用扫描索引，发现所有扩展中的子包
+- cold_create: 没有记录和扫描索引时创建全部链接
+- warm_create: 没有任何变化时再次增量创建
+- full_create: 忽略扫描索引重新规划全部链接 (链接均已存在且正确)
+- status: 检查记录中的所有链接
+- remove: 删除全部链接
+
+用法:
+    python -m benchmarks --preset isaacsim-4.5 --repeat 3 --output results.json
+    python -m benchmarks --extensions 500 --depth 3 --fanout 4 --jobs 8
+"""
+
+import argparse
+import json
+import logging
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import fields
+from pathlib import Path
+
+from isaacsim_links import core
+
+from benchmarks.tree import PRESETS, TreeSpec, generate_tree
+
+SCENARIOS = (
+    "discover",
+    "cold_create",
+    "warm_create",
+    "full_create",
+    "status",
+    "remove",
+)
+
+
+def _scenario_calls(jobs: int) -> dict:
+    """场景名 -> 无参函数，返回值会被记录到结果中 (须可 JSON 序列化)"""
+
+    def discover():
+        discovered = core.discover_extensions(jobs=jobs, index=core.ScanIndex())
+        return sum(len(scan.packages) for scan in discovered)
+
+    def status():
+        result = core.check_links(jobs=jobs if jobs > 1 else None)
+        return {"ok": result.ok, "drifted": result.drifted}
+
+    return {
+        "discover": discover,
+        "cold_create": lambda: core.create_links(jobs=jobs),
+        "warm_create": lambda: core.create_links(jobs=jobs),
+        "full_create": lambda: core.create_links(jobs=jobs, incremental=False),
+        "status": status,
+        "remove": lambda: core.remove_links(jobs=jobs),
+    }
+
+
+def run_benchmarks(site_packages, jobs: int = 1, repeat: int = 3) -> dict:
+    """在已生成的目录树上执行 repeat 轮全部场景
+
+    Returns:
+        {场景名: {"best": 秒, "median": 秒, "runs": [秒, ...], "result": 最后一轮的返回值}}
+    """
+    calls = _scenario_calls(jobs)
+    results = {name: {"runs": []} for name in SCENARIOS}
+    with core.site_packages_context(site_packages):
+        for _ in range(repeat):
+            for name in SCENARIOS:
+                start = time.perf_counter()
+                value = calls[name]()
+                results[name]["runs"].append(time.perf_counter() - start)
+                results[name]["result"] = value
+    for entry in results.values():
+        entry["best"] = min(entry["runs"])
+        entry["median"] = statistics.median(entry["runs"])
+    return results
+
+
+def _git_commit() -> "str | None":
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="isaacsim-links 性能测试")
+    parser.add_argument(
+        "--preset",
+        choices=sorted(PRESETS),
+        default="isaacsim-4.5",
+        help="目录树规模预设 (默认: isaacsim-4.5)",
+    )
+    for spec_field in fields(TreeSpec):
+        parser.add_argument(
+            f"--{spec_field.name.replace('_', '-')}",
+            type=int,
+            help=f"覆盖预设中的 {spec_field.name}",
+        )
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行线程数")
+    parser.add_argument("--repeat", type=int, default=3, help="重复轮数")
+    parser.add_argument(
+        "--output", metavar="FILE", help="结果 JSON 文件 (默认输出到标准输出)"
+    )
+    parser.add_argument(
+        "--keep",
+        metavar="DIR",
+        help="在空目录 DIR 中生成目录树并在结束后保留，而不是使用临时目录",
+    )
+    args = parser.parse_args(argv)
+
+    spec = TreeSpec(**PRESETS[args.preset].to_dict())
+    for spec_field in fields(TreeSpec):
+        value = getattr(args, spec_field.name)
+        if value is not None:
+            setattr(spec, spec_field.name, value)
+
+    logging.getLogger("isaacsim_links").setLevel(logging.WARNING)
+
+    if args.keep:
+        root = Path(args.keep)
+    else:
+        root = Path(tempfile.mkdtemp(prefix="isaacsim_links_bench_"))
+    try:
+        site_packages = root / "site-packages"
+        start = time.perf_counter()
+        tree_stats = generate_tree(site_packages, spec)
+        print(
+            f"合成目录树: {tree_stats.extension_dirs} 个扩展目录, "
+            f"{tree_stats.packages} 个包, {tree_stats.directories} 个目录 "
+            f"({time.perf_counter() - start:.1f}s)",
+            file=sys.stderr,
+        )
+        scenarios = run_benchmarks(site_packages, jobs=args.jobs, repeat=args.repeat)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "preset": args.preset,
+        "spec": spec.to_dict(),
+        "tree": tree_stats.to_dict(),
+        "jobs": args.jobs,
+        "repeat": args.repeat,
+        "scenarios": scenarios,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+    for name, entry in scenarios.items():
+        print(f"{name:<12} best={entry['best'] * 1000:9.1f}ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
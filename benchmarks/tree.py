@@ -0,0 +1,154 @@
+"""
+合成 Isaac Sim 目录树生成器
+
+生成的目录结构与真实安装一致，可以直接通过 core.site_packages_context 使用:
+
+    site-packages/
+        isaacsim/exts/<扩展>/...          isaacsim.* 扩展
+        isaacsim/extsPhysics/<扩展>/...   omni.* 物理扩展
+        isaacsim/extscache/<扩展>-<版本>/... 同一扩展的多个版本
+        omni/extscore/<扩展>/...          omni.* 核心扩展
+
+每个扩展包含 config/extension.toml、一个入口包 (其下按 depth 与 fanout
+嵌套子包)，以及若干不含 __init__.py 的资源目录 (扩展根目录与命名空间目录中各有一部分)。
+"""
+
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+# 扩展名中的分组，使不同扩展共享中间命名空间目录 (如 isaacsim/core/)
+_GROUPS = ("core", "sensors", "robot", "asset", "replicator", "gui", "util", "ros2")
+
+# 资源目录名，前几个会被默认的遍历规则剪枝，最后一个不会
+_ASSET_DIR_NAMES = ("data", "docs", "icons", "bin", "tests", "materials")
+
+
+@dataclass
+class TreeSpec:
+    """合成目录树的参数"""
+
+    extensions: int = 150  # isaacsim/exts 中的扩展数
+    physics_extensions: int = 20  # isaacsim/extsPhysics 中的扩展数
+    core_extensions: int = 60  # omni/extscore 中的扩展数
+    cache_extensions: int = 80  # isaacsim/extscache 中的不同扩展数
+    cache_versions: int = 2  # extscache 中每个扩展的版本数
+    depth: int = 2  # 入口包下子包的嵌套层数
+    fanout: int = 3  # 每层的子包数
+    asset_dirs: int = 3  # 每个扩展中的资源目录数
+    asset_files: int = 5  # 每个资源目录中的文件数
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+PRESETS = {
+    "small": TreeSpec(
+        extensions=20,
+        physics_extensions=4,
+        core_extensions=8,
+        cache_extensions=8,
+        depth=1,
+        fanout=2,
+        asset_dirs=2,
+        asset_files=2,
+    ),
+    # 接近 Isaac Sim 4.5 pip 安装的规模
+    "isaacsim-4.5": TreeSpec(),
+    "large": TreeSpec(
+        extensions=600,
+        physics_extensions=80,
+        core_extensions=240,
+        cache_extensions=320,
+        cache_versions=3,
+        depth=3,
+        fanout=3,
+        asset_dirs=4,
+        asset_files=10,
+    ),
+}
+
+
+@dataclass
+class TreeStats:
+    """生成结果的统计"""
+
+    extension_dirs: int = 0  # 扩展目录数 (extscache 中每个版本各算一个)
+    packages: int = 0  # 含 __init__.py 的目录数
+    directories: int = 0  # 目录总数
+    files: int = 0  # 文件总数
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _make_package(pkg_dir: Path, depth: int, fanout: int, stats: TreeStats):
+    """创建包及其 depth 层子包"""
+    pkg_dir.mkdir(parents=True)
+    (pkg_dir / "__init__.py").write_text("")
+    (pkg_dir / "module.py").write_text("VALUE = 1\n")
+    stats.packages += 1
+    if depth > 0:
+        for i in range(fanout):
+            _make_package(pkg_dir / f"sub{i}", depth - 1, fanout, stats)
+
+
+def _make_extension(ext_dir: Path, module: str, spec: TreeSpec, stats: TreeStats):
+    """创建一个扩展目录，module 为入口包的完整模块名"""
+    parts = module.split(".")
+    (ext_dir / "config").mkdir(parents=True)
+    (ext_dir / "config" / "extension.toml").write_text(
+        f'[package]\nversion = "1.0.0"\n\n[[python.module]]\nname = "{module}"\n'
+    )
+    _make_package(ext_dir.joinpath(*parts), spec.depth, spec.fanout, stats)
+
+    # 资源目录：一半位于扩展根目录，一半位于命名空间目录中与入口包相邻
+    ns_dir = ext_dir.joinpath(*parts[:-1])
+    for i in range(spec.asset_dirs):
+        name = _ASSET_DIR_NAMES[i % len(_ASSET_DIR_NAMES)]
+        asset_dir = (ext_dir if i % 2 == 0 else ns_dir) / name / f"set{i}"
+        asset_dir.mkdir(parents=True)
+        for j in range(spec.asset_files):
+            (asset_dir / f"asset{j}.usd").write_text("#usda 1.0\n")
+    stats.extension_dirs += 1
+
+
+def generate_tree(site_packages, spec: TreeSpec) -> TreeStats:
+    """在 site_packages 下生成合成目录树
+
+    Args:
+        site_packages: 目标目录 (应为空或不存在)
+        spec: 目录树参数
+
+    Returns:
+        TreeStats
+    """
+    site_packages = Path(site_packages)
+    stats = TreeStats()
+    isaacsim_dir = site_packages / "isaacsim"
+    omni_dir = site_packages / "omni"
+    for directory in (isaacsim_dir, omni_dir, site_packages / "carb"):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def group(i):
+        return _GROUPS[i % len(_GROUPS)]
+
+    for i in range(spec.extensions):
+        module = f"isaacsim.{group(i)}.ext{i}"
+        _make_extension(isaacsim_dir / "exts" / module, module, spec, stats)
+    for i in range(spec.physics_extensions):
+        module = f"omni.physx.ext{i}"
+        _make_extension(isaacsim_dir / "extsPhysics" / module, module, spec, stats)
+    for i in range(spec.core_extensions):
+        module = f"omni.kit.{group(i)}{i}"
+        _make_extension(omni_dir / "extscore" / module, module, spec, stats)
+    for i in range(spec.cache_extensions):
+        module = f"isaacsim.{group(i)}.cached{i}"
+        for version in range(spec.cache_versions):
+            ext_dir = isaacsim_dir / "extscache" / f"{module}-1.{version}.0"
+            _make_extension(ext_dir, module, spec, stats)
+
+    for _, dirnames, filenames in os.walk(site_packages):
+        stats.directories += len(dirnames)
+        stats.files += len(filenames)
+    return stats
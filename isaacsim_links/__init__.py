@@ -9,9 +9,20 @@ isaacsim_links - 自动创建链接以支持 Isaac Sim 和 Omni 扩展的 IDE 
       也可以手动运行: isaacsim-links --create 或 isaacsim-links --remove
 """
 
+from typing import TYPE_CHECKING
+
 __version__ = "0.1.1"
 
-# 导出核心 API
-from .core import create_links, remove_links, get_ext_configs, _update_config_file
+# 导出核心 API；core 模块在首次访问时才导入，导入本包不做任何文件系统操作
+__all__ = ["create_links", "remove_links", "get_ext_configs", "_update_config_file"]
+
+if TYPE_CHECKING:
+    from .core import create_links, remove_links, get_ext_configs, _update_config_file
+
+
+def __getattr__(name):
+    if name in __all__:
+        from . import core
 
-_update_config_file()
+        return getattr(core, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,9 +4,13 @@ Isaac Sim 链接管理命令行工具
 """
 
 import argparse
+import contextlib
+import json
+import logging
 import sys
-from isaacsim_links import core
-from isaacsim_links.logger import logger
+from isaacsim_links import core, watch
+from isaacsim_links.instrument import Instrumentation
+from isaacsim_links.logger import configure_logging, logger, stop_logging
 
 
 def main():
@@ -17,23 +21,285 @@ def main():
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("--create", action="store_true", help="创建符号链接")
     group.add_argument("--remove", action="store_true", help="删除之前创建的符号链接")
+    group.add_argument(
+        "--plan", action="store_true", help="只计算链接计划并以 JSON 输出，不修改文件"
+    )
+    group.add_argument(
+        "--watch",
+        action="store_true",
+        help="监视扩展目录，有扩展新增、删除或变化时增量更新链接",
+    )
+    group.add_argument(
+        "--repair",
+        action="store_true",
+        help="只重新创建缺失、悬空或指向错误的链接并删除过期链接，正确的链接保持不变",
+    )
+    group.add_argument(
+        "--status",
+        action="store_true",
+        help="检查记录中的链接是否仍然有效，存在缺失、悬空、被改指向或被占用的链接时返回非零",
+    )
+    group.add_argument(
+        "--build-index",
+        action="store_true",
+        help="生成供 isaacsim_links.finder 按需导入使用的模块索引，不修改 site-packages",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="并行扫描扩展目录或删除链接的线程数 (默认: 1)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="忽略扫描索引，完整重新扫描所有扩展目录",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=core.LINK_MODES,
+        default="new",
+        help="链接模式: new 为每个子包创建符号链接，old 为旧的按扩展链接方式，"
+        "pth 只写入一个 .pth 文件而不创建符号链接 (默认: new)",
+    )
+    parser.add_argument(
+        "--versions",
+        choices=core.VERSION_POLICIES,
+        help="同一扩展存在多个版本时扫描哪个版本，覆盖扩展配置中的设置 "
+        "(默认: extscache 只扫描最高版本)",
+    )
+    parser.add_argument(
+        "--discovery",
+        choices=core.DISCOVERY_MODES,
+        help="发现子包的方式: walk 遍历扩展目录，manifest 读取扩展清单 "
+        "config/extension.toml (没有清单的扩展回退为遍历) (默认: walk)",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="--watch 时最后一个事件之后等待多少秒再更新链接 (默认: 2)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=5.0,
+        metavar="SECONDS",
+        help="--watch 在 inotify 不可用时轮询扩展目录的间隔 (默认: 5)",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="--create/--remove/--repair 结束后按阶段输出系统调用次数与耗时，"
+        "并列出扫描最慢的扩展 (输出到标准错误)",
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="只输出警告和错误",
+    )
+    verbosity.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="输出每个目录和链接的详细信息 (默认只输出摘要)",
+    )
+    parser.add_argument(
+        "--site-packages",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="要处理的 site-packages 目录，可重复指定以批量处理多个环境 (默认: 当前环境)",
+    )
+    parser.add_argument(
+        "--envs-file",
+        metavar="FILE",
+        help="环境列表文件，每行一个 site-packages 路径，支持 # 注释",
+    )
 
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs 必须大于等于 1")
+    if args.stats and not (args.create or args.remove or args.repair):
+        parser.error("--stats 只能与 --create、--remove 或 --repair 一起使用")
+    instrumentation = Instrumentation() if args.stats else None
+    if args.quiet:
+        level = logging.WARNING
+    elif args.verbose:
+        level = logging.DEBUG
+    else:
+        level = logging.INFO
+    configure_logging(level, use_queue=True)
 
     try:
-        if args.create:
-            core.create_links()
-        elif args.remove:
-            core.remove_links()
+        site_packages_dirs = list(args.site_packages)
+        if args.envs_file:
+            site_packages_dirs.extend(core.read_envs_file(args.envs_file))
+        if args.watch:
+            if len(site_packages_dirs) > 1:
+                parser.error("--watch 一次只能监视一个环境")
+            with contextlib.ExitStack() as stack:
+                if site_packages_dirs:
+                    stack.enter_context(
+                        core.site_packages_context(site_packages_dirs[0])
+                    )
+                watch.watch(
+                    debounce=args.debounce,
+                    poll_interval=args.poll_interval,
+                    jobs=args.jobs,
+                    mode=args.mode,
+                    version_policy=args.versions,
+                    discovery=args.discovery,
+                )
+            return 0
+        if site_packages_dirs and not args.stats:
+            return _run_environments(args, site_packages_dirs)
+        if len(site_packages_dirs) > 1:
+            parser.error("--stats 一次只能统计一个环境")
+        with contextlib.ExitStack() as stack:
+            if site_packages_dirs:
+                stack.enter_context(core.site_packages_context(site_packages_dirs[0]))
+            status = _run_single(args, instrumentation)
+        if instrumentation is not None:
+            stop_logging()  # 先写出队列中的日志，避免与报告交错
+            print(instrumentation.format_report(), file=sys.stderr)
+        return status
     except Exception as e:
         import traceback
 
         logger.error(f"发生错误: {e.__class__.__name__} {e}")
+        stop_logging()
         traceback.print_exc()
         return 1
+    finally:
+        stop_logging()
+
 
+def _run_single(args, instrumentation=None) -> int:
+    """在单个环境中执行所选的操作，返回退出码"""
+    if args.create:
+        core.create_links(
+            jobs=args.jobs,
+            incremental=not args.full,
+            mode=args.mode,
+            version_policy=args.versions,
+            discovery=args.discovery,
+            instrumentation=instrumentation,
+        )
+    elif args.remove:
+        core.remove_links(jobs=args.jobs, instrumentation=instrumentation)
+    elif args.plan:
+        plan = core.plan_links(
+            jobs=args.jobs,
+            incremental=not args.full,
+            version_policy=args.versions,
+            discovery=args.discovery,
+        )
+        print(json.dumps(plan.to_dict(), ensure_ascii=False, indent=2))
+    elif args.repair:
+        core.repair_links(
+            jobs=args.jobs,
+            version_policy=args.versions,
+            discovery=args.discovery,
+            instrumentation=instrumentation,
+        )
+    elif args.status:
+        status = core.check_links(jobs=args.jobs if args.jobs > 1 else None)
+        _print_status(status)
+        return 1 if status.drifted else 0
+    elif args.build_index:
+        core.build_module_index(
+            jobs=args.jobs,
+            version_policy=args.versions,
+            discovery=args.discovery,
+        )
     return 0
 
 
+def _run_environments(args, site_packages_dirs) -> int:
+    """在多个环境中执行 --create/--remove/--repair/--plan/--status/--build-index，
+    任一环境失败时返回 1"""
+    if args.create:
+        results = core.link_environments(
+            site_packages_dirs,
+            jobs=args.jobs,
+            incremental=not args.full,
+            mode=args.mode,
+            version_policy=args.versions,
+            discovery=args.discovery,
+        )
+    elif args.remove:
+        results = core.for_each_environment(
+            site_packages_dirs, core.remove_links, jobs=args.jobs
+        )
+    elif args.repair:
+        results = core.for_each_environment(
+            site_packages_dirs,
+            core.repair_links,
+            jobs=args.jobs,
+            discovery_cache=core.DiscoveryCache(),
+            version_policy=args.versions,
+            discovery=args.discovery,
+        )
+    elif args.status:
+        results = core.for_each_environment(
+            site_packages_dirs,
+            core.check_links,
+            jobs=args.jobs if args.jobs > 1 else None,
+        )
+        for env, status in results.items():
+            print(f"[{env}]")
+            if status is not None:
+                _print_status(status)
+        if any(status is not None and status.drifted for status in results.values()):
+            return 1
+    elif args.build_index:
+        results = core.for_each_environment(
+            site_packages_dirs,
+            core.build_module_index,
+            jobs=args.jobs,
+            discovery_cache=core.DiscoveryCache(),
+            version_policy=args.versions,
+            discovery=args.discovery,
+        )
+    else:
+        results = core.for_each_environment(
+            site_packages_dirs,
+            core.plan_links,
+            jobs=args.jobs,
+            incremental=not args.full,
+            discovery_cache=core.DiscoveryCache(),
+            version_policy=args.versions,
+            discovery=args.discovery,
+        )
+        output = {
+            env: plan.to_dict() if plan is not None else None
+            for env, plan in results.items()
+        }
+        print(json.dumps(output, ensure_ascii=False, indent=2))
+    return 1 if any(result is None for result in results.values()) else 0
+
+
+def _print_status(status):
+    """输出 --status 的检查结果"""
+    for link in sorted(status.missing):
+        print(f"missing     {link}")
+    for link in sorted(status.dangling):
+        print(f"dangling    {link}")
+    for link, expected, actual in sorted(status.retargeted):
+        print(f"retargeted  {link} -> {actual} (记录: {expected})")
+    for link in sorted(status.foreign):
+        print(f"foreign     {link}")
+    print(
+        f"正常 {status.ok}，缺失 {len(status.missing)}，悬空 {len(status.dangling)}，"
+        f"改指向 {len(status.retargeted)}，被占用 {len(status.foreign)}"
+    )
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -2,38 +2,135 @@
 Isaac Sim 链接管理核心功能
 """
 
+import contextlib
+import contextvars
+import fnmatch
+import functools
+import hashlib
 import os
 import sys
 import platform
 import json
+import re
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import NamedTuple
 from isaacsim_links.logger import logger
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ModuleNotFoundError:
+        tomllib = None
+from isaacsim_links import index as module_index, pth
+from isaacsim_links.instrument import Instrumentation
 import site
 
-# 动态查找当前 Python 环境的 site-packages 目录
-# 获取标准库路径，通常在 Python 安装目录下
-site_packages_paths = site.getsitepackages()
+_LAZY_BASE_PATHS = (
+    "site_packages",
+    "isaacsim_site_packages",
+    "omni_site_packages",
+    "carb_site_packages",
+)
+
 
-# 找到第一个存在的 site-packages 路径
-site_packages = None
-for path in site_packages_paths:
-    if "site-packages" in path and Path(path).exists():
-        site_packages = Path(path)
-        break
+@functools.lru_cache(maxsize=None)
+def find_site_packages() -> Path:
+    """查找当前 Python 环境的 site-packages 目录
+
+    首次调用时才会访问文件系统，结果会被缓存；导入本模块不做任何文件系统操作。
+    """
+    # 获取标准库路径，通常在 Python 安装目录下
+    # 找到第一个存在的 site-packages 路径
+    for path in site.getsitepackages():
+        if "site-packages" in path and Path(path).exists():
+            return Path(path)
 
-if not site_packages:
     # 回退方案：如果上述方法失败，尝试从 sys.path 中找到
     for path in sys.path:
         if "site-packages" in path and Path(path).exists():
-            site_packages = Path(path)
-            break
+            return Path(path)
 
-if not site_packages:
     raise RuntimeError("无法找到 site-packages 目录，请手动指定路径")
 
-isaacsim_site_packages = site_packages / "isaacsim"
-omni_site_packages = site_packages / "omni"
-carb_site_packages = site_packages / "carb"
+
+# 当前上下文中指定的 site-packages 目录；为 None 时使用当前解释器的 site-packages
+_site_packages_override = contextvars.ContextVar(
+    "isaacsim_links_site_packages", default=None
+)
+
+
+@contextlib.contextmanager
+def site_packages_context(site_packages):
+    """在此上下文中，所有操作都针对给定的 site-packages 目录
+
+    基于 contextvars 实现，不同线程可以同时处理不同的环境。
+    相对路径会转换为绝对路径，否则创建的链接目标会相对于链接所在目录解析。
+    """
+    token = _site_packages_override.set(Path(site_packages).absolute())
+    try:
+        yield
+    finally:
+        _site_packages_override.reset(token)
+
+
+def get_base_paths() -> dict:
+    """获取基础路径配置 (site-packages 及其下的 isaacsim/omni/carb 目录)"""
+    site_packages = _site_packages_override.get() or find_site_packages()
+    return {
+        "site_packages": site_packages,
+        "isaacsim_site_packages": site_packages / "isaacsim",
+        "omni_site_packages": site_packages / "omni",
+        "carb_site_packages": site_packages / "carb",
+    }
+
+
+def _resolve_base_paths() -> dict:
+    """获取完整的基础路径，缺省的命名空间目录由 site_packages 推导"""
+    paths = dict(get_base_paths())
+    site_packages = Path(paths["site_packages"])
+    paths.setdefault("isaacsim_site_packages", site_packages / "isaacsim")
+    paths.setdefault("omni_site_packages", site_packages / "omni")
+    paths.setdefault("carb_site_packages", site_packages / "carb")
+    return paths
+
+
+def _root_package_dirs() -> list:
+    """isaacsim/omni/carb 根目录，这些目录本身不会被清理"""
+    paths = _resolve_base_paths()
+    return [
+        paths["isaacsim_site_packages"],
+        paths["omni_site_packages"],
+        paths["carb_site_packages"],
+    ]
+
+
+def _phase(instrumentation: "Instrumentation | None", name: str):
+    """统计阶段 name 的上下文；未启用统计时为空上下文"""
+    if instrumentation is None:
+        return contextlib.nullcontext()
+    return instrumentation.phase(name)
+
+
+def _instrumented(instrumentation: "Instrumentation | None"):
+    """在此上下文中统计系统调用；未启用统计时为空上下文"""
+    if instrumentation is None:
+        return contextlib.nullcontext()
+    return instrumentation.activate()
+
+
+def __getattr__(name):
+    # 兼容旧代码中对模块级路径变量的访问，按需计算
+    if name in _LAZY_BASE_PATHS:
+        return _resolve_base_paths()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 empty_record = {
     "links": set(),
@@ -42,10 +139,20 @@ empty_record = {
 
 
 # --- 配置 ---
-def check_base_paths():
-    """获取基础路径配置"""
+def check_base_paths(session: "RecordSession | None" = None):
+    """获取基础路径配置
 
-    links, dirs = load_record()
+    Args:
+        session: 当前的记录会话；为 None 时自行加载并在结束时写回
+    """
+
+    own_session = session is None
+    if own_session:
+        session = RecordSession.load()
+
+    isaacsim_site_packages, omni_site_packages, carb_site_packages = (
+        _root_package_dirs()
+    )
 
     # 检查目录是否存在
     if not isaacsim_site_packages.exists():
@@ -59,16 +166,20 @@ def check_base_paths():
         try:
             carb_site_packages.mkdir(parents=True, exist_ok=True)
             logger.info(f"已创建目录: {carb_site_packages}")
-            dirs.add(str(carb_site_packages))
-            save_record(links, dirs)
+            session.add_directory(carb_site_packages)
         except Exception as e:
             logger.error(f"创建 carb 目录失败: {e}")
 
+    if own_session:
+        session.flush()
     return
 
 
 def get_ext_configs():
     """获取扩展配置"""
+    paths = _resolve_base_paths()
+    isaacsim_site_packages = paths["isaacsim_site_packages"]
+    omni_site_packages = paths["omni_site_packages"]
 
     # 定义扩展目录和目标位置
     ext_configs = [
@@ -96,6 +207,7 @@ def get_ext_configs():
             "exts_dir": isaacsim_site_packages / "extscache",
             "prefix": ["isaacsim."], # "omni.", "carb.", 
             "description": "Isaac Sim 扩展缓存",
+            "versions": "highest",  # 同一扩展的多个版本只扫描最高版本
         },
     ]
 
@@ -103,6 +215,9 @@ def get_ext_configs():
 
 
 def get_target_base(prefix: str):
+    isaacsim_site_packages, omni_site_packages, carb_site_packages = (
+        _root_package_dirs()
+    )
     return {
         "isaacsim": isaacsim_site_packages,
         "omni": omni_site_packages,
@@ -113,115 +228,1681 @@ def get_target_base(prefix: str):
 # 记录文件位置
 def get_record_file_path():
     """获取记录文件路径"""
+    isaacsim_site_packages = _resolve_base_paths()["isaacsim_site_packages"]
     return isaacsim_site_packages / "isaacsim_links_symlink_record.json"
 
 
+def get_record_journal_path():
+    """获取记录日志文件路径（与记录文件位于同一目录）
+
+    运行期间记录的每次增删都追加到该文件，运行结束时合并进记录文件后删除。
+    """
+    return get_record_file_path().with_name("isaacsim_links_symlink_record.journal")
+
+
+def get_pth_file_path():
+    """获取 .pth 链接模式生成的 .pth 文件路径（位于 site-packages 根目录）"""
+    return _resolve_base_paths()["site_packages"] / pth.PTH_FILE_NAME
+
+
+def get_module_index_path():
+    """获取模块索引文件路径
+
+    模块索引供 finder.IndexFinder 使用，位于用户缓存目录而不是 site-packages，
+    文件名包含 site-packages 路径的摘要以区分不同环境。
+    可通过环境变量 ISAACSIM_LINKS_MODULE_INDEX 指定。
+    """
+    override = os.environ.get("ISAACSIM_LINKS_MODULE_INDEX")
+    if override:
+        return Path(override)
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    site_packages = _resolve_base_paths()["site_packages"]
+    digest = hashlib.sha1(str(site_packages).encode("utf-8")).hexdigest()[:12]
+    return Path(cache_home) / "isaacsim_links" / f"module_index-{digest}.idx"
+
+
+def get_scan_index_path():
+    """获取扫描索引文件路径（与记录文件位于同一目录）"""
+    return get_record_file_path().with_name("isaacsim_links_scan_index.json")
+
+
 # -------------
 
 
+class RecordSession:
+    """链接记录会话
+
+    记录文件只在会话开始时加载一次，之后的成员查询和增删都在内存中完成，
+    待运行结束（或在检查点）时通过 flush() 统一写回。
+
+    从记录文件加载的会话还会把每次增删以一行追加到记录日志中：运行中途被
+    终止时，已创建的链接不会脱离记录，下次加载时从日志恢复。
+    """
+
+    def __init__(self, links=None, directories=None, sources=None):
+        self.links = set(str(item) for item in links or ())
+        self.directories = set(str(item) for item in directories or ())
+        # 链接路径 -> 创建时的源路径（旧记录中可能缺失）
+        self.sources = {
+            str(link): str(source)
+            for link, source in (sources or {}).items()
+            if str(link) in self.links
+        }
+        # 会话开始时已记录的链接，用于判断某个已存在的链接是否由本工具创建
+        self.initial_links = frozenset(self.links)
+        self._dirty = False
+        self.journal_path = None  # 为 None 时不写记录日志 (纯内存会话)
+        self._journal_file = None
+
+    @classmethod
+    def load(cls, create_if_missing=True):
+        """从记录文件加载会话，之后的增删会写入记录日志"""
+        links, directories, sources = load_record(create_if_missing, True)
+        session = cls(links, directories, sources)
+        session.journal_path = get_record_journal_path()
+        return session
+
+    def _journal(self, *entry):
+        """向记录日志追加一行，每行单独写出，进程被终止时最多丢失正在写的一行"""
+        if self.journal_path is None:
+            return
+        try:
+            if self._journal_file is None:
+                self._journal_file = open(self.journal_path, "a", encoding="utf-8")
+            self._journal_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._journal_file.flush()
+        except OSError as e:
+            logger.warning(f"无法写入记录日志 {self.journal_path}: {e}，本次运行不再写日志")
+            self._close_journal()
+            self.journal_path = None
+
+    def _close_journal(self):
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+    @property
+    def dirty(self) -> bool:
+        """是否存在尚未写回的修改"""
+        return self._dirty
+
+    def has_link(self, link_path) -> bool:
+        return str(link_path) in self.links
+
+    def was_recorded(self, link_path) -> bool:
+        """链接是否在会话开始时已存在于记录中"""
+        return str(link_path) in self.initial_links
+
+    def source_of(self, link_path) -> "str | None":
+        """返回记录中链接的源路径，未记录时返回 None"""
+        return self.sources.get(str(link_path))
+
+    def add_link(self, link_path, source=None):
+        link_str = str(link_path)
+        source_str = None if source is None else str(source)
+        changed = link_str not in self.links
+        if changed:
+            self.links.add(link_str)
+        if source_str is not None and self.sources.get(link_str) != source_str:
+            self.sources[link_str] = source_str
+            changed = True
+        if changed:
+            self._dirty = True
+            self._journal("add_link", link_str, source_str)
+
+    def discard_link(self, link_path):
+        link_str = str(link_path)
+        if link_str in self.links:
+            self.links.discard(link_str)
+            self.sources.pop(link_str, None)
+            self._dirty = True
+            self._journal("discard_link", link_str)
+
+    def add_directory(self, dir_path):
+        dir_str = str(dir_path)
+        if dir_str not in self.directories:
+            self.directories.add(dir_str)
+            self._dirty = True
+            self._journal("add_directory", dir_str)
+
+    def discard_directory(self, dir_path):
+        dir_str = str(dir_path)
+        if dir_str in self.directories:
+            self.directories.discard(dir_str)
+            self._dirty = True
+            self._journal("discard_directory", dir_str)
+
+    def replace(self, links, directories):
+        """用给定的集合整体替换记录内容"""
+        links = set(str(item) for item in links)
+        directories = set(str(item) for item in directories)
+        if links != self.links or directories != self.directories:
+            self.links = links
+            self.directories = directories
+            self.sources = {
+                link: source for link, source in self.sources.items() if link in links
+            }
+            self._dirty = True
+            self._journal("replace", sorted(links), sorted(directories))
+
+    def flush(self, force=False):
+        """将挂起的修改合并写回记录文件，成功后删除记录日志
+
+        写入失败时保留挂起状态和记录日志，之后的 flush() 会重试。
+        """
+        if not (self._dirty or force):
+            return
+        if not save_record(self.links, self.directories, self.sources):
+            return
+        self._close_journal()
+        if self.journal_path is not None:
+            _remove_journal(self.journal_path)
+        self._dirty = False
+
+    def delete_file(self):
+        """删除记录文件和记录日志（所有记录均已处理完毕时使用）"""
+        self._close_journal()
+        if self.journal_path is not None:
+            _remove_journal(self.journal_path)
+        record_file = get_record_file_path()
+        try:
+            if record_file.exists():
+                record_file.unlink()
+                logger.info("记录文件已删除。")
+            else:
+                logger.info("记录文件不存在，无需删除。")
+        except OSError as e:
+            logger.warning(f"无法删除记录文件 {record_file}: {e}")
+        self._dirty = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 即使中途出错也写回，避免已创建的链接脱离记录
+        self.flush()
+        return False
+
+
+# 2: 链接冲突改为按版本决定；3: 只比较同名扩展的版本，需要重新规划一次
+SCAN_INDEX_VERSION = 3
+
+
+def extension_fingerprint(
+    ext_dir: Path,
+    prefixes: list[str],
+    discovery: str = "walk",
+    rules: "WalkRules | None" = None,
+) -> list:
+    """计算扩展目录的指纹：扩展目录及其命名空间目录的 (inode, mtime)
+
+    pip 升级通常会整体替换扩展目录，inode 或 mtime 随之改变。
+    清单模式下还包括 config/extension.toml 的 (inode, mtime, size)，
+    清单解析结果因此按其 mtime 缓存在扫描索引中。
+    遍历规则也计入指纹，修改规则后会重新扫描。
+    """
+    fingerprint = []
+    for path in [ext_dir] + [ext_dir / p.rstrip(".") for p in prefixes]:
+        try:
+            st = os.stat(path)
+            fingerprint.append([st.st_ino, st.st_mtime_ns])
+        except OSError:
+            fingerprint.append(None)
+    if discovery == "manifest":
+        try:
+            st = os.stat(ext_dir / EXTENSION_MANIFEST)
+            fingerprint.append(["manifest", st.st_ino, st.st_mtime_ns, st.st_size])
+        except OSError:
+            fingerprint.append(["manifest", None])
+    if rules is not None:
+        fingerprint.append(
+            ["rules", list(rules.prune), rules.max_depth, rules.stop_at_first_package]
+        )
+    return fingerprint
+
+
+class ScanIndex:
+    """持久化的扩展扫描索引
+
+    记录每个扩展目录的指纹和其中找到的子包，后续运行只需重新扫描指纹发生变化的扩展。
+    文件结构::
+
+        {"version": SCAN_INDEX_VERSION,
+         "configs": {exts_dir: {"prefix": [...],
+                                "extensions": {ext_name: {"fingerprint": [...],
+                                                          "packages": [[源路径, 相对路径, 命名空间], ...]}}}}}
+    """
+
+    def __init__(self, configs=None):
+        self.configs = configs or {}
+        # 本次运行中被替换或删除的扩展的旧子包，用于清理不再需要的链接
+        self.stale_packages = []
+        self._dirty = False
+
+    @classmethod
+    def load(cls):
+        """加载扫描索引，文件不存在或格式不符时返回空索引"""
+        index_file = get_scan_index_path()
+        if not index_file.exists():
+            return cls()
+        try:
+            with open(index_file, "r") as f:
+                data = json.load(f)
+            if (
+                not isinstance(data, dict)
+                or data.get("version") != SCAN_INDEX_VERSION
+                or not isinstance(data.get("configs"), dict)
+            ):
+                logger.warning(f"扫描索引格式非预期，将完整重新扫描: {index_file}")
+                return cls()
+            return cls(data["configs"])
+        except (IOError, json.JSONDecodeError) as e:
+            logger.warning(f"无法读取或解析扫描索引 {index_file}: {e}")
+            return cls()
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def _config_entry(self, exts_dir: Path, prefixes: list[str]) -> dict:
+        key = str(exts_dir)
+        entry = self.configs.get(key)
+        if entry is None or entry.get("prefix") != list(prefixes):
+            # 前缀配置变化时，该扩展目录下的所有缓存结果都作废
+            if entry is not None:
+                for ext_entry in entry.get("extensions", {}).values():
+                    self.stale_packages.extend(_decode_packages(ext_entry))
+            entry = {"prefix": list(prefixes), "extensions": {}}
+            self.configs[key] = entry
+            self._dirty = True
+        return entry
+
+    def get(self, exts_dir: Path, prefixes: list[str], ext_name: str, fingerprint):
+        """指纹一致时返回缓存的子包列表，否则返回 None"""
+        entry = self.configs.get(str(exts_dir))
+        if entry is None or entry.get("prefix") != list(prefixes):
+            return None
+        ext_entry = entry["extensions"].get(ext_name)
+        if ext_entry is None or ext_entry.get("fingerprint") != fingerprint:
+            return None
+        return _decode_packages(ext_entry)
+
+    def set(self, exts_dir, prefixes, ext_name: str, fingerprint, packages: list):
+        """更新某个扩展的指纹和子包"""
+        extensions = self._config_entry(exts_dir, prefixes)["extensions"]
+        old_entry = extensions.get(ext_name)
+        if old_entry is not None:
+            self.stale_packages.extend(_decode_packages(old_entry))
+        extensions[ext_name] = {
+            "fingerprint": fingerprint,
+            "packages": [
+                [str(code_path), rel_path.as_posix(), ns]
+                for code_path, rel_path, ns in packages
+            ],
+        }
+        self._dirty = True
+
+    def retain(self, exts_dir: Path, prefixes: list[str], ext_names):
+        """删除已不存在的扩展条目"""
+        extensions = self._config_entry(exts_dir, prefixes)["extensions"]
+        for ext_name in set(extensions) - set(ext_names):
+            self.stale_packages.extend(_decode_packages(extensions.pop(ext_name)))
+            self._dirty = True
+
+    def forget(self, exts_dir: Path):
+        """扩展目录已不存在：删除其条目，其中所有扩展的子包都视为过期"""
+        entry = self.configs.pop(str(exts_dir), None)
+        if entry is None:
+            return
+        for ext_entry in entry.get("extensions", {}).values():
+            self.stale_packages.extend(_decode_packages(ext_entry))
+        self._dirty = True
+
+    def save(self):
+        """将修改写回索引文件"""
+        if not self._dirty:
+            return
+        index_file = get_scan_index_path()
+        try:
+            with open(index_file, "w") as f:
+                json.dump({"version": SCAN_INDEX_VERSION, "configs": self.configs}, f)
+            self._dirty = False
+        except IOError as e:
+            logger.error(f"错误：无法写入扫描索引 {index_file}: {e}")
+
+    @staticmethod
+    def delete_file():
+        """删除索引文件"""
+        index_file = get_scan_index_path()
+        try:
+            if index_file.exists():
+                index_file.unlink()
+        except OSError as e:
+            logger.warning(f"无法删除扫描索引 {index_file}: {e}")
+
+
+def _decode_packages(ext_entry: dict) -> list:
+    return [
+        (Path(code_path), Path(rel_path), ns)
+        for code_path, rel_path, ns in ext_entry.get("packages", [])
+    ]
+
+
 def create_symlink_safely(
     source: Path,
     link_path: Path,
-    links_created_record: set,
-    directories_created_record: set,
+    session: RecordSession,
     debug=False,
 ):
-    """安全地创建符号链接并记录"""
+    """安全地创建符号链接并记录到会话中
+
+    Returns:
+        是否新建或替换了链接；已指向正确源的链接保持不变并返回 False
+    """
     if debug:
-        logger.info(f"调试模式: 源路径: {source}, 链接路径: {link_path}")
+        logger.debug("调试模式: 源路径: %s, 链接路径: %s", source, link_path)
         return False
     if not source.exists():
         logger.warning(f"源路径不存在，跳过: {source}")
         return False
 
-    if link_path.is_symlink() and str(link_path) in load_record()[0]:
-        logger.info(f"清理旧链接: {link_path}")
+    if link_path.is_symlink() and session.was_recorded(link_path):
+        if _symlink_target(link_path) == str(source):
+            # 已指向正确的源：不做任何写操作，避免触发 IDE 和语言服务器的缓存失效
+            session.add_link(link_path, source)
+            return False
+        logger.debug("清理旧链接: %s", link_path)
+        try:
+            link_path.unlink()  # Preferred way for pathlib to remove links
+        except OSError as e:
+            logger.warning(
+                f"清理旧链接失败: {link_path}, 原因: {e}, 将尝试直接创建链接"
+            )
+    elif link_path.exists():
+        logger.warning(f"链接目标位置已存在，跳过: {link_path}")
+        return False
+
+    logger.debug("创建链接: %s -> %s", link_path, source)
+    try:
+        # 确保父目录存在
+        if not link_path.parent.exists():
+            logger.debug("创建父目录: %s", link_path.parent)
+            link_path.parent.mkdir(parents=True, exist_ok=False)
+            session.add_directory(link_path.parent)
+
+        # 创建符号链接
+        os.symlink(source, link_path, target_is_directory=source.is_dir())
+        session.add_link(link_path, source)
+        return True
+    except OSError as e:
+        logger.error(f"错误：创建链接失败: {e}")
+        if platform.system() == "Windows":
+            logger.error("Windows提示: 请确保以管理员身份运行，或已启用开发人员模式。")
+        return False
+    except Exception as e:
+        logger.error(f"发生意外错误: {e}")
+        return False
+
+
+# 默认跳过的目录：缓存、隐藏目录以及常见的资源、文档、测试和二进制目录
+# (名称匹配但含有 __init__.py 的目录是包，不会被跳过)
+DEFAULT_PRUNE_GLOBS = ("__pycache__", ".*", "data", "docs", "tests", "bin", "icons")
+
+# 默认的最大遍历深度（相对于命名空间目录）
+DEFAULT_MAX_DEPTH = 8
+
+
+class WalkRules(NamedTuple):
+    """包遍历的剪枝规则
+
+    可在 get_ext_configs 的每个扩展配置中通过 "prune"、"max_depth" 和
+    "stop_at_first_package" 设置，未设置时使用默认值。
+    """
+
+    prune: tuple = ()  # 跳过名称匹配这些通配符、且不是包的目录
+    max_depth: "int | None" = None  # 不进入相对深度超过该值的目录，None 表示不限制
+    stop_at_first_package: bool = False  # 每个命名空间目录找到第一个包后即停止
+
+    @classmethod
+    def from_config(cls, ext_config: dict) -> "WalkRules":
+        return cls(
+            prune=tuple(ext_config.get("prune", DEFAULT_PRUNE_GLOBS)),
+            max_depth=ext_config.get("max_depth", DEFAULT_MAX_DEPTH),
+            stop_at_first_package=ext_config.get("stop_at_first_package", False),
+        )
+
+
+@dataclass
+class WalkStats:
+    """包遍历的统计：扫描的目录数以及按各规则跳过的目录数"""
+
+    scanned: int = 0
+    pruned: int = 0
+    depth_limited: int = 0
+    stopped: int = 0
+
+    @property
+    def skipped(self) -> int:
+        return self.pruned + self.depth_limited + self.stopped
+
+    def merge(self, other: "WalkStats"):
+        self.scanned += other.scanned
+        self.pruned += other.pruned
+        self.depth_limited += other.depth_limited
+        self.stopped += other.stopped
+
+
+@functools.lru_cache(maxsize=None)
+def _prune_matcher(globs: tuple):
+    """把剪枝通配符编译为一个正则表达式 (区分大小写)"""
+    if not globs:
+        return None
+    return re.compile("|".join(fnmatch.translate(glob) for glob in globs)).match
+
+
+def find_all_init_paths(
+    base_dir: Path,
+    module_namespace: list[str],
+    rules: "WalkRules | None" = None,
+    stats: "WalkStats | None" = None,
+) -> list:
+    """递归查找所有包含__init__.py文件的有效路径
+
+    Args:
+        base_dir: 扩展目录，如 exts/omni.aaa.bbb/
+        module_namespace: 模块命名空间，如 'omni' 或 'isaacsim'
+        rules: 剪枝规则，默认不剪枝
+        stats: 遍历统计，提供时累加到其中
+
+    Returns:
+        包含元组(目录路径, 相对路径部分, 命名空间)的列表
+    """
+    if isinstance(module_namespace, str):
+        module_namespace = [module_namespace]
+
+    found_paths = []
+    for ns in module_namespace:
+        namespace_dir = base_dir / ns.rstrip(".")
+        found_paths.extend(scan_namespace_packages(namespace_dir, rules, stats))
+    return found_paths
+
+
+def scan_namespace_packages(
+    namespace_dir: Path,
+    rules: "WalkRules | None" = None,
+    stats: "WalkStats | None" = None,
+) -> list:
+    """基于 os.scandir 的迭代式包扫描
+
+    每个目录只调用一次 os.scandir：__init__.py 直接从目录列表中识别，
+    子目录类型使用 DirEntry 缓存的类型信息判断，不再逐个 stat。
+    使用显式栈代替递归，深层目录树不会触发递归深度限制。
+
+    Args:
+        namespace_dir: 命名空间目录，如 exts/omni.aaa.bbb/omni
+        rules: 剪枝规则，默认不剪枝
+        stats: 遍历统计，提供时累加到其中
+
+    Returns:
+        包含元组(目录路径, 相对路径部分, 命名空间)的列表，顺序与深度优先遍历一致；
+        命名空间目录不存在时返回空列表
+    """
+    rules = rules or WalkRules()
+    stats = stats if stats is not None else WalkStats()
+    is_pruned = _prune_matcher(tuple(rules.prune))
+    found_paths = []
+    ns_name = namespace_dir.name
+    visited_links = set()  # 通过符号链接进入的目录 (st_dev, st_ino)，防止循环
+    stack = [(os.fspath(namespace_dir), ())]
+    is_root = True
+
+    while stack:
+        directory, rel_parts = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except (FileNotFoundError, NotADirectoryError):
+            # 命名空间目录不存在，或遍历过程中目录被删除
+            is_root = False
+            continue
+        if is_root:
+            logger.debug("搜索命名空间目录: %s", namespace_dir)
+            is_root = False
+        stats.scanned += 1
+
+        subdirs = []
+        is_package = False
+        for entry in entries:
+            if entry.name == "__init__.py":
+                if entry.is_file():
+                    is_package = True
+                    break
+            elif entry.is_dir():
+                if (
+                    is_pruned is not None
+                    and is_pruned(entry.name)
+                    and not os.path.isfile(os.path.join(entry.path, "__init__.py"))
+                ):
+                    stats.pruned += 1
+                    continue
+                if rules.max_depth is not None and len(rel_parts) >= rules.max_depth:
+                    stats.depth_limited += 1
+                    continue
+                if entry.is_symlink():
+                    st = entry.stat()
+                    key = (st.st_dev, st.st_ino)
+                    if key in visited_links:
+                        continue
+                    visited_links.add(key)
+                subdirs.append(entry)
+
+        if is_package:
+            rel_path = Path(*rel_parts)
+            found_paths.append((Path(directory), rel_path, ns_name))
+            logger.debug("找到有效路径: %s -> %s", directory, rel_path)
+            if rules.stop_at_first_package:
+                stats.stopped += len(stack)
+                break
+            continue
+
+        # 逆序入栈，保证按名称顺序进行深度优先遍历
+        subdirs.sort(key=lambda e: e.name, reverse=True)
+        for entry in subdirs:
+            stack.append((entry.path, rel_parts + (entry.name,)))
+
+    return found_paths
+
+
+# 发现子包的方式："walk" 遍历命名空间目录，"manifest" 读取扩展清单
+DISCOVERY_MODES = ("walk", "manifest")
+
+# 扩展清单相对于扩展目录的路径
+EXTENSION_MANIFEST = Path("config", "extension.toml")
+
+
+def read_extension_manifest(ext_dir: Path, prefixes: list[str]):
+    """从扩展清单 config/extension.toml 的 [[python.module]] 中读取子包
+
+    Returns:
+        与 find_all_init_paths 格式相同的列表；没有清单、无法解析，
+        或清单中的模块不是 ext_dir 中的包时返回 None，由调用方回退到目录遍历
+    """
+    if tomllib is None:
+        return None
+    try:
+        with open(ext_dir / EXTENSION_MANIFEST, "rb") as f:
+            manifest = tomllib.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, tomllib.TOMLDecodeError) as e:
+        logger.warning(f"无法解析扩展清单 {ext_dir / EXTENSION_MANIFEST}: {e}")
+        return None
+
+    modules = manifest.get("python", {}).get("module", [])
+    if not isinstance(modules, list):
+        return None
+
+    namespaces = [p.rstrip(".") for p in prefixes]
+    packages = {}  # 模块名的各部分 -> 包目录
+    for module in modules:
+        name = module.get("name") if isinstance(module, dict) else None
+        if not isinstance(name, str):
+            continue
+        parts = tuple(name.split("."))
+        if len(parts) < 2 or parts[0] not in namespaces:
+            continue
+        code_path = ext_dir / module.get("path", ".") / Path(*parts)
+        if not (code_path / "__init__.py").is_file():
+            return None
+        packages[parts] = code_path
+
+    found_paths = []
+    for parts in sorted(packages, key=lambda p: (namespaces.index(p[0]), p[1:])):
+        # 清单同时声明父包与子包时只保留最外层的包，与目录遍历一致
+        if any(parts[:i] in packages for i in range(2, len(parts))):
+            continue
+        found_paths.append((packages[parts], Path(*parts[1:]), parts[0]))
+    return found_paths
+
+
+_tomllib_warning_logged = False
+
+
+def scan_extension_packages(
+    ext_dir: Path,
+    prefixes: list[str],
+    discovery: str = "walk",
+    rules: "WalkRules | None" = None,
+    stats: "WalkStats | None" = None,
+) -> list:
+    """发现单个扩展中的子包
+
+    清单模式下优先读取扩展清单，没有可用清单的扩展回退到 find_all_init_paths。
+    """
+    global _tomllib_warning_logged
+    if discovery == "manifest":
+        if tomllib is None and not _tomllib_warning_logged:
+            _tomllib_warning_logged = True
+            logger.warning("未找到 tomllib 或 tomli，清单模式回退为目录遍历")
+        found = read_extension_manifest(ext_dir, prefixes)
+        if found is not None:
+            return found
+    return find_all_init_paths(ext_dir, prefixes, rules, stats)
+
+
+def list_extension_dirs(exts_dir: Path) -> list:
+    """列出扩展目录下的所有扩展子目录，按名称排序"""
+    with os.scandir(exts_dir) as it:
+        entries = [entry for entry in it if entry.is_dir()]
+    entries.sort(key=lambda e: e.name)
+    return [Path(entry.path) for entry in entries]
+
+
+# 同一扩展存在多个版本时的选择策略
+VERSION_POLICIES = ("highest", "lowest", "all")
+
+
+def select_extension_versions(ext_dirs: list, policy: str = "highest") -> list:
+    """按扩展名分组，每组只保留按策略选出的一个版本
+
+    Args:
+        ext_dirs: 按名称排序的扩展目录
+        policy: "highest" 保留最高版本，"lowest" 保留最低版本，"all" 全部保留
+
+    Returns:
+        保持原有顺序的扩展目录列表
+    """
+    if policy == "all":
+        return list(ext_dirs)
+    if policy not in VERSION_POLICIES:
+        raise ValueError(f"未知的版本策略: {policy}，可选: {', '.join(VERSION_POLICIES)}")
+
+    selected = {}  # 扩展名 -> (版本, 扩展目录)
+    for ext_dir in ext_dirs:
+        base, version = parse_extension_name(ext_dir.name)
+        current = selected.get(base)
+        if (
+            current is None
+            or (policy == "highest" and version > current[0])
+            or (policy == "lowest" and version < current[0])
+        ):
+            selected[base] = (version, ext_dir)
+    keep = {ext_dir for _, ext_dir in selected.values()}
+    return [ext_dir for ext_dir in ext_dirs if ext_dir in keep]
+
+
+class ExtensionScan(NamedTuple):
+    """发现阶段中单个扩展的扫描结果"""
+
+    ext_config: dict
+    ext_dir: Path
+    packages: list  # find_all_init_paths 的结果
+    rescanned: bool  # 是否实际遍历了目录（而不是来自扫描索引）
+
+
+class DiscoveryCache:
+    """进程内共享的发现结果缓存，供批量处理多个环境时使用
+
+    以扩展目录的真实路径为键，指向同一 Isaac Sim 安装的多个环境只需扫描一次。
+    多个线程同时请求同一个扩展时，只有一个线程实际扫描，其余线程等待结果。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # 键 -> (threading.Event, 结果)
+
+    def get_or_scan(
+        self,
+        ext_dir: Path,
+        prefixes: list[str],
+        discovery: str = "walk",
+        rules: "WalkRules | None" = None,
+        stats: "WalkStats | None" = None,
+    ) -> list:
+        """返回扩展目录的扫描结果，必要时调用 scan_extension_packages"""
+        key = (os.path.realpath(ext_dir), tuple(prefixes), discovery, rules)
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = [threading.Event(), None]
+        if not owner:
+            entry[0].wait()
+            if entry[1] is None:  # 扫描该扩展的线程出错，自行重试
+                return scan_extension_packages(
+                    ext_dir, prefixes, discovery, rules, stats
+                )
+            # 结果以相对于扩展目录的形式保存，映射回当前环境的路径
+            return [
+                (ext_dir / rel_source, rel_path, ns)
+                for rel_source, rel_path, ns in entry[1]
+            ]
+        try:
+            found = scan_extension_packages(ext_dir, prefixes, discovery, rules, stats)
+            entry[1] = [
+                (code_path.relative_to(ext_dir), rel_path, ns)
+                for code_path, rel_path, ns in found
+            ]
+            return found
+        finally:
+            entry[0].set()
+
+
+def _scan_extension(
+    ext_dir: Path,
+    prefixes: list[str],
+    index: "ScanIndex | None",
+    cache: "DiscoveryCache | None" = None,
+    discovery: str = "walk",
+    rules: "WalkRules | None" = None,
+    stats: "WalkStats | None" = None,
+):
+    """扫描单个扩展目录，供发现阶段的线程池调用
+
+    Returns:
+        (子包列表, 指纹, 是否重新扫描, 错误)
+    """
+    try:
+        fingerprint = None
+        if index is not None:
+            fingerprint = extension_fingerprint(ext_dir, prefixes, discovery, rules)
+            cached = index.get(ext_dir.parent, prefixes, ext_dir.name, fingerprint)
+            if cached is not None:
+                return cached, fingerprint, False, None
+        if cache is not None:
+            found = cache.get_or_scan(ext_dir, prefixes, discovery, rules, stats)
+        else:
+            found = scan_extension_packages(ext_dir, prefixes, discovery, rules, stats)
+        return found, fingerprint, True, None
+    except OSError as e:
+        return [], None, True, e
+
+
+def discover_extensions(
+    ext_configs=None,
+    jobs: int = 1,
+    index: "ScanIndex | None" = None,
+    cache: "DiscoveryCache | None" = None,
+    version_policy: "str | None" = None,
+    discovery: "str | None" = None,
+    stats: "WalkStats | None" = None,
+    instrumentation: "Instrumentation | None" = None,
+) -> list:
+    """发现阶段：扫描所有配置的扩展目录中的子包
+
+    每个扩展都是独立的子树，jobs > 1 时使用线程池并行扫描。
+    结果按 (配置顺序, 扩展名称) 合并，与线程调度无关。
+
+    Args:
+        ext_configs: 扩展配置列表，默认为 get_ext_configs()
+        jobs: 并行扫描的线程数
+        index: 扫描索引；提供时只重新扫描指纹变化的扩展，并将结果写回索引
+        cache: 多个环境之间共享的发现结果缓存
+        version_policy: 同一扩展多个版本的选择策略，覆盖各配置的 "versions"
+            (未配置时为 "all")，见 select_extension_versions
+        discovery: 发现子包的方式 ("walk" 或 "manifest")，覆盖各配置的 "discovery"
+            (未配置时为 "walk")
+        stats: 遍历统计，提供时累加本次发现的统计；各配置的剪枝规则见 WalkRules
+        instrumentation: 提供时记录每个扩展的扫描耗时
+
+    Returns:
+        ExtensionScan 列表
+    """
+    if ext_configs is None:
+        ext_configs = get_ext_configs()
+
+    tasks = []
+    for ext_config in ext_configs:
+        exts_dir = ext_config["exts_dir"]
+        if not exts_dir.is_dir():
+            logger.warning(f"扩展目录未找到: {exts_dir}，跳过此配置")
+            if index is not None:
+                # 之前链接过的扩展目录被删除时，清理其留下的链接
+                index.forget(exts_dir)
+            continue
+        logger.info(f"\n扫描 {ext_config['description']}: '{exts_dir}'...")
+        try:
+            ext_dirs = list_extension_dirs(exts_dir)
+        except OSError as e:
+            logger.warning(f"无法访问目录 {exts_dir}: {e}")
+            continue
+        policy = version_policy or ext_config.get("versions", "all")
+        selected = select_extension_versions(ext_dirs, policy)
+        if len(selected) < len(ext_dirs):
+            logger.info(
+                f"按版本策略 {policy} 跳过 {len(ext_dirs) - len(selected)} 个其他版本的扩展"
+            )
+        ext_dirs = selected
+        if index is not None:
+            index.retain(exts_dir, ext_config["prefix"], [d.name for d in ext_dirs])
+        rules = WalkRules.from_config(ext_config)
+        tasks.extend((ext_config, ext_dir, rules, WalkStats()) for ext_dir in ext_dirs)
+
+    def scan(task):
+        ext_config, ext_dir, rules, task_stats = task
+        start = time.perf_counter()
+        result = _scan_extension(
+            ext_dir,
+            ext_config["prefix"],
+            index,
+            cache,
+            discovery or ext_config.get("discovery", "walk"),
+            rules,
+            task_stats,
+        )
+        if instrumentation is not None:
+            instrumentation.record_extension(
+                ext_config["name"], ext_dir.name, start, time.perf_counter()
+            )
+        return result
+
+    if jobs > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            # map 保持提交顺序，合并结果是确定的
+            results = list(executor.map(scan, tasks))
+    else:
+        results = [scan(task) for task in tasks]
+
+    total_stats = WalkStats()
+    discovered = []
+    for (ext_config, ext_dir, _, task_stats), result in zip(tasks, results):
+        total_stats.merge(task_stats)
+        found, fingerprint, rescanned, error = result
+        if error is not None:
+            logger.warning(f"扫描扩展目录 {ext_dir} 失败: {error}")
+            continue
+        if rescanned:
+            logger.debug("处理扩展目录: %s", ext_dir.name)
+            if not found:
+                logger.warning(f"未找到有效子包，跳过: {ext_dir.name} ({ext_dir})")
+            if index is not None:
+                index.set(
+                    ext_dir.parent, ext_config["prefix"], ext_dir.name, fingerprint, found
+                )
+        discovered.append(ExtensionScan(ext_config, ext_dir, found, rescanned))
+
+    if total_stats.scanned:
+        logger.info(
+            f"遍历了 {total_stats.scanned} 个目录，按规则跳过 {total_stats.skipped} 个 "
+            f"(匹配忽略规则 {total_stats.pruned}，超过最大深度 {total_stats.depth_limited}，"
+            f"找到首个包后停止 {total_stats.stopped})"
+        )
+    if stats is not None:
+        stats.merge(total_stats)
+    return discovered
+
+
+class PlannedLink(NamedTuple):
+    """计划中的一个符号链接"""
+
+    source: Path
+    link: Path
+    is_dir: bool
+    extension: str  # 提供该子包的扩展目录名
+    config: str  # 扩展配置名称，如 isaacsim.exts
+
+
+class LinkConflict(NamedTuple):
+    """计划阶段发现的冲突：该链接不会被创建"""
+
+    link: Path
+    source: Path
+    extension: str
+    reason: str
+
+
+@dataclass
+class LinkPlan:
+    """链接计划：计划阶段的输出，应用阶段的输入
+
+    计划阶段只读取文件系统，不做任何修改；应用阶段只执行计划中的操作，不再做发现工作。
+    """
+
+    create: list = field(default_factory=list)  # 新建的链接 (PlannedLink)
+    replace: list = field(default_factory=list)  # 替换本工具之前创建的链接 (PlannedLink)
+    directories: list = field(default_factory=list)  # 需要新建的目录，父目录在前
+    remove: list = field(default_factory=list)  # 不再需要的过期链接 (Path)
+    conflicts: list = field(default_factory=list)  # 无法创建的链接 (LinkConflict)
+    unchanged: int = 0  # 已指向正确源、无需任何操作的链接数
+    # 经 readlink 确认指向正确源、但记录中缺少该源的链接 (PlannedLink)，应用时只补全记录
+    verified: list = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.create or self.replace or self.directories or self.remove)
+
+    def to_dict(self) -> dict:
+        """转换为可 JSON 序列化的字典"""
+
+        def link_dict(entry: PlannedLink):
+            return {
+                "link": str(entry.link),
+                "source": str(entry.source),
+                "extension": entry.extension,
+                "config": entry.config,
+            }
+
+        return {
+            "create": [link_dict(entry) for entry in self.create],
+            "replace": [link_dict(entry) for entry in self.replace],
+            "directories": [str(d) for d in self.directories],
+            "remove": [str(link) for link in self.remove],
+            "unchanged": self.unchanged,
+            "conflicts": [
+                {
+                    "link": str(c.link),
+                    "source": str(c.source),
+                    "extension": c.extension,
+                    "reason": c.reason,
+                }
+                for c in self.conflicts
+            ],
+        }
+
+
+# 扩展目录名中的版本后缀，如 isaacsim.foo-1.3.1 或 omni.kit.bar-105.1.2+lx64；
+# 以最后一个 "-<版本>" 为准，扩展名本身可以含有 "-<数字>" (如 omni.foo-2d-1.0.0)
+_EXTENSION_VERSION_RE = re.compile(
+    r"^(?P<name>.+)-(?P<version>\d+(?:\.\d+)*)(?P<rest>(?:[+.-]\S*)?)$"
+)
+
+
+def parse_extension_name(ext_name: str):
+    """把扩展目录名拆分为 (扩展名, 版本元组)
+
+    没有版本后缀时版本为空元组，例如:
+        "isaacsim.foo-1.3.1" -> ("isaacsim.foo", (1, 3, 1))
+        "isaacsim.core.api" -> ("isaacsim.core.api", ())
+    """
+    match = _EXTENSION_VERSION_RE.match(ext_name)
+    if match is None:
+        return ext_name, ()
+    version = tuple(int(part) for part in match.group("version").split("."))
+    return match.group("name"), version
+
+
+def resolve_link_conflicts(candidates: list, blocked=()):
+    """在前缀树中解析所有计划链接之间的冲突，一次报告全部冲突
+
+    - 多个扩展指向同一链接位置时，只有扩展名相同且都带版本后缀的目录
+      (如 extscache 中同一扩展的多个版本) 才按版本比较，保留版本最高的；
+      其他情况 (版本相同、扩展名不同，或如 exts 中不带版本的目录与 extscache
+      中的副本) 保留先发现的，即按扩展配置的顺序
+    - 一个链接位于另一个链接之内时 (如 isaacsim/core 与 isaacsim/core/prims)，
+      保留外层的链接：内层链接会被写入外层链接指向的扩展源码目录；
+      外层链接位于 blocked 中 (无法创建) 时，内层链接不让位
+
+    Args:
+        candidates: 按发现顺序排列的 PlannedLink
+        blocked: 已知无法创建的链接路径 (字符串)，如已被其他文件占用的位置
+
+    Returns:
+        (保留的 PlannedLink 列表 (保持发现顺序), LinkConflict 列表)
+    """
+
+    def supersedes(entry, current) -> bool:
+        name, version = parse_extension_name(entry.extension)
+        current_name, current_version = parse_extension_name(current.extension)
+        return (
+            name == current_name
+            and version
+            and current_version
+            and version > current_version
+        )
+
+    conflicts = []
+    by_link = {}  # 链接路径 -> 当前保留的 PlannedLink
+    for entry in candidates:
+        link_str = str(entry.link)
+        current = by_link.get(link_str)
+        if current is None:
+            by_link[link_str] = entry
+            continue
+        if supersedes(entry, current):
+            by_link[link_str] = entry
+            entry, current = current, entry  # 落选的是原先保留的链接
+        conflicts.append(
+            LinkConflict(
+                entry.link,
+                entry.source,
+                entry.extension,
+                f"与 {current.extension} 的子包指向同一链接位置",
+            )
+        )
+
+    # 前缀树：每个节点是 {路径片段: 子节点}，键 None 保存在该位置结束的链接
+    root = {}
+    for link_str, entry in by_link.items():
+        node = root
+        for part in entry.link.parts:
+            node = node.setdefault(part, {})
+        node[None] = entry
+
+    shadowed = set()
+    stack = [(root, None)]  # (节点, 最近的祖先链接)
+    while stack:
+        node, ancestor = stack.pop()
+        entry = node.get(None)
+        if entry is not None:
+            if ancestor is not None:
+                shadowed.add(str(entry.link))
+                conflicts.append(
+                    LinkConflict(
+                        entry.link,
+                        entry.source,
+                        entry.extension,
+                        f"位于 {ancestor.extension} 的链接 {ancestor.link} 之内",
+                    )
+                )
+            elif str(entry.link) not in blocked:
+                ancestor = entry
+        for part, child in node.items():
+            if part is not None:
+                stack.append((child, ancestor))
+
+    kept = [entry for link_str, entry in by_link.items() if link_str not in shadowed]
+    conflicts.sort(key=lambda conflict: str(conflict.link))
+    return kept, conflicts
+
+
+def build_link_plan(
+    discovered: list, session: RecordSession, stale_packages=(), verify=False
+):
+    """计划阶段：根据发现结果和记录计算链接计划，不修改文件系统
+
+    Args:
+        discovered: discover_extensions 的结果
+        session: 当前的记录会话，用于判断已存在的链接是否由本工具创建
+        stale_packages: 被替换或删除的扩展原先提供的子包（来自扫描索引）
+        verify: 校验模式 (--repair)：不信任记录，逐个检查期望的链接，
+            并删除记录中不再需要的链接
+
+    Returns:
+        LinkPlan
+    """
+    plan = LinkPlan()
+    target_base = functools.lru_cache(maxsize=None)(get_target_base)
+    stale_links = {
+        str(target_base(ns) / rel_path) for _, rel_path, ns in stale_packages
+    }
+    candidates = []
+    rescanned = set()  # 重新扫描过的 (配置名, 扩展目录名)
+    for scan in discovered:
+        ext_name = scan.ext_dir.name
+        config_name = scan.ext_config["name"]
+        if scan.rescanned:
+            rescanned.add((config_name, ext_name))
+        for code_path, rel_path, ns in scan.packages:
+            link_path = target_base(ns) / rel_path
+            candidates.append(
+                PlannedLink(code_path, link_path, True, ext_name, config_name)
+            )
+
+    def decide(entry):
+        """决定单个链接的操作: (操作, LinkConflict 或 None)"""
+        link_path = entry.link
+        if (
+            not verify
+            and (entry.config, entry.extension) not in rescanned
+            and session.has_link(link_path)
+            and str(link_path) not in stale_links
+        ):
+            return "unchanged", None  # 扩展未变化且链接已在记录中
+
+        try:
+            st = os.lstat(link_path)
+        except FileNotFoundError:
+            return "create", None
+        except OSError as e:
+            return "conflict", LinkConflict(
+                link_path, entry.source, entry.extension, f"无法访问: {e}"
+            )
+
+        if stat.S_ISLNK(st.st_mode) and session.was_recorded(link_path):
+            if _symlink_target(link_path) == str(entry.source):
+                # 已指向正确的源，无需重新创建；旧记录中没有源路径时补全
+                if session.source_of(link_path) != str(entry.source):
+                    return "verified", None
+                return "unchanged", None
+            return "replace", None
+        return "conflict", LinkConflict(
+            link_path, entry.source, entry.extension, "链接目标位置已存在"
+        )
+
+    # 先在内存中解析计划链接之间的冲突，落选的链接不再访问文件系统。
+    # 外层链接无法创建时，其内的链接不应让位，把它标记为 blocked 后重新解析
+    decisions = {}  # 链接路径 -> decide 的结果，每个位置只访问一次文件系统
+    blocked = set()
+    while True:
+        kept, conflicts = resolve_link_conflicts(candidates, blocked)
+        for entry in kept:
+            link_str = str(entry.link)
+            if link_str not in decisions:
+                decisions[link_str] = decide(entry)
+        newly_blocked = {
+            str(entry.link)
+            for entry in kept
+            if decisions[str(entry.link)][0] == "conflict"
+        } - blocked
+        if not newly_blocked or not conflicts:
+            break
+        blocked |= newly_blocked
+
+    plan.conflicts = conflicts
+    planned = set()
+    for entry in kept:
+        planned.add(str(entry.link))
+        action, conflict = decisions[str(entry.link)]
+        if action == "create":
+            plan.create.append(entry)
+        elif action == "replace":
+            plan.replace.append(entry)
+        elif action == "conflict":
+            plan.conflicts.append(conflict)
+        else:
+            plan.unchanged += 1
+            if action == "verified":
+                plan.verified.append(entry)
+
+    if verify:
+        # 记录中所有不再需要的链接都视为过期
+        stale_links |= session.links
+    plan.remove = [
+        Path(link_str)
+        for link_str in sorted(stale_links - set(planned))
+        if session.has_link(link_str)
+    ]
+    plan.directories = missing_parent_directories(e.link for e in plan.create)
+    return plan
+
+
+def _symlink_target(link_path) -> "str | None":
+    """返回符号链接的目标，无法读取时返回 None"""
+    try:
+        return os.readlink(link_path)
+    except OSError:
+        return None
+
+
+def missing_parent_directories(link_paths) -> list:
+    """计算创建这些链接前需要新建的最小目录集合
+
+    每个不同的父目录只检查一次；向上查找到第一个已存在的目录为止。
+
+    Returns:
+        去重并排序的目录列表，父目录总在子目录之前
+    """
+    dir_exists = {}  # 目录是否存在的缓存
+    missing = set()
+    for parent in {Path(link).parent for link in link_paths}:
+        directory = parent
+        while directory not in missing:
+            exists = dir_exists.get(directory)
+            if exists is None:
+                exists = dir_exists[directory] = directory.is_dir()
+            if exists or directory == directory.parent:
+                break
+            missing.add(directory)
+            directory = directory.parent
+    return sorted(missing)
+
+
+def write_links_bulk(
+    links: list, session: RecordSession, directories=None, replace=()
+) -> int:
+    """批量创建符号链接
+
+    先一次性创建所有缺失的父目录（已排序去重，父目录在前），
+    再直接使用发现阶段已知的源类型创建链接，不再对每个链接重复 stat。
+
+    Args:
+        links: 需要新建的链接 (PlannedLink)，链接位置应当不存在
+        session: 记录会话，新建的目录和链接都会记录到其中
+        directories: 需要新建的目录；为 None 时根据 links 和 replace 计算
+        replace: 需要替换的本工具之前创建的链接 (PlannedLink)
+
+    Returns:
+        成功新建或替换的链接数
+    """
+    links, replace = list(links), list(replace)
+    if directories is None:
+        directories = missing_parent_directories(
+            [entry.link for entry in links] + [entry.link for entry in replace]
+        )
+
+    for directory in directories:
+        logger.debug("创建父目录: %s", directory)
+        try:
+            os.mkdir(directory)
+        except FileExistsError:
+            continue
+        except OSError as e:
+            logger.error(f"创建目录失败: {directory}, 原因: {e}")
+            continue
+        session.add_directory(directory)
+
+    for entry in replace:
+        logger.debug("清理旧链接: %s", entry.link)
+        try:
+            os.unlink(entry.link)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(
+                f"清理旧链接失败: {entry.link}, 原因: {e}, 将尝试直接创建链接"
+            )
+
+    count = created = 0
+    windows_hint = platform.system() == "Windows"
+    for i, entry in enumerate(links + replace):
+        logger.debug("创建链接: %s -> %s", entry.link, entry.source)
+        try:
+            os.symlink(entry.source, entry.link, target_is_directory=entry.is_dir)
+        except FileExistsError:
+            logger.warning(f"链接目标位置已存在，跳过: {entry.link}")
+            continue
+        except OSError as e:
+            logger.error(f"错误：创建链接失败: {e}")
+            if windows_hint:
+                logger.error("Windows提示: 请确保以管理员身份运行，或已启用开发人员模式。")
+                windows_hint = False  # 只提示一次
+            continue
+        session.add_link(entry.link, entry.source)
+        count += 1
+        if i < len(links):
+            created += 1
+    if count:
+        logger.info(f"新建 {created} 个链接，替换 {count - created} 个链接。")
+    return count
+
+
+def plan_links(
+    jobs: int = 1,
+    incremental: bool = True,
+    discovery_cache: "DiscoveryCache | None" = None,
+    version_policy: "str | None" = None,
+    discovery: "str | None" = None,
+) -> LinkPlan:
+    """计算当前环境的链接计划，不修改文件系统（--plan 使用）"""
+    session = RecordSession.load(create_if_missing=False)
+    index = ScanIndex.load() if incremental else ScanIndex()
+    discovered = discover_extensions(
+        jobs=jobs,
+        index=index,
+        cache=discovery_cache,
+        version_policy=version_policy,
+        discovery=discovery,
+    )
+    return build_link_plan(discovered, session, index.stale_packages)
+
+
+def apply_plan(
+    plan: LinkPlan,
+    session: RecordSession,
+    instrumentation: "Instrumentation | None" = None,
+) -> int:
+    """应用阶段：执行链接计划并更新记录会话
+
+    Returns:
+        新建或替换的链接数
+    """
+    if plan.conflicts:
+        logger.warning(f"共有 {len(plan.conflicts)} 个链接冲突，这些链接将被跳过:")
+    for conflict in plan.conflicts:
+        logger.warning("链接冲突，跳过: %s (%s)", conflict.link, conflict.reason)
+
+    # 清理不再需要的过期链接及其留下的空目录
+    stale_parents = set()
+    with _phase(instrumentation, "apply"):
+        for stale_link in plan.remove:
+            logger.debug("删除过期链接: %s", stale_link)
+            try:
+                if os.path.lexists(stale_link):
+                    if not stale_link.is_symlink():
+                        # 保留记录，--status/--repair 仍能报告被占用的位置
+                        logger.warning(
+                            f"过期链接已被其他文件或目录替换，保留不动: {stale_link}"
+                        )
+                        continue
+                    os.unlink(stale_link)
+                session.discard_link(stale_link)
+                stale_parents.add(stale_link.parent)
+            except OSError as e:
+                logger.warning(f"删除过期链接失败: {stale_link}, 原因: {e}")
+    if stale_parents:
+        # 计划中新建或替换的链接所在的目录不能删除，否则随后创建链接会失败
+        keep_dirs = set(_root_package_dirs())
+        for entry in plan.create + plan.replace:
+            directory = entry.link.parent
+            while directory not in keep_dirs and directory != directory.parent:
+                keep_dirs.add(directory)
+                directory = directory.parent
+        with _phase(instrumentation, "prune"):
+            removed_dirs, _ = prune_empty_directories(
+                stale_parents,
+                (),
+                stop_dirs=keep_dirs,
+            )
+        for directory in removed_dirs:
+            session.discard_directory(directory)
+
+    if plan.unchanged:
+        logger.info(f"{plan.unchanged} 个链接已指向正确的源，保持不变。")
+    for entry in plan.verified:
+        session.add_link(entry.link, entry.source)
+    with _phase(instrumentation, "apply"):
+        return write_links_bulk(plan.create, session, plan.directories, plan.replace)
+
+
+# create_links 支持的链接模式
+LINK_MODES = ("new", "old", "pth")
+
+
+def create_links(
+    use_new_mode=True,
+    jobs: int = 1,
+    incremental: bool = True,
+    discovery_cache: "DiscoveryCache | None" = None,
+    mode: "str | None" = None,
+    version_policy: "str | None" = None,
+    discovery: "str | None" = None,
+    instrumentation: "Instrumentation | None" = None,
+):
+    """遍历所有配置的扩展目录并创建符号链接
+
+    Args:
+        use_new_mode (bool, optional): 如果为 True，则使用新的链接模式：
+            将 exts_dir/prefix.xxx.yyy/prefix 链接到 target_base/prefix。
+            默认为 False，使用旧的模式。
+        jobs (int, optional): 新模式下并行扫描扩展目录的线程数，默认为 1。
+        incremental (bool, optional): 新模式下使用扫描索引，只重新扫描和链接
+            指纹发生变化的扩展。为 False 时忽略索引完整重新扫描。
+        discovery_cache (DiscoveryCache, optional): 批量处理多个环境时共享的发现结果。
+        mode (str, optional): 链接模式，"new"、"old" 或 "pth"，指定时覆盖 use_new_mode。
+            "pth" 模式不创建符号链接，而是在 site-packages 中写入一个 .pth 文件。
+        version_policy (str, optional): 同一扩展多个版本的选择策略
+            ("highest"、"lowest" 或 "all")，覆盖扩展配置中的 "versions"。
+        discovery (str, optional): 发现子包的方式，"walk" 遍历目录，"manifest"
+            读取扩展清单 config/extension.toml，覆盖扩展配置中的 "discovery"。
+        instrumentation (Instrumentation, optional): 提供时按阶段统计系统调用和耗时。
+    """
+    if mode is None:
+        mode = "new" if use_new_mode else "old"
+    if mode not in LINK_MODES:
+        raise ValueError(f"未知的链接模式: {mode}，可选: {', '.join(LINK_MODES)}")
+
+    if mode != "pth" and platform.system() == "Windows" and not is_admin():
+        logger.warning("在 Windows 上创建符号链接通常需要管理员权限或开发人员模式。")
+        logger.warning("脚本将继续尝试，但可能会失败。")
+
+    with _instrumented(instrumentation):
+        with _phase(instrumentation, "record"):
+            session = RecordSession.load()  # 整个运行期间只加载一次记录
+        check_base_paths(session)  # 确保基础路径存在
+
+        created_dirs_count = len(session.directories)
+        if mode == "pth":
+            newly_created_count = _create_links_pth_mode(
+                jobs,
+                incremental,
+                discovery_cache,
+                version_policy,
+                discovery,
+                instrumentation,
+            )
+        elif mode == "new":
+            newly_created_count = _create_links_new_mode(
+                session,
+                jobs,
+                incremental,
+                discovery_cache,
+                version_policy,
+                discovery,
+                instrumentation,
+            )
+        else:
+            with _phase(instrumentation, "apply"):
+                newly_created_count = _create_links_old_mode(session)
+
+        with _phase(instrumentation, "record"):
+            session.flush()
+
+    if mode != "pth":
+        logger.info(
+            f"\n完成。创建/更新了 {newly_created_count} 个链接, 新建了 {len(session.directories) - created_dirs_count} 个目录。"
+        )
+    logger.info(
+        "请重启你的 IDE (如 VS Code) 或重新加载 Python 语言服务器以使更改生效。"
+    )
+
+    return newly_created_count
+
+
+def _create_links_new_mode(
+    session: RecordSession,
+    jobs: int,
+    incremental: bool,
+    discovery_cache: "DiscoveryCache | None" = None,
+    version_policy: "str | None" = None,
+    discovery: "str | None" = None,
+    instrumentation: "Instrumentation | None" = None,
+) -> int:
+    """新模式：发现所有子包，计算链接计划，然后应用计划
+
+    增量模式下，未变化的扩展中已记录的链接会被直接跳过，
+    被替换或删除的扩展留下的旧链接会被清理。
+    """
+    with _phase(instrumentation, "record"):
+        index = ScanIndex.load() if incremental else ScanIndex()
+    with _phase(instrumentation, "discovery"):
+        discovered = discover_extensions(
+            jobs=jobs,
+            index=index,
+            cache=discovery_cache,
+            version_policy=version_policy,
+            discovery=discovery,
+            instrumentation=instrumentation,
+        )
+    with _phase(instrumentation, "plan"):
+        plan = build_link_plan(discovered, session, index.stale_packages)
+    newly_created_count = apply_plan(plan, session, instrumentation)
+    with _phase(instrumentation, "record"):
+        index.save()
+    return newly_created_count
+
+
+def repair_links(
+    jobs: int = 1,
+    discovery_cache: "DiscoveryCache | None" = None,
+    version_policy: "str | None" = None,
+    discovery: "str | None" = None,
+    instrumentation: "Instrumentation | None" = None,
+) -> int:
+    """修复模式：比较期望的链接集合与文件系统的实际状态，只修复有偏差的链接
+
+    缺失的链接被重新创建，悬空或指向错误源的链接被替换，记录中不再需要的
+    链接被删除；已经正确的链接不做任何写操作。适用于新链接模式。
+
+    Returns:
+        新建或替换的链接数
+    """
+    with _instrumented(instrumentation):
+        with _phase(instrumentation, "record"):
+            session = RecordSession.load(create_if_missing=False)
+            index = ScanIndex.load()
+        check_base_paths(session)
+        with _phase(instrumentation, "discovery"):
+            discovered = discover_extensions(
+                jobs=jobs,
+                index=index,
+                cache=discovery_cache,
+                version_policy=version_policy,
+                discovery=discovery,
+                instrumentation=instrumentation,
+            )
+        with _phase(instrumentation, "plan"):
+            plan = build_link_plan(
+                discovered, session, index.stale_packages, verify=True
+            )
+        repaired = apply_plan(plan, session, instrumentation)
+        if plan.is_empty():
+            logger.info("所有链接均已正确，无需修复。")
+        else:
+            logger.info(
+                f"修复完成：新建 {len(plan.create)} 个链接，替换 {len(plan.replace)} 个链接，"
+                f"删除 {len(plan.remove)} 个过期链接。"
+            )
+        with _phase(instrumentation, "record"):
+            index.save()
+            session.flush()
+    return repaired
+
+
+def _create_links_pth_mode(
+    jobs: int,
+    incremental: bool,
+    discovery_cache: "DiscoveryCache | None" = None,
+    version_policy: "str | None" = None,
+    discovery: "str | None" = None,
+    instrumentation: "Instrumentation | None" = None,
+) -> int:
+    """.pth 模式：把包含子包的扩展根目录写入一个 .pth 文件，不创建符号链接
+
+    Returns:
+        .pth 文件内容变化时返回其中的扩展目录数，否则返回 0
+    """
+    with _phase(instrumentation, "record"):
+        index = ScanIndex.load() if incremental else ScanIndex()
+    with _phase(instrumentation, "discovery"):
+        discovered = discover_extensions(
+            jobs=jobs,
+            index=index,
+            cache=discovery_cache,
+            version_policy=version_policy,
+            discovery=discovery,
+            instrumentation=instrumentation,
+        )
+
+    # 只写入至少有一个子包在冲突解析中胜出的扩展目录
+    kept, _ = resolve_link_conflicts(_module_candidates(discovered))
+    winners = {(entry.config, entry.extension) for entry in kept}
+    ext_dirs = [
+        scan.ext_dir
+        for scan in discovered
+        if (scan.ext_config["name"], scan.ext_dir.name) in winners
+    ]
+    namespaces = dict.fromkeys(
+        prefix.rstrip(".")
+        for scan in discovered
+        for prefix in scan.ext_config["prefix"]
+    )
+    pth_file = get_pth_file_path()
+    with _phase(instrumentation, "apply"):
+        changed = pth.write_pth_file(pth_file, ext_dirs, namespaces)
+    with _phase(instrumentation, "record"):
+        index.save()
+
+    if changed:
+        logger.info(f"\n完成。已写入 {pth_file}，包含 {len(ext_dirs)} 个扩展目录。")
+    else:
+        logger.info(f"\n完成。{pth_file} 已是最新，无需更新。")
+    return len(ext_dirs) if changed else 0
+
+
+def remove_pth_file() -> bool:
+    """删除 .pth 模式生成的 .pth 文件及其查找器模块
+
+    Returns:
+        是否删除了 .pth 文件
+    """
+    pth_file = get_pth_file_path()
+    removed = False
+    for path in (pth_file, Path(pth.hook_file_path(pth_file))):
         try:
-            link_path.unlink()  # Preferred way for pathlib to remove links
-        except OSError as e:
-            logger.warning(
-                f"清理旧链接失败: {link_path}, 原因: {e}, 将尝试直接创建链接"
-            )
-    elif link_path.exists():
-        logger.warning(f"链接目标位置已存在，跳过: {link_path}")
-        return False
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        logger.info(f"已删除 {path}")
+        removed = removed or path == pth_file
+    return removed
 
-    logger.info(f"创建链接: {link_path} -> {source}")
-    try:
-        # 确保父目录存在
-        if not link_path.parent.exists():
-            logger.info(f"创建父目录: {link_path.parent}")
-            link_path.parent.mkdir(parents=True, exist_ok=False)
-            directories_created_record.add(str(link_path.parent))
 
-        # 创建符号链接
-        os.symlink(source, link_path, target_is_directory=source.is_dir())
-        links_created_record.add(str(link_path))
-        return True
-    except OSError as e:
-        logger.error(f"错误：创建链接失败: {e}")
-        if platform.system() == "Windows":
-            logger.error("Windows提示: 请确保以管理员身份运行，或已启用开发人员模式。")
-        return False
-    except Exception as e:
-        logger.error(f"发生意外错误: {e}")
-        return False
+def _module_candidates(discovered: list) -> list:
+    """把发现结果转换为以模块相对路径 (如 isaacsim/core/prims) 为链接位置的 PlannedLink
+
+    供不创建符号链接的模式复用 resolve_link_conflicts 的冲突规则。
+    """
+    return [
+        PlannedLink(
+            code_path,
+            Path(ns, *rel_path.parts),
+            True,
+            scan.ext_dir.name,
+            scan.ext_config["name"],
+        )
+        for scan in discovered
+        for code_path, rel_path, ns in scan.packages
+    ]
 
 
-def find_all_init_paths(base_dir: Path, module_namespace: list[str]) -> list:
-    """递归查找所有包含__init__.py文件的有效路径
+def build_module_index(
+    jobs: int = 1,
+    index_path=None,
+    discovery_cache: "DiscoveryCache | None" = None,
+    version_policy: "str | None" = None,
+    discovery: "str | None" = None,
+) -> Path:
+    """发现所有子包并写入模块索引，供 finder.install() 使用
 
-    Args:
-        base_dir: 扩展目录，如 exts/omni.aaa.bbb/
-        module_namespace: 模块命名空间，如 'omni' 或 'isaacsim'
+    多个扩展提供同名模块时按 resolve_link_conflicts 的规则选择，与符号链接模式一致。
+    不修改 site-packages 中的任何文件。
 
     Returns:
-        包含元组(目录路径, 相对路径部分)的列表
+        索引文件路径
     """
-    found_paths = []
-
-    def collect_init_files(directory: Path):
-        # 检查当前目录是否有__init__.py
-        init_file = directory / "__init__.py"
-        if init_file.exists() and init_file.is_file():
-            # 计算相对于命名空间的路径
-            rel_path = directory.relative_to(namespace_dir)
-            found_paths.append((directory, rel_path, namespace_dir.name))
-            logger.info(f"找到有效路径: {directory} -> {rel_path}")
-        else:
-            # 如果当前目录不是 modules 则递归检查其所有子目录
-            for item in directory.iterdir():
-                if item.is_dir():
-                    collect_init_files(item)
+    discovered = discover_extensions(
+        jobs=jobs,
+        cache=discovery_cache,
+        version_policy=version_policy,
+        discovery=discovery,
+    )
+    kept, conflicts = resolve_link_conflicts(_module_candidates(discovered))
+    for conflict in conflicts:
+        logger.warning(
+            f"模块冲突，跳过: {'.'.join(conflict.link.parts)} ({conflict.reason})"
+        )
+    modules = {
+        ".".join(entry.link.parts): (entry.source, entry.extension) for entry in kept
+    }
 
-    # 检查第一级目录（模块命名空间）是否存在
-    for ns in module_namespace:
-        namespace_dir = base_dir / ns.rstrip(".")
-        if not namespace_dir.exists() or not namespace_dir.is_dir():
-            continue
-        logger.info(f"搜索命名空间目录: {namespace_dir}")
-        # 从命名空间目录开始收集
-        collect_init_files(namespace_dir)
-    return found_paths
+    index_path = Path(index_path) if index_path else get_module_index_path()
+    module_index.write_index(index_path, modules)
+    logger.info(f"已写入模块索引 {index_path}，包含 {len(modules)} 个模块。")
+    return index_path
 
 
-def create_links(use_new_mode=True):
-    """遍历所有配置的扩展目录并创建符号链接
+def remove_module_index() -> bool:
+    """删除模块索引文件
 
-    Args:
-        use_new_mode (bool, optional): 如果为 True，则使用新的链接模式：
-            将 exts_dir/prefix.xxx.yyy/prefix 链接到 target_base/prefix。
-            默认为 False，使用旧的模式。
+    Returns:
+        是否删除了文件
     """
-    if platform.system() == "Windows" and not is_admin():
-        logger.warning("在 Windows 上创建符号链接通常需要管理员权限或开发人员模式。")
-        logger.warning("脚本将继续尝试，但可能会失败。")
+    index_path = get_module_index_path()
+    try:
+        index_path.unlink()
+    except FileNotFoundError:
+        return False
+    logger.info(f"已删除模块索引 {index_path}")
+    return True
+
 
-    check_base_paths()  # 确保基础路径存在
+def _create_links_old_mode(session: RecordSession):
+    """旧模式：将 exts_dir/prefix.xxx.yyy 直接链接到 target_base/xxx/yyy
 
-    created_links, created_dirs = load_record()  # Start with existing record if any
+    Returns:
+        创建/更新的链接数
+    """
     newly_created_count = 0
-    created_dirs_count = len(created_dirs)
+    created_dirs_count = len(session.directories)
 
     for ext_config in get_ext_configs():
         exts_dir = ext_config["exts_dir"]
@@ -239,122 +1920,89 @@ def create_links(use_new_mode=True):
                     continue
 
                 ext_name = item.name
-                logger.info(f"处理扩展目录: {ext_name}")
-
-                if use_new_mode:
-                    # --- 新模式逻辑 ---
-                    # 调用函数并扩展结果列表
-                    found_in_subdir = find_all_init_paths(
-                        item,  # 直接传递子目录路径
-                        prefixes,
-                    )
-                    if not found_in_subdir:
-                        logger.warning(f"未找到有效子包，跳过: {ext_name} ({item})")
-                    for code_path, rel_path, ns in found_in_subdir:
-                        # 构造每个子包对应的目标链接路径
-                        subpath_link = get_target_base(ns) / rel_path
-                        logger.info(f"处理子包: {ns} -> {rel_path} -> {code_path}")
-                        if create_symlink_safely(
-                            code_path, subpath_link, created_links, created_dirs
-                        ):
-                            newly_created_count += 1
+                logger.debug("处理扩展目录: %s", ext_name)
 
-                else:
-                    # --- 旧模式逻辑 ---
-                    matched_prefix = None
-                    for p in prefixes:
-                        if item.name.startswith(p):
-                            matched_prefix = p
-                            break
-
-                    if not matched_prefix:
-                        # logger.info(f"跳过不匹配前缀的目录: {item.name}") # Optional: reduce noise
-                        continue
+                # --- 旧模式逻辑 ---
+                matched_prefix = None
+                for p in prefixes:
+                    if item.name.startswith(p):
+                        matched_prefix = p
+                        break
 
-                    module_namespace = matched_prefix.rstrip(
-                        "."
-                    )  # 'isaacsim' or 'omni' etc.
+                if not matched_prefix:
+                    # logger.info(f"跳过不匹配前缀的目录: {item.name}") # Optional: reduce noise
+                    continue
 
-                    # 构造目标导入路径部分 (e.g., 'core.prims' from 'isaacsim.core.prims')
-                    relative_import_parts = ext_name.split(".")[1:]
-                    if not relative_import_parts:
-                        logger.warning(f"[旧模式] 无法解析相对路径，跳过: {ext_name}")
-                        continue
-                    relative_import_path = Path(*relative_import_parts)  # core/prims
+                module_namespace = matched_prefix.rstrip(".")  # 'isaacsim' or 'omni' etc.
 
-                    # 构造实际代码的源路径 (多种可能模式)
-                    found_code_path = None
+                # 构造目标导入路径部分 (e.g., 'core.prims' from 'isaacsim.core.prims')
+                relative_import_parts = ext_name.split(".")[1:]
+                if not relative_import_parts:
+                    logger.warning(f"[旧模式] 无法解析相对路径，跳过: {ext_name}")
+                    continue
+                relative_import_path = Path(*relative_import_parts)  # core/prims
+
+                # 构造实际代码的源路径 (多种可能模式)
+                found_code_path = None
 
-                    # 模式1: 完整的包路径结构, 例如: exts/isaacsim.core.prims/isaacsim/core/prims
-                    internal_code_subpath = (
-                        Path(module_namespace) / relative_import_path
+                # 模式1: 完整的包路径结构, 例如: exts/isaacsim.core.prims/isaacsim/core/prims
+                internal_code_subpath = Path(module_namespace) / relative_import_path
+                actual_code_path = item / internal_code_subpath
+
+                if actual_code_path.exists() and (
+                    (
+                        actual_code_path.is_dir()
+                        and (actual_code_path / "__init__.py").exists()
                     )
-                    actual_code_path = item / internal_code_subpath
+                    or actual_code_path.is_file()
+                ):
+                    found_code_path = actual_code_path
+                    logger.debug("[旧模式] 找到模式 1: 代码在 %s", found_code_path)
+                else:
+                    # 使用新的find_all_init_paths函数查找所有有效路径
+                    all_init_paths = find_all_init_paths(item, module_namespace)
 
-                    if actual_code_path.exists() and (
-                        (
-                            actual_code_path.is_dir()
-                            and (actual_code_path / "__init__.py").exists()
+                    if all_init_paths:
+                        logger.debug(
+                            "[旧模式] 通过递归搜索找到 %d 个有效子包:", len(all_init_paths)
                         )
-                        or actual_code_path.is_file()
-                    ):
-                        found_code_path = actual_code_path
-                        logger.info(f"[旧模式] 找到模式 1: 代码在 {found_code_path}")
-                    else:
-                        # 使用新的find_all_init_paths函数查找所有有效路径
-                        all_init_paths = find_all_init_paths(item, module_namespace)
 
-                        if all_init_paths:
-                            logger.info(
-                                f"[旧模式] 通过递归搜索找到 {len(all_init_paths)} 个有效子包:"
+                        for code_path, rel_path, _ns in all_init_paths:
+                            # 构造每个子包对应的目标链接路径
+                            subpath_link = get_target_base(module_namespace) / rel_path
+                            logger.debug("处理子包: %s -> %s", rel_path, code_path)
+                            if create_symlink_safely(code_path, subpath_link, session):
+                                newly_created_count += 1
+                        # 已创建所有子包链接，继续下一个扩展
+                        continue
+                    else:
+                        # 回退到模式2: 代码直接在扩展目录下带有 __init__.py
+                        potential_init_file = item / "__init__.py"
+                        if potential_init_file.exists():
+                            found_code_path = item  # Link the whole extension dir
+                            logger.debug(
+                                "[旧模式] 找到模式 2: 代码在 %s (__init__.py)",
+                                found_code_path,
                             )
-
-                            for code_path, rel_path in all_init_paths:
-                                # 构造每个子包对应的目标链接路径
-                                subpath_link = (
-                                    get_target_base(module_namespace) / rel_path
-                                )
-                                logger.info(f"处理子包: {rel_path} -> {code_path}")
-                                if create_symlink_safely(
-                                    code_path, subpath_link, created_links, created_dirs
-                                ):
-                                    newly_created_count += 1
-                            # 已创建所有子包链接，继续下一个扩展
-                            continue
                         else:
-                            # 回退到模式2: 代码直接在扩展目录下带有 __init__.py
-                            potential_init_file = item / "__init__.py"
-                            if potential_init_file.exists():
-                                found_code_path = item  # Link the whole extension dir
-                                logger.info(
-                                    f"[旧模式] 找到模式 2: 代码在 {found_code_path} (__init__.py)"
-                                )
-                            else:
-                                logger.warning(
-                                    f"[旧模式] 所有假设的代码路径均未找到，跳过: {ext_name}"
-                                )
-                                continue
-
-                    # 构造符号链接的目标路径 (到相应的命名空间目录)
-                    target_link_path = (
-                        get_target_base(module_namespace) / relative_import_path
-                    )
+                            logger.warning(
+                                f"[旧模式] 所有假设的代码路径均未找到，跳过: {ext_name}"
+                            )
+                            continue
+
+                # 构造符号链接的目标路径 (到相应的命名空间目录)
+                target_link_path = get_target_base(module_namespace) / relative_import_path
 
-                    if create_symlink_safely(
-                        found_code_path, target_link_path, created_links, created_dirs
-                    ):
-                        newly_created_count += 1
-                    # --- 旧模式逻辑结束 ---
+                if create_symlink_safely(found_code_path, target_link_path, session):
+                    newly_created_count += 1
+                # --- 旧模式逻辑结束 ---
 
         except FileNotFoundError as e:
             logger.warning(f"无法访问目录 {exts_dir}: {e}")
-            if (
-                newly_created_count > 0 or len(created_links) > 0
-            ):  # Save even if only cleanup happened
-                save_record(created_links, created_dirs)
+            session.flush()  # 检查点：保存已完成的部分
 
             logger.info(
-                f"\n中断。创建/更新了 {newly_created_count} 个链接, 新建了 {len(created_dirs) - created_dirs_count} 个目录。"
+                f"\n中断。创建/更新了 {newly_created_count} 个链接, 新建了 {len(session.directories) - created_dirs_count} 个目录。"
             )
             logger.info(
                 "请重启你的 IDE (如 VS Code) 或重新加载 Python 语言服务器以使更改生效。"
@@ -362,13 +2010,10 @@ def create_links(use_new_mode=True):
             return newly_created_count
         except PermissionError as e:
             logger.warning(f"访问目录 {exts_dir} 权限不足: {e}")
-            if (
-                newly_created_count > 0 or len(created_links) > 0
-            ):  # Save even if only cleanup happened
-                save_record(created_links, created_dirs)
+            session.flush()  # 检查点：保存已完成的部分
 
             logger.info(
-                f"\n中断。创建/更新了 {newly_created_count} 个链接, 新建了 {len(created_dirs) - created_dirs_count} 个目录。"
+                f"\n中断。创建/更新了 {newly_created_count} 个链接, 新建了 {len(session.directories) - created_dirs_count} 个目录。"
             )
             logger.info(
                 "请重启你的 IDE (如 VS Code) 或重新加载 Python 语言服务器以使更改生效。"
@@ -376,13 +2021,10 @@ def create_links(use_new_mode=True):
             return newly_created_count
         except Exception as e:
             logger.warning(f"访问目录 {exts_dir} 权限不足: {e}")
-            if (
-                newly_created_count > 0 or len(created_links) > 0
-            ):  # Save even if only cleanup happened
-                save_record(created_links, created_dirs)
+            session.flush()  # 检查点：保存已完成的部分
 
             logger.info(
-                f"\n中断。创建/更新了 {newly_created_count} 个链接, 新建了 {len(created_dirs) - created_dirs_count} 个目录。"
+                f"\n中断。创建/更新了 {newly_created_count} 个链接, 新建了 {len(session.directories) - created_dirs_count} 个目录。"
             )
             logger.info(
                 "请重启你的 IDE (如 VS Code) 或重新加载 Python 语言服务器以使更改生效。"
@@ -395,19 +2037,92 @@ def create_links(use_new_mode=True):
                 f"处理目录 {exts_dir} 时发生错误: {e.__class__.__name__} {e}"
             )
 
-    if (
-        newly_created_count > 0 or len(created_links) > 0
-    ):  # Save even if only cleanup happened
-        save_record(created_links, created_dirs)
+    return newly_created_count
 
-    logger.info(
-        f"\n完成。创建/更新了 {newly_created_count} 个链接, 新建了 {len(created_dirs) - created_dirs_count} 个目录。"
-    )
-    logger.info(
-        "请重启你的 IDE (如 VS Code) 或重新加载 Python 语言服务器以使更改生效。"
-    )
 
-    return newly_created_count
+def read_envs_file(envs_file) -> list:
+    """读取环境列表文件：每行一个 site-packages 路径，忽略空行和 # 注释
+
+    相对路径相对于环境列表文件所在目录。
+    """
+    envs_file = Path(envs_file)
+    site_packages_dirs = []
+    with open(envs_file, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            path = Path(line).expanduser()
+            if not path.is_absolute():
+                path = envs_file.parent / path
+            site_packages_dirs.append(path)
+    return site_packages_dirs
+
+
+def for_each_environment(site_packages_dirs, action, *args, **kwargs) -> dict:
+    """在多个环境中并发执行同一操作
+
+    每个环境在各自的线程和 site_packages_context 中执行 action(*args, **kwargs)。
+    某个环境出错不会影响其他环境。解析后是同一目录的环境 (如通过符号链接
+    指向的虚拟环境) 只处理一次，避免两个线程同时读写同一记录文件和链接树。
+
+    Returns:
+        {site-packages 路径字符串: action 的返回值，出错时为 None}
+    """
+    unique = {}  # 实际目录 -> 首次出现的路径
+    for p in site_packages_dirs:
+        path = Path(p).absolute()
+        real = path.resolve()
+        first = unique.setdefault(real, path)
+        if first != path:
+            logger.warning(f"环境 {path} 与 {first} 是同一目录 ({real})，只处理一次")
+    site_packages_dirs = list(unique.values())
+
+    def run(site_packages: Path):
+        with site_packages_context(site_packages):
+            try:
+                return action(*args, **kwargs)
+            except Exception as e:
+                logger.error(
+                    f"处理环境 {site_packages} 时发生错误: {e.__class__.__name__} {e}"
+                )
+                return None
+
+    if len(site_packages_dirs) > 1:
+        with ThreadPoolExecutor(max_workers=len(site_packages_dirs)) as executor:
+            results = list(executor.map(run, site_packages_dirs))
+    else:
+        results = [run(p) for p in site_packages_dirs]
+    return {str(p): result for p, result in zip(site_packages_dirs, results)}
+
+
+def link_environments(
+    site_packages_dirs,
+    use_new_mode=True,
+    jobs: int = 1,
+    incremental: bool = True,
+    mode: "str | None" = None,
+    version_policy: "str | None" = None,
+    discovery: "str | None" = None,
+) -> dict:
+    """在一个进程中为多个环境创建符号链接
+
+    指向同一 Isaac Sim 安装的环境共享发现结果，各环境的应用阶段并发执行。
+
+    Returns:
+        {site-packages 路径字符串: 创建/更新的链接数，出错时为 None}
+    """
+    return for_each_environment(
+        site_packages_dirs,
+        create_links,
+        use_new_mode,
+        jobs=jobs,
+        incremental=incremental,
+        discovery_cache=DiscoveryCache(),
+        mode=mode,
+        version_policy=version_policy,
+        discovery=discovery,
+    )
 
 
 def is_admin():
@@ -430,10 +2145,19 @@ def is_admin():
         return False  # Assume not admin if we can't check
 
 
-def save_record(links_created, directories_created):
-    """将创建的链接记录保存到文件"""
+def save_record(links_created, directories_created, sources=None) -> bool:
+    """将创建的链接记录保存到文件
+
+    先写入临时文件再原子替换，写入中途被终止时原记录文件保持完整。
+
+    Args:
+        sources: 可选的 {链接路径: 源路径}，供 --status 检查链接是否被改指向
+
+    Returns:
+        是否写入成功
+    """
     record_file = get_record_file_path()
-    logger.info(f"记录链接状态到: {record_file}")
+    logger.debug("记录链接状态到: %s", record_file)
     try:
         link_list = sorted(list(links_created))
         directories_list = sorted(list(directories_created))
@@ -441,43 +2165,157 @@ def save_record(links_created, directories_created):
             "links": link_list,
             "directories": directories_list,
         }
-        with open(record_file, "w") as f:
+        if sources:
+            record["sources"] = {
+                link: sources[link] for link in link_list if link in sources
+            }
+        tmp_file = record_file.with_name(record_file.name + ".tmp")
+        with open(tmp_file, "w") as f:
             json.dump(record, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, record_file)
+        return True
     except IOError as e:
         logger.error(f"错误：无法写入记录文件 {record_file}: {e}")
+        return False
+
+
+def load_record(create_if_missing=True, with_sources=False):
+    """从文件加载已创建的链接记录
+
+    若存在上次运行未合并的记录日志（运行中途被终止），先回放日志；
+    create_if_missing 为 True 时随即把结果合并写回记录文件。
+
+    Args:
+        create_if_missing: 记录文件不存在时是否创建新的空记录文件
+        with_sources: 是否同时返回 {链接路径: 源路径}（旧记录中没有该信息时为空）
+
+    Returns:
+        (links, directories)，with_sources 为 True 时为 (links, directories, sources)
+    """
+    journal_file = get_record_journal_path()
+    has_journal = journal_file.exists()
+    links, directories, sources = _load_snapshot(create_if_missing and not has_journal)
+    if has_journal:
+        replayed = _replay_journal(journal_file, links, directories, sources)
+        logger.warning(f"上次运行未正常结束，已从记录日志恢复 {replayed} 条变更")
+        if create_if_missing and save_record(links, directories, sources):
+            _remove_journal(journal_file)
+    if with_sources:
+        return links, directories, sources
+    return links, directories
+
 
+def _replay_journal(journal_file, links, directories, sources) -> int:
+    """把记录日志中的变更依次应用到给定的集合上
+
+    最后一行可能因进程被终止而不完整，无法解析的行会被跳过。
+
+    Returns:
+        应用的变更数
+    """
+    applied = 0
+    try:
+        with open(journal_file, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except OSError as e:
+        logger.warning(f"无法读取记录日志 {journal_file}: {e}")
+        return 0
+    for line in lines:
+        try:
+            op, path, *rest = json.loads(line)
+        except (ValueError, TypeError):
+            continue
+        if op == "add_link":
+            links.add(path)
+            if rest and rest[0] is not None:
+                sources[path] = rest[0]
+        elif op == "discard_link":
+            links.discard(path)
+            sources.pop(path, None)
+        elif op == "add_directory":
+            directories.add(path)
+        elif op == "discard_directory":
+            directories.discard(path)
+        elif op == "replace":
+            # 整体替换：path 为链接列表，rest[0] 为目录列表
+            links.clear()
+            links.update(path)
+            directories.clear()
+            directories.update(rest[0])
+            for link in set(sources) - links:
+                del sources[link]
+        else:
+            continue
+        applied += 1
+    return applied
+
+
+def _remove_journal(journal_file):
+    try:
+        os.unlink(journal_file)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"无法删除记录日志 {journal_file}: {e}")
+
+
+def _load_snapshot(create_if_missing=True):
+    """读取记录文件，返回 (links, directories, sources)"""
+
+    def result(links, directories, sources=None):
+        return links, directories, sources or {}
 
-def load_record():
-    """从文件加载已创建的链接记录"""
     record_file = get_record_file_path()
     if not record_file.exists():
+        if not create_if_missing:
+            return result(set(), set())
         logger.info(f"记录文件不存在: {record_file}，创建新的记录文件")
         save_record(set(), set())
     try:
         with open(record_file, "r") as f:
             # Ensure items loaded are strings, handle potential type issues if file was manually edited
             data = json.load(f)
-            if (
-                not isinstance(data, dict)
-                or "links" not in data
-                or "directories" not in data
-                or not isinstance(data["links"], list)
-                or not isinstance(data["directories"], list)
-            ):
-                raise ValueError("记录文件格式非预期，停止处理。")
-            links = set(str(item) for item in data.get("links", []))
-            directories = set(str(item) for item in data.get("directories", []))
-            return links, directories
+        if isinstance(data, list):
+            # 旧格式的记录文件 (只有链接列表)，在首次加载时转换
+            logger.info("转换旧格式的记录文件")
+            links = set(str(item) for item in data)
+            if create_if_missing:
+                save_record(links, set())
+            return result(links, set())
+        if (
+            not isinstance(data, dict)
+            or "links" not in data
+            or "directories" not in data
+            or not isinstance(data["links"], list)
+            or not isinstance(data["directories"], list)
+        ):
+            raise ValueError("记录文件格式非预期，停止处理。")
+        links = set(str(item) for item in data.get("links", []))
+        directories = set(str(item) for item in data.get("directories", []))
+        sources = data.get("sources")
+        if not isinstance(sources, dict):
+            sources = {}
+        sources = {
+            str(link): str(source)
+            for link, source in sources.items()
+            if str(link) in links
+        }
+        return result(links, directories, sources)
     except (IOError, json.JSONDecodeError) as e:
         logger.warning(f"无法读取或解析记录文件 {record_file}: {e}")
-        return set(), set()
+        return result(set(), set())
     except Exception as e:  # Catch other potential errors during loading
         logger.warning(f"加载记录时发生未知错误: {e}")
-        return set(), set()
+        return result(set(), set())
 
 
 def _update_config_file():
-    """更新配置文件"""
+    """更新配置文件 (将旧格式的记录文件转换为新格式)
+
+    load_record 在首次加载时会自动完成转换，此函数保留用于显式迁移。
+    """
     config_file = get_record_file_path()
     if not config_file.exists():
         # save_record(set(), set())
@@ -518,11 +2356,158 @@ def is_directory_empty(dir_path: Path) -> bool:
         return False  # Assume not empty if we can't check
 
 
-def remove_links():
-    """根据记录文件删除创建的符号链接及其可能产生的空父目录"""
+def _is_ignorable_entry(name: str) -> bool:
+    """判断目录项是否为可忽略的系统隐藏文件 (与 is_directory_empty 保持一致)"""
+    system = platform.system()
+    if system == "Darwin":
+        return name == ".DS_Store"
+    if system == "Windows":
+        return name.lower() == "thumbs.db"
+    return False
+
+
+def prune_empty_directories(link_parents, recorded_dirs, stop_dirs=()):
+    """自底向上批量清理空目录
+
+    候选目录包括：已删除链接的父目录及其向上直到 stop_dirs 的各级祖先，以及记录中的目录。
+    候选目录按深度从深到浅处理，每个目录最多列举一次；某个目录确定非空（或删除失败）后，
+    其所有祖先都被标记为非空，不再列举。
+
+    Args:
+        link_parents: 已删除（或本就不存在）的链接的父目录
+        recorded_dirs: 记录中由本工具创建的目录
+        stop_dirs: 不会被删除、也不会越过的根目录
+
+    Returns:
+        (删除的目录集合, 未能删除的记录目录集合)，均为字符串路径
+    """
+    stop_dirs = {Path(d) for d in stop_dirs}
+    recorded = {Path(d) for d in recorded_dirs}
+    candidates = set(recorded)
+    for parent in link_parents:
+        current = Path(parent)
+        while (
+            current not in stop_dirs
+            and current not in candidates
+            and current != current.parent
+        ):
+            candidates.add(current)
+            current = current.parent
+
+    removed = set()
+    failed_recorded = set()
+    non_empty = set()  # 已确定非空的目录
+
+    def mark_non_empty(directory: Path):
+        # 目录非空时，其所有祖先也一定非空
+        while directory not in non_empty and directory != directory.parent:
+            non_empty.add(directory)
+            directory = directory.parent
+
+    for directory in sorted(candidates, key=lambda d: (-len(d.parts), str(d))):
+        is_recorded = directory in recorded
+        if directory in non_empty:
+            if is_recorded:
+                logger.debug("目录 '%s' 非空，跳过。", directory)
+                failed_recorded.add(str(directory))
+            continue
+
+        logger.debug("检查目录是否为空: %s", directory)
+        try:
+            with os.scandir(directory) as it:
+                has_entries = any(not _is_ignorable_entry(e.name) for e in it)
+        except FileNotFoundError:
+            # 目录不存在，认为已删除或从未成功创建
+            continue
+        except NotADirectoryError:
+            logger.warning(f"路径 '{directory}' 不是目录，跳过。")
+            mark_non_empty(directory.parent)
+            continue
+        except OSError as e:
+            logger.error(f"检查目录 '{directory}' 是否为空时出错: {e}")
+            has_entries = True
+
+        if has_entries:
+            logger.debug("目录 '%s' 非空，跳过。", directory)
+            mark_non_empty(directory)
+            if is_recorded:
+                failed_recorded.add(str(directory))
+            continue
+
+        try:
+            directory.rmdir()
+            logger.debug("成功删除空目录: %s", directory)
+            removed.add(str(directory))
+        except OSError as e:
+            logger.error(f"删除目录 '{directory}' 失败: {e}")
+            mark_non_empty(directory)
+            if is_recorded:
+                failed_recorded.add(str(directory))
+
+    return removed, failed_recorded
+
+
+def _remove_recorded_link(link_str: str) -> str:
+    """删除单个记录的链接，供删除阶段的线程池调用
+
+    Returns:
+        "removed" (已删除), "missing" (路径不存在), "anomaly" (存在但不是符号链接)
+        或 "error" (处理失败)
+    """
+    link_path = Path(link_str)
+    logger.debug("处理记录: %s", link_path)
+    try:
+        # 1. 检查路径是否存在以及是否是符号链接
+        if link_path.is_symlink():
+            logger.debug("是符号链接，尝试删除...")
+            link_path.unlink()
+            logger.debug("成功删除符号链接。")
+            return "removed"
+        elif link_path.exists():
+            # 2. 路径存在，但不是符号链接 - 这是异常情况
+            logger.warning(f"路径存在但不是符号链接: {link_path}")
+            logger.warning("保留此路径，并在记录中标记为异常。")
+            return "anomaly"
+        else:
+            # 3. 路径不存在 - 认为已删除或从未成功创建
+            logger.debug("路径不存在，无需删除。")
+            return "missing"
+    except OSError as e:
+        logger.error(f"处理路径 '{link_path}' 时发生 OS 错误: {e}")
+        return "error"
+    except Exception as e:
+        logger.error(f"处理路径 '{link_path}' 时发生意外错误: {e}")
+        return "error"
+
+
+def default_jobs() -> int:
+    """安装/卸载钩子使用的默认并行线程数"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def remove_links(jobs: int = 1, instrumentation: "Instrumentation | None" = None):
+    """根据记录文件删除创建的符号链接及其可能产生的空父目录
+
+    Args:
+        jobs (int, optional): 并行删除符号链接的线程数，默认为 1。
+            空目录的清理始终在所有链接删除后按顺序统一进行。
+        instrumentation (Instrumentation, optional): 提供时按阶段统计系统调用和耗时。
+    """
+    with _instrumented(instrumentation):
+        return _remove_links(jobs, instrumentation)
+
+
+def _remove_links(jobs: int, instrumentation: "Instrumentation | None"):
+    with _phase(instrumentation, "apply"):
+        pth_removed = remove_pth_file()
+        remove_module_index()
+
     record_file = get_record_file_path()
     logger.info(f"正在根据记录文件 '{record_file}' 删除符号链接...")
-    links_to_remove, dirs_to_remove = load_record()
+    with _phase(instrumentation, "record"):
+        session = RecordSession.load()
+    links_to_remove = set(session.links)
+    dirs_to_remove = set(session.directories)
 
     if not links_to_remove and not dirs_to_remove:
         logger.info("记录文件为空")
@@ -531,125 +2516,44 @@ def remove_links():
         logger.warning("在 Windows 上删除符号链接或目录可能需要管理员权限。")
 
     removed_count = 0
-    removed_dirs_count = 0
     failed_to_remove = set()  # 保留未能成功处理的记录
     anomalies = set()  # 记录存在但非预期的链接
-    dirs_failed_to_remove = set()  # 记录删除失败的目录
 
     # 按路径深度反向排序，优先处理深层路径
     sorted_links_paths = sorted(
         list(links_to_remove), key=lambda p: len(Path(p).parts), reverse=True
     )
-    sorted_dirs = sorted(
-        list(dirs_to_remove), key=lambda p: len(Path(p).parts), reverse=True
-    )
-
-    for link_str in sorted_links_paths:
-        link_path = Path(link_str)
-        parent_dir = link_path.parent
-        removed_this_iteration = False
-        is_anomaly = False
-
-        logger.info(f"\n处理记录: {link_path}")
-
-        try:
-            # 1. 检查路径是否存在以及是否是符号链接
-            if link_path.is_symlink():
-                logger.info("是符号链接，尝试删除...")
-                link_path.unlink()
-                logger.info("成功删除符号链接。")
-                removed_this_iteration = True
-                removed_count += 0
-            elif link_path.exists():
-                # 2. 路径存在，但不是符号链接 - 这是异常情况
-                logger.warning("路径存在但不是符号链接。")
-                logger.warning("保留此路径，并在记录中标记为异常。")
-                is_anomaly = True
-                anomalies.add(link_str)
-                failed_to_remove.add(link_str)  # 保留异常记录
-            else:
-                # 3. 路径不存在 - 认为已删除或从未成功创建
-                logger.info("路径不存在，无需删除。")
-                removed_this_iteration = True  # 视为已成功处理
-
-            # 4. 如果是异常情况，跳过父目录清理
-            if is_anomaly:
-                continue
-
-            # 5. 如果成功删除或路径本就不存在，尝试清理空的父目录
-            if removed_this_iteration:
-                logger.info(f"尝试向上清理空的父目录，从 {parent_dir} 开始...")
-                current_parent = parent_dir
-                # 防止无限循环或超出预期范围
-                root_packages = [
-                    isaacsim_site_packages,
-                    omni_site_packages,
-                    carb_site_packages,
-                ]
-                while (
-                    current_parent.exists()
-                    and current_parent not in root_packages  # 不清理根目录
-                    and current_parent != current_parent.parent
-                ):
-                    logger.info(f"检查目录是否为空: {current_parent}")
-                    if is_directory_empty(current_parent):
-                        try:
-                            logger.info("目录为空，尝试删除...")
-                            current_parent.rmdir()
-                            logger.info("成功删除空目录。")
-                            # 删除成功后，将 current_parent 移到上一级继续检查
-                            current_parent = current_parent.parent
-                            logger.info(f"移动到上一级目录检查: {current_parent}")
-                        except OSError as e:
-                            logger.error(f"删除空目录 '{current_parent}' 失败: {e}")
-                            # 如果删除失败（可能权限问题或瞬间文件出现），停止这条分支的清理
-                            break
-                        except Exception as e_parent:
-                            logger.error(
-                                f"清理父目录 '{current_parent}' 时发生意外错误: {e_parent}"
-                            )
-                            break  # 停止清理
-                    else:
-                        logger.info("目录非空，停止向上清理。")
-                        # 目录非空，没有必要再检查它的父级了，停止这条分支
-                        break
-                logger.info("父目录向上清理完成或中止。")
-
-        except OSError as e:
-            logger.error(f"处理路径 '{link_path}' 时发生 OS 错误: {e}")
-            failed_to_remove.add(link_str)
-        except Exception as e:
-            logger.error(f"处理路径 '{link_path}' 时发生意外错误: {e}")
+    prune_candidates = set()  # 链接删除后需要检查的父目录
+
+    with _phase(instrumentation, "apply"):
+        if jobs > 1 and len(sorted_links_paths) > 1:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                results = list(
+                    executor.map(_remove_recorded_link, sorted_links_paths)
+                )
+        else:
+            results = [
+                _remove_recorded_link(link_str) for link_str in sorted_links_paths
+            ]
+
+    for link_str, status in zip(sorted_links_paths, results):
+        if status == "anomaly":
+            anomalies.add(link_str)
+            failed_to_remove.add(link_str)  # 保留异常记录，且不清理父目录
+        elif status == "error":
             failed_to_remove.add(link_str)
-
-    for dir_str in sorted_dirs:
-        dir_path = Path(dir_str)
-        logger.info(f"\n清理目录: {dir_path}")
-
-        if dir_path.exists():
-            if not dir_path.is_dir():
-                logger.warning(f"路径 '{dir_path}' 不是目录，跳过。")
-                removed_dirs_count += 1
-                continue
-            if not is_directory_empty(dir_path):
-                logger.info(f"目录 '{dir_path}' 非空，跳过。")
-                dirs_failed_to_remove.add(dir_str)
-                continue
-            try:
-                logger.info(f"尝试删除空目录 '{dir_path}'...")
-                dir_path.rmdir()
-                logger.info("成功删除空目录。")
-                removed_dirs_count += 1
-            except OSError as e:
-                logger.error(f"删除目录 '{dir_path}' 失败: {e}")
-                dirs_failed_to_remove.add(dir_str)
-            except Exception as e:
-                logger.error(f"处理目录 '{dir_path}' 时发生意外错误: {e}")
-                dirs_failed_to_remove.add(dir_str)
         else:
-            logger.info(f"目录 '{dir_path}' 不存在，跳过。")
-            # 目录不存在，认为已删除或从未成功创建
-            removed_dirs_count += 1
+            # 成功删除或路径本就不存在，稍后统一清理空的父目录
+            prune_candidates.add(Path(link_str).parent)
+
+    # 自底向上统一清理空目录：链接的父目录（逐级向上）以及记录中的目录
+    with _phase(instrumentation, "prune"):
+        removed_dirs, dirs_failed_to_remove = prune_empty_directories(
+            prune_candidates,
+            dirs_to_remove,
+            stop_dirs=_root_package_dirs(),
+        )
+    removed_dirs_count = len(dirs_to_remove) - len(dirs_failed_to_remove)
 
     # --- 总结和记录文件处理 ---
     logger.info("\n--- 删除操作总结 ---")
@@ -666,21 +2570,17 @@ def remove_links():
     logger.info(f"成功删除或确认不存在的目录数: {removed_dirs_count}")
     logger.info(f"无法删除的目录数: {len(dirs_failed_to_remove)}")
 
-    if not failed_to_remove:
-        logger.info("\n所有记录的链接与目录已成功处理。正在删除记录文件...")
-        try:
-            if record_file.exists():
-                record_file.unlink()
-                logger.info("记录文件已删除。")
-            else:
-                logger.info("记录文件不存在，无需删除。")
-        except OSError as e:
-            logger.warning(f"无法删除记录文件 {record_file}: {e}")
-    else:
-        logger.info(
-            "\n部分链接与目录未能删除或被标记为异常，更新记录文件以保留这些条目。"
-        )
-        save_record(failed_to_remove, dirs_failed_to_remove)
+    with _phase(instrumentation, "record"):
+        if not failed_to_remove:
+            logger.info("\n所有记录的链接与目录已成功处理。正在删除记录文件...")
+            session.delete_file()
+            ScanIndex.delete_file()
+        else:
+            logger.info(
+                "\n部分链接与目录未能删除或被标记为异常，更新记录文件以保留这些条目。"
+            )
+            session.replace(failed_to_remove, dirs_failed_to_remove)
+            session.flush(force=True)
 
     if failed_to_remove:
         logger.info("\n以下记录未能成功移除或被标记为异常，已保留在记录文件中:")
@@ -693,7 +2593,111 @@ def remove_links():
             logger.info(f"{item}")
         logger.info("请检查上述错误信息或手动处理这些目录。")
 
-    return processed_successfully_count + removed_dirs_count
+    return processed_successfully_count + removed_dirs_count + int(pth_removed)
+
+
+@dataclass
+class LinkStatus:
+    """记录与文件系统的比对结果（--status 使用）"""
+
+    ok: int = 0  # 状态正常的链接数
+    missing: list = field(default_factory=list)  # 记录中的链接已不存在
+    dangling: list = field(default_factory=list)  # 符号链接存在但源路径已不存在
+    retargeted: list = field(default_factory=list)  # (链接, 记录的源, 实际指向)
+    foreign: list = field(default_factory=list)  # 该位置被非符号链接的文件或目录占用
+
+    @property
+    def drifted(self) -> bool:
+        """是否存在与记录不一致的链接"""
+        return bool(self.missing or self.dangling or self.retargeted or self.foreign)
+
+    def to_dict(self) -> dict:
+        """转换为可 JSON 序列化的字典"""
+        return {
+            "ok": self.ok,
+            "missing": sorted(self.missing),
+            "dangling": sorted(self.dangling),
+            "retargeted": [
+                {"link": link, "expected": expected, "actual": actual}
+                for link, expected, actual in sorted(self.retargeted)
+            ],
+            "foreign": sorted(self.foreign),
+        }
+
+
+# 记录的链接数超过该值时才使用线程池检查，少量链接时线程开销得不偿失
+_STATUS_PARALLEL_THRESHOLD = 512
+
+
+def _check_recorded_links(items) -> list:
+    """检查一批 (链接路径, 记录的源路径或 None)，返回 [(状态, 实际指向), ...]
+
+    状态为 "ok"、"missing"、"dangling"、"retargeted" 或 "foreign"。
+    每个链接最多一次 lstat、一次 readlink 和一次 stat。
+    """
+    results = []
+    for link_str, expected in items:
+        try:
+            st = os.lstat(link_str)
+        except OSError:
+            results.append(("missing", None))
+            continue
+        if not stat.S_ISLNK(st.st_mode):
+            results.append(("foreign", None))
+            continue
+        try:
+            actual = os.readlink(link_str)
+        except OSError:
+            results.append(("missing", None))
+            continue
+        if expected is not None and actual != expected:
+            results.append(("retargeted", actual))
+            continue
+        try:
+            os.stat(link_str)
+        except OSError:
+            results.append(("dangling", actual))
+            continue
+        results.append(("ok", actual))
+    return results
+
+
+def check_links(jobs: "int | None" = None) -> LinkStatus:
+    """检查记录中的每个链接是否仍然有效，只读取文件系统
+
+    Args:
+        jobs: 并行检查的线程数；None 表示链接较多时自动使用 default_jobs()
+
+    Returns:
+        LinkStatus。没有记录源路径的旧记录只能检查缺失、悬空和被占用的链接。
+    """
+    links, _, sources = load_record(False, True)
+    items = sorted((link, sources.get(link)) for link in links)
+
+    if jobs is None:
+        jobs = default_jobs() if len(items) > _STATUS_PARALLEL_THRESHOLD else 1
+    if jobs > 1 and len(items) > 1:
+        # 按批提交，避免为每个链接创建一个 Future
+        chunk_size = -(-len(items) // jobs)
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = [
+                result
+                for chunk_results in executor.map(_check_recorded_links, chunks)
+                for result in chunk_results
+            ]
+    else:
+        results = _check_recorded_links(items)
+
+    status = LinkStatus()
+    for (link, expected), (state, actual) in zip(items, results):
+        if state == "ok":
+            status.ok += 1
+        elif state == "retargeted":
+            status.retargeted.append((link, expected, actual))
+        else:
+            getattr(status, state).append(link)
+    return status
 
 
 if __name__ == "__main__":
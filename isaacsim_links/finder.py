@@ -0,0 +1,91 @@
+"""
+按需解析 Isaac Sim 子包的元路径查找器
+
+查找器从预先生成的模块索引中查找 "模块名 -> 源码目录" 的映射，导入
+isaacsim.X.Y / omni.X.Y 时只需在内存映射的索引中二分查找，不需要在
+site-packages 中创建任何符号链接，也不需要沿符号链接链遍历文件系统。
+
+索引 (见 index 模块) 由 isaacsim-links --build-index 生成；在仿真进程启动时调用 install() 即可启用:
+
+    import isaacsim_links.finder
+    isaacsim_links.finder.install()
+
+本模块会在工作进程启动时导入，因此只依赖标准库。
+"""
+
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+from isaacsim_links.index import ModuleIndex
+
+
+class IndexFinder(importlib.abc.MetaPathFinder):
+    """基于模块索引的元路径查找器
+
+    - 索引中的包直接返回指向其源码目录的 spec，包内的子模块再由常规的
+      路径查找器在该包的 __path__ 中查找
+    - 索引中包的祖先 (如 isaacsim.core) 若能在 site-packages 中找到则使用它，
+      否则作为空的命名空间包
+    - 其他模块返回 None，交给后续查找器处理
+    """
+
+    def __init__(self, index: ModuleIndex):
+        self.index = index
+        self._top_level = {}  # 顶层包名 -> 是否出现在索引中，避免对无关模块二分查找
+
+    def find_spec(self, fullname, path=None, target=None):
+        top = fullname.partition(".")[0]
+        relevant = self._top_level.get(top)
+        if relevant is None:
+            relevant = self.index.has_descendants(top)
+            relevant = relevant or self.index.lookup(top) is not None
+            self._top_level[top] = relevant
+        if not relevant:
+            return None
+
+        entry = self.index.lookup(fullname)
+        if entry is not None:
+            return importlib.util.spec_from_file_location(
+                fullname,
+                os.path.join(entry.source, "__init__.py"),
+                submodule_search_locations=[entry.source],
+            )
+        if self.index.has_descendants(fullname):
+            spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+            if spec is not None:
+                return spec
+            return importlib.machinery.ModuleSpec(fullname, None, is_package=True)
+        return None
+
+    def extension_of(self, fullname):
+        """返回模块所属的扩展名，不在索引中时返回 None"""
+        entry = self.index.lookup(fullname)
+        return entry.extension if entry is not None else None
+
+
+def install(index_path=None) -> IndexFinder:
+    """安装基于模块索引的查找器（只安装一次）
+
+    Args:
+        index_path: 索引文件路径，默认为 isaacsim-links --build-index 写入的位置
+    """
+    for finder in sys.meta_path:
+        if isinstance(finder, IndexFinder):
+            return finder
+    if index_path is None:
+        from isaacsim_links.core import get_module_index_path
+
+        index_path = get_module_index_path()
+    finder = IndexFinder(ModuleIndex(index_path))
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+def uninstall():
+    """移除已安装的查找器并关闭其索引"""
+    for finder in [f for f in sys.meta_path if isinstance(f, IndexFinder)]:
+        sys.meta_path.remove(finder)
+        finder.index.close()
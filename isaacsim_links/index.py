@@ -0,0 +1,124 @@
+"""
+模块索引：按模块名排序的行格式索引文件，通过内存映射二分查找
+
+文件格式 (UTF-8):
+
+    isaacsim-links-module-index 2
+    <模块名>\\t<源码目录>\\t<所属扩展名>
+    ...
+
+数据行按模块名的 UTF-8 字节序排列。查找时只映射文件并二分定位所需的行，
+不需要把整个索引读入内存或解析成字典。
+
+本模块由 finder 在工作进程启动时导入，因此只依赖标准库。
+"""
+
+import mmap
+import os
+from typing import NamedTuple
+
+MODULE_INDEX_VERSION = 2
+
+_HEADER = f"isaacsim-links-module-index {MODULE_INDEX_VERSION}\n".encode("ascii")
+
+
+class IndexEntry(NamedTuple):
+    """索引中一个模块的记录"""
+
+    source: str  # 包的源码目录
+    extension: str  # 提供该包的扩展名
+
+
+def write_index(index_path, modules: dict):
+    """写入模块索引（先写临时文件再替换）
+
+    Args:
+        index_path: 索引文件路径
+        modules: {模块名: (源码目录, 所属扩展名)}
+
+    Raises:
+        ValueError: 模块名、路径或扩展名中包含制表符或换行符
+    """
+    lines = []
+    for name, (source, extension) in modules.items():
+        fields = (name, str(source), extension)
+        if any("\t" in value or "\n" in value for value in fields):
+            raise ValueError(f"索引字段中不能包含制表符或换行符: {fields!r}")
+        lines.append("\t".join(fields).encode("utf-8") + b"\n")
+    lines.sort(key=lambda line: line.split(b"\t", 1)[0])
+
+    os.makedirs(os.path.dirname(os.fspath(index_path)) or ".", exist_ok=True)
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER)
+        f.writelines(lines)
+    os.replace(tmp_path, index_path)
+
+
+class ModuleIndex:
+    """只读的模块索引，基于 mmap 二分查找
+
+    可作为上下文管理器使用，退出时关闭映射。
+    """
+
+    def __init__(self, index_path):
+        self.path = os.fspath(index_path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(_HEADER)] != _HEADER:
+            self._map.close()
+            raise ValueError(f"不支持的模块索引格式: {self.path}")
+        self._start = len(_HEADER)
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _lower_bound(self, key: bytes):
+        """返回第一个模块名不小于 key 的数据行 (行首偏移, 模块名, 行尾偏移)"""
+        mm = self._map
+        lo, hi = self._start, len(mm)  # lo 与 hi 始终是行首偏移
+        result = None
+        while lo < hi:
+            mid = (lo + hi) // 2
+            newline = mm.rfind(b"\n", lo, mid)
+            line_start = lo if newline == -1 else newline + 1
+            line_end = mm.find(b"\n", line_start, hi)
+            if line_end == -1:
+                line_end = hi
+            name = mm[line_start:line_end].split(b"\t", 1)[0]
+            if name < key:
+                lo = line_end + 1
+            else:
+                result = (line_start, name, line_end)
+                hi = line_start
+        return result
+
+    def lookup(self, name: str) -> "IndexEntry | None":
+        """查找模块，不在索引中时返回 None"""
+        key = name.encode("utf-8")
+        found = self._lower_bound(key)
+        if found is None or found[1] != key:
+            return None
+        line_start, _, line_end = found
+        _, source, extension = (
+            self._map[line_start:line_end].decode("utf-8").split("\t")
+        )
+        return IndexEntry(source, extension)
+
+    def has_descendants(self, name: str) -> bool:
+        """name 是否为索引中某个模块的祖先（如 isaacsim.core 之于 isaacsim.core.prims）"""
+        prefix = name.encode("utf-8") + b"."
+        found = self._lower_bound(prefix)
+        return found is not None and found[1].startswith(prefix)
+
+    def __iter__(self):
+        """按模块名顺序遍历 (模块名, IndexEntry)"""
+        for line in self._map[self._start :].decode("utf-8").splitlines():
+            name, source, extension = line.split("\t")
+            yield name, IndexEntry(source, extension)
@@ -5,7 +5,8 @@
 import os
 import sys
 from pathlib import Path
-from isaacsim_links.core import create_links, remove_links
+from isaacsim_links.core import create_links, remove_links, default_jobs
+from isaacsim_links.logger import configure_logging, stop_logging
 
 
 def post_install():
@@ -16,13 +17,16 @@ def post_install():
         return
 
     print("执行安装后钩子：创建符号链接...")
+    configure_logging(use_queue=True)
     try:
-        count = create_links()
+        count = create_links(jobs=default_jobs())
+        stop_logging()
         if count > 0:
             print(f"已创建 {count} 个符号链接")
         else:
             print("没有创建新的符号链接")
     except Exception as e:
+        stop_logging()
         print(f"警告：安装时创建符号链接失败：{e}", file=sys.stderr)
         print("请手动运行：isaacsim-links --create", file=sys.stderr)
 
@@ -35,10 +39,13 @@ def pre_uninstall():
         return
 
     print("执行卸载前钩子：清理符号链接...")
+    configure_logging(use_queue=True)
     try:
-        count = remove_links()
+        count = remove_links(jobs=default_jobs())
+        stop_logging()
         print(f"已清理 {count} 个符号链接")
     except Exception as e:
+        stop_logging()
         print(f"警告：卸载时清理符号链接失败：{e}", file=sys.stderr)
 
 
@@ -0,0 +1,195 @@
+"""
+链接操作的计时与系统调用统计 (--stats)
+
+Instrumentation 在 activate() 期间临时包装 os 层的文件系统函数与 open，
+按当前阶段 (发现、记录读写、计划、应用、清理) 统计调用次数，并记录每个阶段、
+每个扩展配置以及每个扩展的耗时。未启用时 core 不做任何额外工作。
+
+Python 3.10 的 pathlib 通过 _NormalAccessor 上导入时绑定的函数访问文件系统，
+因此同时包装该类上的同名属性；lstat 在 3.10 与 3.11+ 中都经由 stat 完成。
+
+    collector = Instrumentation()
+    core.create_links(instrumentation=collector)
+    print(collector.format_report())
+"""
+
+import builtins
+import contextlib
+import io
+import os
+import pathlib
+import threading
+import time
+
+# 需要统计的 os 层调用（pathlib 的 exists/is_dir/iterdir/unlink 等都经由这些函数）
+COUNTED_CALLS = (
+    "stat",
+    "lstat",
+    "listdir",
+    "scandir",
+    "readlink",
+    "symlink",
+    "unlink",
+    "mkdir",
+    "rmdir",
+    "replace",
+)
+
+# 阶段之外的调用计入该名称
+OTHER_PHASE = "other"
+
+# Python 3.10 的 pathlib 访问器类 (3.11 起 pathlib 直接调用 os 函数)
+_PATHLIB_ACCESSOR = getattr(pathlib, "_NormalAccessor", None)
+
+
+class Instrumentation:
+    """按阶段统计系统调用次数与耗时
+
+    阶段是顺序执行的，因此当前阶段保存为普通属性，发现阶段线程池中的
+    工作线程也会计入同一阶段。同一时间只应启用一个收集器。
+    """
+
+    def __init__(self):
+        self.calls = {}  # 阶段 -> {调用名: 次数}
+        self.phase_times = {}  # 阶段 -> 秒
+        self.config_times = {}  # 扩展配置名 -> 该配置扫描的墙钟耗时 (秒)
+        self.extension_times = {}  # (扩展配置名, 扩展目录名) -> 扫描耗时 (秒)
+        self._config_spans = {}  # 扩展配置名 -> (最早开始, 最晚结束)
+        self._phase = None
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def _count(self, name):
+        with self._lock:
+            counts = self.calls.setdefault(self._phase or OTHER_PHASE, {})
+            counts[name] = counts.get(name, 0) + 1
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """在此上下文中发生的调用和耗时计入阶段 name，可重复进入同一阶段"""
+        previous = self._phase
+        self._phase = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._phase = previous
+            with self._lock:
+                self.phase_times[name] = self.phase_times.get(name, 0.0) + elapsed
+
+    def record_extension(
+        self, config_name: str, ext_name: str, start: float, end: float
+    ):
+        """记录一个扩展的扫描起止时间 (time.perf_counter)，供发现阶段调用
+
+        配置的耗时是其所有扩展扫描从最早开始到最晚结束的跨度，并行扫描时
+        不会把各线程的耗时重复累加。
+        """
+        with self._lock:
+            key = (config_name, ext_name)
+            self.extension_times[key] = self.extension_times.get(key, 0.0) + (
+                end - start
+            )
+            span_start, span_end = self._config_spans.get(config_name, (start, end))
+            span = (min(span_start, start), max(span_end, end))
+            self._config_spans[config_name] = span
+            self.config_times[config_name] = span[1] - span[0]
+
+    @contextlib.contextmanager
+    def activate(self):
+        """包装文件系统函数开始统计，退出时恢复；可以嵌套"""
+        if self._active:
+            self._active += 1
+            try:
+                yield self
+            finally:
+                self._active -= 1
+            return
+
+        originals = {name: getattr(os, name) for name in COUNTED_CALLS}
+        original_open = builtins.open
+        accessor_originals = {}
+        if _PATHLIB_ACCESSOR is not None:
+            accessor_originals = {
+                name: vars(_PATHLIB_ACCESSOR)[name]
+                for name in (*COUNTED_CALLS, "open")
+                if name in vars(_PATHLIB_ACCESSOR)
+            }
+
+        def wrap(name, original):
+            def wrapper(*args, **kwargs):
+                self._count(name)
+                return original(*args, **kwargs)
+
+            return wrapper
+
+        for name, original in originals.items():
+            setattr(os, name, wrap(name, original))
+        counting_open = wrap("open", original_open)
+        builtins.open = io.open = counting_open
+        for name, original in accessor_originals.items():
+            # 访问器上的内置函数不会绑定实例，包装函数需要是 staticmethod
+            setattr(_PATHLIB_ACCESSOR, name, staticmethod(wrap(name, original)))
+        self._active = 1
+        try:
+            yield self
+        finally:
+            self._active = 0
+            for name, original in originals.items():
+                setattr(os, name, original)
+            builtins.open = io.open = original_open
+            for name, original in accessor_originals.items():
+                setattr(_PATHLIB_ACCESSOR, name, original)
+
+    def total_calls(self) -> dict:
+        """所有阶段合计的 {调用名: 次数}"""
+        totals = {}
+        for counts in self.calls.values():
+            for name, count in counts.items():
+                totals[name] = totals.get(name, 0) + count
+        return totals
+
+    def to_dict(self) -> dict:
+        """转换为可 JSON 序列化的报告"""
+        return {
+            "phases": {
+                phase: {
+                    "seconds": self.phase_times.get(phase, 0.0),
+                    "calls": dict(sorted(self.calls.get(phase, {}).items())),
+                }
+                for phase in dict.fromkeys([*self.phase_times, *self.calls])
+            },
+            "total_calls": dict(sorted(self.total_calls().items())),
+            "configs": dict(
+                sorted(self.config_times.items(), key=lambda item: -item[1])
+            ),
+            "extensions": [
+                {"config": config, "extension": ext, "seconds": seconds}
+                for (config, ext), seconds in sorted(
+                    self.extension_times.items(), key=lambda item: -item[1]
+                )
+            ],
+        }
+
+    def format_report(self, top: int = 10) -> str:
+        """生成供终端阅读的报告，列出最慢的 top 个扩展"""
+        report = self.to_dict()
+        lines = ["阶段            耗时(ms)  系统调用"]
+        for phase, entry in report["phases"].items():
+            calls = ", ".join(f"{k}={v}" for k, v in entry["calls"].items()) or "-"
+            lines.append(f"{phase:<12} {entry['seconds'] * 1000:10.1f}  {calls}")
+        totals = ", ".join(f"{k}={v}" for k, v in report["total_calls"].items())
+        lines.append(f"合计调用: {totals or '-'}")
+        if report["configs"]:
+            lines.append("\n扩展配置          扫描耗时(ms)")
+            for config, seconds in report["configs"].items():
+                lines.append(f"{config:<24} {seconds * 1000:10.1f}")
+        if report["extensions"]:
+            lines.append(f"\n扫描最慢的 {min(top, len(report['extensions']))} 个扩展:")
+            for entry in report["extensions"][:top]:
+                lines.append(
+                    f"{entry['seconds'] * 1000:10.1f}ms  "
+                    f"{entry['config']}/{entry['extension']}"
+                )
+        return "\n".join(lines)
@@ -1,6 +1,97 @@
+"""
+isaacsim_links 的日志器与日志配置
+
+导入本模块不会修改任何日志配置。命令行工具和安装钩子通过 configure_logging()
+启用输出；作为库使用时，由调用方自行配置 "isaacsim_links" 日志器。
+
+每个目录、链接的逐条消息使用 DEBUG 级别，默认的 INFO 级别只输出各阶段的摘要。
+"""
+
+import atexit
 import logging
+import logging.handlers
+import queue
+import sys
+
+LOG_FORMAT = "[%(levelname)s] %(filename)s:%(lineno)d %(message)s"
 
-logging.basicConfig(
-    level=logging.INFO, format="[%(levelname)s] %(filename)s:%(lineno)d %(message)s"
-)
 logger = logging.getLogger("isaacsim_links")
+
+_handler = None  # configure_logging 添加到日志器上的处理器
+_listener = None  # 队列模式下的后台监听线程
+_output_handler = None  # 实际写出日志的处理器
+
+
+class _StderrHandler(logging.StreamHandler):
+    """每次写出时使用当前的 sys.stderr（便于测试或调用方替换标准错误）"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """只把日志记录放入队列的处理器
+
+    队列在同一进程内，记录无需序列化，消息的格式化也交给监听线程完成。
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configure_logging(level=logging.INFO, use_queue=False, stream=None):
+    """为 isaacsim_links 日志器配置输出，可重复调用
+
+    Args:
+        level: 日志级别；命令行的 -q 对应 WARNING，-v 对应 DEBUG
+        use_queue: 为 True 时调用方只把日志记录放入队列，由后台的
+            QueueListener 线程格式化并写出，终端 I/O 不再拖慢主流程。
+            进程退出或调用 stop_logging() 时写出队列中剩余的记录。
+        stream: 输出流，默认为当前的 sys.stderr
+    """
+    global _handler, _listener, _output_handler
+    _remove_handler()
+
+    if stream is None:
+        _output_handler = _StderrHandler()
+    else:
+        _output_handler = logging.StreamHandler(stream)
+    _output_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, _output_handler)
+        _listener.start()
+        _handler = _QueueHandler(log_queue)
+    else:
+        _handler = _output_handler
+    logger.addHandler(_handler)
+    logger.setLevel(level)
+
+
+def stop_logging():
+    """停止队列模式的后台线程并写出剩余的记录，之后的日志改为直接写出"""
+    global _handler, _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    logger.removeHandler(_handler)
+    _handler = _output_handler
+    logger.addHandler(_handler)
+
+
+def _remove_handler():
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logger.removeHandler(_handler)
+        _handler = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,140 @@
+"""
+.pth 链接模式：用 site-packages 中的单个 .pth 文件代替逐个子包的符号链接
+
+生成的 isaacsim_links.pth 包含两部分：
+- 每个扩展的根目录，解释器启动时加入 sys.path，供 IDE 和解释器查找命名空间包
+- 一行 import，在解释器启动时安装 ExtensionPathFinder：site-packages 中的
+  isaacsim/omni 等是带 __init__.py 的常规包，不会自动合并其他路径中的同名目录，
+  该查找器在这些常规包被导入时，把扩展中对应的目录追加到它们的 __path__
+
+目标环境中不一定安装了 isaacsim_links (--site-packages/--envs-file)，因此本模块
+会被原样复制到 .pth 旁的 isaacsim_links_pth_hook.py，由 import 行导入该副本。
+本模块会在每次解释器启动时被导入，因此只依赖标准库，也不导入本包的其他模块。
+"""
+
+import importlib.abc
+import importlib.machinery
+import os
+import sys
+
+PTH_FILE_NAME = "isaacsim_links.pth"
+
+# 与 .pth 文件一起写入 site-packages 的查找器模块（本模块的副本）
+HOOK_MODULE_NAME = "isaacsim_links_pth_hook"
+
+_HEADER = "# 由 isaacsim-links 生成，请勿手动修改。使用 isaacsim-links --remove 删除。"
+
+
+def render_pth(pth_file, ext_dirs, namespaces) -> str:
+    """生成 .pth 文件内容
+
+    Args:
+        pth_file: .pth 文件的路径，写入 import 行供查找器读取扩展目录
+        ext_dirs: 扩展根目录列表，按优先级排列（与符号链接模式一样先到先得）
+        namespaces: 需要补充 __path__ 的顶层包名，如 ("isaacsim", "omni")
+    """
+    lines = [_HEADER]
+    lines.extend(str(ext_dir) for ext_dir in dict.fromkeys(ext_dirs))
+    lines.append(
+        f"import {HOOK_MODULE_NAME} as _isaacsim_links_pth; "
+        f"_isaacsim_links_pth.install({str(pth_file)!r}, {tuple(namespaces)!r})"
+    )
+    return "\n".join(lines) + "\n"
+
+
+def hook_file_path(pth_file) -> str:
+    """与 .pth 文件位于同一目录的查找器模块路径"""
+    return os.path.join(os.path.dirname(os.fspath(pth_file)), HOOK_MODULE_NAME + ".py")
+
+
+def render_hook() -> str:
+    """生成查找器模块的内容：本模块源码的副本"""
+    with open(__file__, "r", encoding="utf-8") as f:
+        return f"{_HEADER}\n{f.read()}"
+
+
+def _write_if_changed(path, content) -> bool:
+    """写入文件（先写临时文件再替换），内容未变化时不写入"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_file, path)
+    return True
+
+
+def write_pth_file(pth_file, ext_dirs, namespaces) -> bool:
+    """写入查找器模块和 .pth 文件，内容未变化时不写入
+
+    查找器模块先于 .pth 写入，.pth 中的 import 行不会引用不存在的模块。
+
+    Returns:
+        .pth 文件内容是否发生变化
+    """
+    _write_if_changed(hook_file_path(pth_file), render_hook())
+    return _write_if_changed(pth_file, render_pth(pth_file, ext_dirs, namespaces))
+
+
+def read_pth_entries(pth_file) -> list:
+    """读取 .pth 文件中的扩展目录（跳过注释与 import 行）"""
+    with open(pth_file, "r", encoding="utf-8") as f:
+        return [
+            line.rstrip("\r\n")
+            for line in f
+            if line.strip()
+            and not line.startswith("#")
+            and not line.startswith(("import ", "import\t"))
+        ]
+
+
+class ExtensionPathFinder(importlib.abc.MetaPathFinder):
+    """为 site-packages 中的常规包补充扩展目录的元路径查找器
+
+    查找本身交给 PathFinder 完成，这里只在找到的是常规包时扩展其
+    submodule_search_locations。扩展目录中的包以及命名空间包
+    (其 __path__ 会随父包动态更新) 保持不变。
+    """
+
+    def __init__(self, ext_dirs, namespaces):
+        self.ext_dirs = list(ext_dirs)
+        self._ext_dir_set = set(self.ext_dirs)
+        self.namespaces = frozenset(namespaces)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname.partition(".")[0] not in self.namespaces:
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+        if spec is None or not isinstance(spec.submodule_search_locations, list):
+            return spec
+
+        parts = fullname.split(".")
+        # 包目录向上 len(parts) 级即为其所在的搜索根目录
+        root = os.path.dirname(spec.origin)
+        for _ in parts:
+            root = os.path.dirname(root)
+        if root in self._ext_dir_set:
+            return spec
+
+        locations = spec.submodule_search_locations
+        for ext_dir in self.ext_dirs:
+            candidate = os.path.join(ext_dir, *parts)
+            if candidate not in locations and os.path.isdir(candidate):
+                locations.append(candidate)
+        return spec
+
+
+def install(pth_file, namespaces):
+    """在解释器启动时由 .pth 文件调用，安装 ExtensionPathFinder（只安装一次）"""
+    if any(isinstance(finder, ExtensionPathFinder) for finder in sys.meta_path):
+        return
+    try:
+        ext_dirs = read_pth_entries(pth_file)
+    except OSError:
+        return
+    sys.meta_path.insert(0, ExtensionPathFinder(ext_dirs, namespaces))
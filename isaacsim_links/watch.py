@@ -0,0 +1,222 @@
+"""
+监视扩展目录并增量保持链接同步
+
+在 Linux 上通过 ctypes 调用 inotify 监视 get_ext_configs() 中的各个扩展目录，
+其他平台或 inotify 不可用时退回为定期轮询目录的 (inode, mtime)。
+尚未创建的扩展目录 (如首次下载扩展时才出现的 extscache) 同样会被监视：
+inotify 监视其父目录，轮询则直接检查该路径。
+事件经过防抖后触发一次增量的 create_links：扫描索引保证只有新增、删除
+或发生变化的扩展会被重新扫描和链接。
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+from isaacsim_links import core
+from isaacsim_links.logger import logger
+
+# inotify 事件掩码 (见 <sys/inotify.h>)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_ONLYDIR = 0x01000000
+
+_WATCH_MASK = (
+    IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """基于 inotify 的目录监视器，只监视目录本身的直接子项变化
+
+    不存在的目录改为监视其父目录，父目录中的所有变化都会被报告，由调用方过滤。
+    """
+
+    def __init__(self, paths):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify 仅在 Linux 上可用")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._watches = {}  # watch descriptor -> 目录
+        for path in paths:
+            path = Path(path)
+            if not path.is_dir():
+                if not path.parent.is_dir():
+                    continue
+                path = path.parent
+            wd = libc.inotify_add_watch(
+                self._fd, os.fsencode(path), _WATCH_MASK | IN_ONLYDIR
+            )
+            if wd < 0:
+                errno = ctypes.get_errno()
+                os.close(self._fd)
+                raise OSError(errno, f"无法监视目录 {path}")
+            self._watches[wd] = Path(path)
+
+    def wait(self, timeout: float) -> list:
+        """等待最多 timeout 秒，返回发生变化的路径列表（超时返回空列表）"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        changed = []
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                directory = self._watches.get(wd)
+                if directory is not None:
+                    changed.append(directory / os.fsdecode(name) if name else directory)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """轮询目录 (inode, mtime) 的监视器，作为 inotify 不可用时的后备方案
+
+    扩展的新增、删除或整体替换都会改变其所在目录的 mtime；
+    不存在的目录被创建时同样会被报告。
+    """
+
+    def __init__(self, paths, interval: float = 5.0):
+        self.paths = [Path(path) for path in paths]
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+        self._next_poll = time.monotonic() + interval
+
+    def _take_snapshot(self) -> dict:
+        snapshot = {}
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                snapshot[path] = (st.st_ino, st.st_mtime_ns)
+            except OSError:
+                snapshot[path] = None
+        return snapshot
+
+    def wait(self, timeout: float) -> list:
+        """等待最多 timeout 秒，返回发生变化的目录列表（超时返回空列表）"""
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            if now >= self._next_poll:
+                self._next_poll = now + self.interval
+                snapshot = self._take_snapshot()
+                changed = [p for p in self.paths if snapshot[p] != self._snapshot[p]]
+                self._snapshot = snapshot
+                if changed:
+                    return changed
+            if now >= deadline:
+                return []
+            time.sleep(min(self._next_poll, deadline) - now)
+
+    def close(self):
+        pass
+
+
+def make_watcher(paths, poll_interval: float = 5.0):
+    """优先使用 inotify，不可用时退回为轮询"""
+    try:
+        return InotifyWatcher(paths)
+    except (OSError, AttributeError) as e:
+        logger.info(f"inotify 不可用 ({e})，改为每 {poll_interval} 秒轮询一次")
+        return PollingWatcher(paths, poll_interval)
+
+
+def watch(
+    debounce: float = 2.0,
+    poll_interval: float = 5.0,
+    stop_event: "threading.Event | None" = None,
+    **create_kwargs,
+):
+    """监视扩展目录，变化时增量更新链接，直到 stop_event 被设置或被中断
+
+    Args:
+        debounce: 最后一个事件之后等待多少秒无新事件再更新链接
+        poll_interval: 轮询模式下检查目录的间隔秒数
+        stop_event: 用于从其他线程停止监视
+        create_kwargs: 传给 create_links 的参数 (jobs、mode 等)，始终使用增量模式
+
+    Returns:
+        触发的同步次数（不含启动时的首次同步）
+    """
+    stop_event = stop_event or threading.Event()
+    create_kwargs["incremental"] = True
+
+    paths = [Path(ext_config["exts_dir"]) for ext_config in core.get_ext_configs()]
+    if not any(path.is_dir() or path.parent.is_dir() for path in paths):
+        raise RuntimeError("没有可监视的扩展目录")
+
+    def is_relevant(path: Path) -> bool:
+        # 父目录中只有扩展目录本身的创建或删除才与链接有关
+        return path in paths or path.parent in paths
+
+    # 先开始监视再做首次同步，同步期间发生的变化不会丢失
+    existing = {path for path in paths if path.is_dir()}
+    watcher = make_watcher(paths, poll_interval)
+    _sync(create_kwargs)
+    message = f"正在监视 {len(existing)} 个扩展目录"
+    if len(existing) < len(paths):
+        message += f"，以及 {len(paths) - len(existing)} 个尚未创建的扩展目录"
+    logger.info(f"{message}，按 Ctrl+C 停止...")
+
+    sync_count = 0
+    try:
+        while not stop_event.is_set():
+            changed = [path for path in watcher.wait(1.0) if is_relevant(path)]
+            if not changed:
+                continue
+            # 防抖：下载或解压扩展会产生一连串事件，等到安静下来再同步
+            while not stop_event.is_set():
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed.extend(path for path in more if is_relevant(path))
+            if stop_event.is_set():
+                break
+
+            # 扩展目录被创建或删除后，重新建立监视，使其直接子项的变化也能被发现
+            current = {path for path in paths if path.is_dir()}
+            if current != existing:
+                watcher.close()
+                watcher = make_watcher(paths, poll_interval)
+                existing = current
+
+            names = sorted({path.name for path in changed})
+            logger.info(f"检测到扩展目录变化: {', '.join(names)}，正在更新链接...")
+            _sync(create_kwargs)
+            sync_count += 1
+    except KeyboardInterrupt:
+        logger.info("停止监视")
+    finally:
+        watcher.close()
+    return sync_count
+
+
+def _sync(create_kwargs: dict):
+    """执行一次增量同步；出错时只记录错误，监视继续进行"""
+    try:
+        core.create_links(**create_kwargs)
+    except Exception as e:
+        logger.error(f"更新链接失败: {e.__class__.__name__} {e}，将在下次变化时重试")
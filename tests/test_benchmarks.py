@@ -0,0 +1,36 @@
+"""
+性能测试套件的冒烟测试：生成器与各场景在最小规模下可以正常运行
+"""
+
+import json
+
+from benchmarks.run import SCENARIOS, run_benchmarks
+from benchmarks.tree import TreeSpec, generate_tree
+
+
+def test_generated_tree_runs_all_scenarios(tmp_path):
+    """测试合成目录树的规模符合参数，且每个场景都产生可序列化的结果"""
+    spec = TreeSpec(
+        extensions=3,
+        physics_extensions=1,
+        core_extensions=1,
+        cache_extensions=2,
+        cache_versions=2,
+        depth=1,
+        fanout=2,
+        asset_dirs=2,
+        asset_files=1,
+    )
+    stats = generate_tree(tmp_path / "site-packages", spec)
+    assert stats.extension_dirs == 3 + 1 + 1 + 2 * 2
+    assert stats.packages == stats.extension_dirs * 3
+
+    results = run_benchmarks(tmp_path / "site-packages", repeat=1)
+
+    assert list(results) == list(SCENARIOS)
+    # extscache 只链接最高版本：3 + 1 + 1 + 2 个入口包
+    assert results["cold_create"]["result"] == 7
+    assert results["warm_create"]["result"] == 0
+    assert results["status"]["result"] == {"ok": 7, "drifted": False}
+    assert not (tmp_path / "site-packages" / "isaacsim" / "core").exists()
+    json.dumps(results)
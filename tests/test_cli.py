@@ -2,6 +2,7 @@
 Isaac Sim Links 命令行界面的测试
 """
 
+import json
 import sys
 import pytest
 from unittest.mock import patch, MagicMock
@@ -35,6 +36,154 @@ def test_cli_create_option(mock_create_links):
     mock_create_links.assert_called_once()
 
 
+def test_cli_create_with_jobs(mock_create_links):
+    """测试 --jobs 选项传递给创建函数"""
+    with patch.object(sys, "argv", ["isaacsim-links", "--create", "--jobs", "4"]):
+        main()
+
+    mock_create_links.assert_called_once_with(
+        jobs=4,
+        incremental=True,
+        mode="new",
+        version_policy=None,
+        discovery=None,
+        instrumentation=None,
+    )
+
+
+def test_cli_create_full_rescan(mock_create_links):
+    """测试 --full 选项关闭增量扫描"""
+    with patch.object(sys, "argv", ["isaacsim-links", "--create", "--full"]):
+        main()
+
+    mock_create_links.assert_called_once_with(
+        jobs=1,
+        incremental=False,
+        mode="new",
+        version_policy=None,
+        discovery=None,
+        instrumentation=None,
+    )
+
+
+def test_cli_create_version_policy(mock_create_links):
+    """测试 --versions 选项覆盖扩展配置中的版本策略"""
+    with patch.object(
+        sys, "argv", ["isaacsim-links", "--create", "--versions", "lowest"]
+    ):
+        main()
+
+    assert mock_create_links.call_args.kwargs["version_policy"] == "lowest"
+
+
+def test_cli_invalid_jobs(mock_create_links):
+    """测试无效的 --jobs 值"""
+    with patch.object(sys, "argv", ["isaacsim-links", "--create", "--jobs", "0"]):
+        with pytest.raises(SystemExit):
+            main()
+
+    mock_create_links.assert_not_called()
+
+
+def test_cli_plan_prints_json(capsys):
+    """测试 --plan 以 JSON 输出链接计划"""
+    from pathlib import Path
+    from isaacsim_links.core import LinkPlan, PlannedLink
+
+    plan = LinkPlan(
+        create=[
+            PlannedLink(
+                Path("/exts/isaacsim.a/isaacsim/a"),
+                Path("/site/isaacsim/a"),
+                True,
+                "isaacsim.a",
+                "isaacsim.exts",
+            )
+        ]
+    )
+    with patch("isaacsim_links.core.plan_links", return_value=plan) as mock_plan:
+        with patch.object(sys, "argv", ["isaacsim-links", "--plan"]):
+            assert main() == 0
+
+    mock_plan.assert_called_once_with(
+        jobs=1, incremental=True, version_policy=None, discovery=None
+    )
+    output = json.loads(capsys.readouterr().out)
+    assert output["create"][0]["link"] == str(Path("/site/isaacsim/a"))
+    assert output["replace"] == [] and output["conflicts"] == []
+
+
+def test_cli_status_exit_code(capsys):
+    """测试 --status 在链接漂移时返回非零"""
+    from isaacsim_links.core import LinkStatus
+
+    healthy = LinkStatus(ok=3)
+    with patch("isaacsim_links.core.check_links", return_value=healthy) as mock_check:
+        with patch.object(sys, "argv", ["isaacsim-links", "--status"]):
+            assert main() == 0
+    mock_check.assert_called_once_with(jobs=None)
+
+    drifted = LinkStatus(ok=2, dangling=["/site/isaacsim/a"])
+    with patch("isaacsim_links.core.check_links", return_value=drifted):
+        with patch.object(sys, "argv", ["isaacsim-links", "--status"]):
+            assert main() == 1
+    assert "dangling    /site/isaacsim/a" in capsys.readouterr().out
+
+
+def test_cli_create_multiple_environments(tmp_path):
+    """测试 --site-packages 与 --envs-file 合并为一次批量处理"""
+    envs_file = tmp_path / "envs.txt"
+    envs_file.write_text("# 第二个环境\nenv2/site-packages\n")
+    argv = [
+        "isaacsim-links",
+        "--create",
+        "--site-packages",
+        "/envs/env1/site-packages",
+        "--envs-file",
+        str(envs_file),
+    ]
+    with patch("isaacsim_links.core.link_environments") as mock_link:
+        mock_link.return_value = {"/envs/env1/site-packages": 3, "env2": None}
+        with patch.object(sys, "argv", argv):
+            # 任一环境失败时返回非零
+            assert main() == 1
+
+    site_packages_dirs = mock_link.call_args.args[0]
+    assert site_packages_dirs == [
+        "/envs/env1/site-packages",
+        tmp_path / "env2" / "site-packages",
+    ]
+    assert mock_link.call_args.kwargs == {
+        "jobs": 1,
+        "incremental": True,
+        "mode": "new",
+        "version_policy": None,
+        "discovery": None,
+    }
+
+
+def test_cli_plan_multiple_environments(capsys):
+    """测试多环境 --plan 输出以环境为键的 JSON"""
+    from isaacsim_links.core import LinkPlan
+
+    results = {"/envs/a": LinkPlan(), "/envs/b": LinkPlan()}
+    with patch("isaacsim_links.core.for_each_environment", return_value=results):
+        argv = [
+            "isaacsim-links",
+            "--plan",
+            "--site-packages",
+            "/envs/a",
+            "--site-packages",
+            "/envs/b",
+        ]
+        with patch.object(sys, "argv", argv):
+            assert main() == 0
+
+    output = json.loads(capsys.readouterr().out)
+    assert sorted(output) == ["/envs/a", "/envs/b"]
+    assert output["/envs/a"]["create"] == []
+
+
 def test_cli_remove_option(mock_remove_links):
     """测试 CLI 的删除链接选项"""
     # 模拟命令行参数
@@ -45,6 +194,30 @@ def test_cli_remove_option(mock_remove_links):
     mock_remove_links.assert_called_once()
 
 
+def test_cli_remove_with_jobs(mock_remove_links):
+    """测试 --jobs 选项传递给删除函数"""
+    with patch.object(sys, "argv", ["isaacsim-links", "--remove", "-j", "8"]):
+        main()
+
+    mock_remove_links.assert_called_once_with(jobs=8, instrumentation=None)
+
+
+def test_cli_stats_passes_collector(mock_remove_links, capsys):
+    """测试 --stats 把统计收集器传给操作并在结束后输出报告"""
+    from isaacsim_links.instrument import Instrumentation
+
+    with patch.object(sys, "argv", ["isaacsim-links", "--remove", "--stats"]):
+        assert main() == 0
+
+    collector = mock_remove_links.call_args.kwargs["instrumentation"]
+    assert isinstance(collector, Instrumentation)
+    assert "合计调用" in capsys.readouterr().err
+
+    with patch.object(sys, "argv", ["isaacsim-links", "--plan", "--stats"]):
+        with pytest.raises(SystemExit):
+            main()
+
+
 def test_cli_no_args():
     """测试没有提供参数时的行为"""
     # 模拟命令行参数 (没有提供选项)
@@ -61,3 +234,28 @@ def test_cli_help():
         # 应该会显示帮助信息并退出
         with pytest.raises(SystemExit):
             main()
+
+
+def test_import_and_help_do_no_path_discovery():
+    """测试导入包和 --help 不会查找 site-packages 或读取记录文件"""
+    import subprocess
+    from pathlib import Path
+
+    code = (
+        "import site, sys\n"
+        "def fail(*args, **kwargs):\n"
+        "    raise AssertionError('site-packages discovery at import time')\n"
+        "site.getsitepackages = fail\n"
+        "import isaacsim_links, isaacsim_links.core\n"
+        "from isaacsim_links.cli import main\n"
+        "sys.argv = ['isaacsim-links', '--help']\n"
+        "main()\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "--create" in result.stdout
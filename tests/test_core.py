@@ -12,13 +12,40 @@ import pytest
 import platform
 
 # 导入要测试的模块
+import isaacsim_links.core
 from isaacsim_links.core import (
     create_symlink_safely,
     is_directory_empty,
     save_record,
     load_record,
     is_admin,
+    RecordSession,
+    find_all_init_paths,
+    discover_extensions,
+    ScanIndex,
+    DiscoveryCache,
+    get_base_paths,
+    read_envs_file,
+    for_each_environment,
+    site_packages_context,
+    check_links,
+    WalkRules,
+    WalkStats,
+    PlannedLink,
+    parse_extension_name,
+    resolve_link_conflicts,
+    select_extension_versions,
+    ExtensionScan,
+    build_link_plan,
+    write_links_bulk,
+    prune_empty_directories,
+    create_links,
+    remove_links,
+    build_module_index,
+    repair_links,
+    plan_links,
 )
+from isaacsim_links.index import ModuleIndex, write_index
 
 
 @pytest.fixture
@@ -40,6 +67,63 @@ def mock_record_file(temp_directory):
     return record_file
 
 
+class ExtsEnv:
+    """测试用的 site-packages，get_ext_configs 只返回 configs 中的扩展配置"""
+
+    def __init__(self, site_packages: Path):
+        self.site_packages = site_packages
+        self.exts_dir = site_packages / "isaacsim" / "exts"
+        self.configs = [make_ext_config("test.exts", self.exts_dir)]
+
+    def add_extension(self, module: str, version=None, exts_dir=None) -> Path:
+        """创建提供子包 isaacsim.<module> 的扩展，返回子包的源目录"""
+        ext_name = f"isaacsim.{module}" + (f"-{version}" if version else "")
+        pkg = (exts_dir or self.exts_dir) / ext_name / "isaacsim"
+        pkg = pkg.joinpath(*module.split("."))
+        pkg.mkdir(parents=True)
+        (pkg / "__init__.py").touch()
+        return pkg
+
+    def link(self, module: str) -> Path:
+        """子包 isaacsim.<module> 的链接位置"""
+        return self.site_packages.joinpath("isaacsim", *module.split("."))
+
+
+def make_ext_config(name: str, exts_dir: Path) -> dict:
+    return {
+        "name": name,
+        "exts_dir": exts_dir,
+        "prefix": ["isaacsim."],
+        "description": "测试扩展",
+    }
+
+
+@pytest.fixture
+def exts_env(monkeypatch, temp_directory):
+    """创建只含空扩展目录 isaacsim/exts 的 site-packages，并替换扩展配置"""
+    env = ExtsEnv(temp_directory / "site-packages")
+    env.exts_dir.mkdir(parents=True)
+    (env.site_packages / "omni").mkdir()
+    monkeypatch.setattr(isaacsim_links.core, "get_ext_configs", lambda: env.configs)
+    return env
+
+
+@pytest.fixture
+def link_writes(monkeypatch):
+    """记录链接树上的写操作 (symlink/unlink/mkdir/rmdir)，记录文件、扫描索引等簿记文件除外"""
+    writes = []
+    for name in ("symlink", "unlink", "mkdir", "rmdir"):
+        original = getattr(os, name)
+
+        def recording(*args, _name=name, _original=original, **kwargs):
+            if not Path(args[0]).name.startswith("isaacsim_links_"):
+                writes.append(_name)
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(os, name, recording)
+    return writes
+
+
 def test_is_directory_empty(temp_directory):
     """测试目录是否为空的检查函数"""
     # 空目录
@@ -66,7 +150,6 @@ def test_save_and_load_record(monkeypatch, temp_directory, mock_record_file):
         return mock_record_file
 
     # 应用模拟
-    import isaacsim_links.core
 
     monkeypatch.setattr(
         isaacsim_links.core, "get_record_file_path", mock_get_record_file_path
@@ -75,13 +158,915 @@ def test_save_and_load_record(monkeypatch, temp_directory, mock_record_file):
     # 测试记录数据
     test_links = {"/path/to/link1", "/path/to/link2", "/path/to/link3"}
 
+    test_dirs = {"/path/to"}
+
     # 保存记录
-    save_record(test_links)
+    save_record(test_links, test_dirs)
 
     # 加载记录并验证
-    loaded_links = load_record()
+    loaded_links, loaded_dirs = load_record()
     assert loaded_links == test_links
     assert len(loaded_links) == 3
+    assert loaded_dirs == test_dirs
+
+
+def test_load_record_migrates_old_format(monkeypatch, mock_record_file):
+    """测试首次加载时自动转换旧格式 (仅链接列表) 的记录文件"""
+
+    monkeypatch.setattr(
+        isaacsim_links.core, "get_record_file_path", lambda: mock_record_file
+    )
+    with open(mock_record_file, "w") as f:
+        json.dump(["/path/to/link1", "/path/to/link2"], f)
+
+    assert load_record() == ({"/path/to/link1", "/path/to/link2"}, set())
+    with open(mock_record_file) as f:
+        assert json.load(f) == {
+            "links": ["/path/to/link1", "/path/to/link2"],
+            "directories": [],
+        }
+
+
+def test_record_session_loads_once_and_flushes_on_change(
+    monkeypatch, temp_directory, mock_record_file
+):
+    """测试记录会话只加载一次记录，并且只在有修改时写回"""
+
+    monkeypatch.setattr(
+        isaacsim_links.core, "get_record_file_path", lambda: mock_record_file
+    )
+    save_record({"/a/link"}, set())
+
+    calls = {"load": 0, "save": 0}
+    original_load = isaacsim_links.core.load_record
+    original_save = isaacsim_links.core.save_record
+
+    def counting_load(*args):
+        calls["load"] += 1
+        return original_load(*args)
+
+    def counting_save(*args):
+        calls["save"] += 1
+        return original_save(*args)
+
+    monkeypatch.setattr(isaacsim_links.core, "load_record", counting_load)
+    monkeypatch.setattr(isaacsim_links.core, "save_record", counting_save)
+
+    with RecordSession.load() as session:
+        for _ in range(100):
+            assert session.was_recorded("/a/link")
+            assert not session.has_link("/b/link")
+        session.add_link("/a/link")  # 已存在，不应标记为修改
+        assert not session.dirty
+    assert calls == {"load": 1, "save": 0}
+
+    with RecordSession.load() as session:
+        session.add_link("/b/link")
+        session.add_directory("/b")
+        assert not session.was_recorded("/b/link")
+    assert calls == {"load": 2, "save": 1}
+
+    assert original_load() == ({"/a/link", "/b/link"}, {"/b"})
+
+
+def test_record_journal_recovers_interrupted_run(monkeypatch, mock_record_file):
+    """测试运行中途被终止时，已写入记录日志的增删在下次加载时恢复"""
+
+    monkeypatch.setattr(
+        isaacsim_links.core, "get_record_file_path", lambda: mock_record_file
+    )
+    save_record({"/a/link", "/old/link"}, set())
+    journal = isaacsim_links.core.get_record_journal_path()
+
+    # 不退出会话、不 flush，模拟安装钩子被终止
+    session = RecordSession.load()
+    session.add_link("/b/link", "/src/b")
+    session.add_directory("/b")
+    session.discard_link("/old/link")
+    session._close_journal()
+    with open(mock_record_file) as f:
+        assert json.load(f)["links"] == ["/a/link", "/old/link"]
+    # 每次修改追加一行，最后一行写到一半时被终止
+    assert len(journal.read_text().splitlines()) == 3
+    with open(journal, "a") as f:
+        f.write('["add_link", "/c/li')
+
+    assert load_record(False, True) == (
+        {"/a/link", "/b/link"},
+        {"/b"},
+        {"/b/link": "/src/b"},
+    )
+    assert journal.exists()  # 只读加载不合并
+
+    assert load_record() == ({"/a/link", "/b/link"}, {"/b"})
+    assert not journal.exists()
+    with open(mock_record_file) as f:
+        assert json.load(f)["sources"] == {"/b/link": "/src/b"}
+
+
+def test_record_session_flush_compacts_journal(monkeypatch, mock_record_file):
+    """测试 flush 原子地写入快照并删除记录日志，纯内存会话不写日志"""
+
+    monkeypatch.setattr(
+        isaacsim_links.core, "get_record_file_path", lambda: mock_record_file
+    )
+    journal = isaacsim_links.core.get_record_journal_path()
+
+    session = RecordSession()
+    session.add_link("/a/link")
+    assert not journal.exists()
+
+    with RecordSession.load() as session:
+        session.add_link("/a/link")
+        assert journal.exists()
+    assert not journal.exists()
+    assert load_record() == ({"/a/link"}, set())
+    assert sorted(p.name for p in mock_record_file.parent.iterdir()) == [
+        mock_record_file.name
+    ]
+
+
+def test_record_journal_replays_replace_and_retries_failed_flush(
+    monkeypatch, mock_record_file
+):
+    """测试整体替换同样写入记录日志，写回失败时保留挂起状态并在下次 flush 重试"""
+    monkeypatch.setattr(
+        isaacsim_links.core, "get_record_file_path", lambda: mock_record_file
+    )
+    save_record({"/a/link", "/b/link"}, {"/a"}, {"/a/link": "/src/a"})
+    journal = isaacsim_links.core.get_record_journal_path()
+
+    session = RecordSession.load()
+    session.replace({"/a/link"}, set())
+    session._close_journal()
+    assert load_record(False, True) == ({"/a/link"}, set(), {"/a/link": "/src/a"})
+
+    session = RecordSession.load()
+    session.add_link("/c/link")
+    monkeypatch.setattr(isaacsim_links.core, "save_record", lambda *args: False)
+    session.flush()
+    assert session.dirty and journal.exists()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(
+        isaacsim_links.core, "get_record_file_path", lambda: mock_record_file
+    )
+    session.flush()
+    assert not session.dirty and not journal.exists()
+    assert load_record() == ({"/a/link", "/c/link"}, set())
+
+
+def test_check_links_reports_drift(monkeypatch, temp_directory, mock_record_file):
+    """测试 --status 的检查区分正常、缺失、悬空、改指向和被占用的链接"""
+
+    monkeypatch.setattr(
+        isaacsim_links.core, "get_record_file_path", lambda: mock_record_file
+    )
+    source = temp_directory / "source"
+    other = temp_directory / "other"
+    source.mkdir()
+    other.mkdir()
+    links = {
+        name: temp_directory / name
+        for name in ("ok", "gone", "dangling", "moved", "dir")
+    }
+    os.symlink(source, links["ok"])
+    os.symlink(temp_directory / "deleted", links["dangling"])
+    os.symlink(other, links["moved"])
+    links["dir"].mkdir()
+    sources = {str(link): str(source) for link in links.values()}
+    sources[str(links["dangling"])] = str(temp_directory / "deleted")
+    save_record({str(link) for link in links.values()}, set(), sources)
+
+    for jobs in (1, 3):
+        status = check_links(jobs=jobs)
+        assert status.ok == 1
+        assert status.missing == [str(links["gone"])]
+        assert status.dangling == [str(links["dangling"])]
+        assert status.retargeted == [(str(links["moved"]), str(source), str(other))]
+        assert status.foreign == [str(links["dir"])]
+        assert status.drifted
+
+    # 没有源路径的旧记录无法判断改指向，只检查链接本身
+    save_record({str(links["ok"]), str(links["moved"])}, set())
+    status = check_links()
+    assert status.ok == 2 and not status.drifted
+
+
+def test_find_all_init_paths(temp_directory):
+    """测试包扫描返回 (目录, 相对路径, 命名空间) 并在包目录处停止"""
+    ext_dir = temp_directory / "isaacsim.core.prims"
+    prims = ext_dir / "isaacsim" / "core" / "prims"
+    (prims / "impl").mkdir(parents=True)
+    (prims / "__init__.py").touch()
+    (prims / "impl" / "__init__.py").touch()
+    (ext_dir / "isaacsim" / "core" / "assets").mkdir()
+    (ext_dir / "omni" / "kit" / "widget").mkdir(parents=True)
+    (ext_dir / "omni" / "kit" / "widget" / "__init__.py").touch()
+
+    found = find_all_init_paths(ext_dir, ["isaacsim.", "omni.", "carb."])
+
+    assert found == [
+        (prims, Path("core") / "prims", "isaacsim"),
+        (ext_dir / "omni" / "kit" / "widget", Path("kit") / "widget", "omni"),
+    ]
+
+
+def test_find_all_init_paths_deep_tree(temp_directory):
+    """测试深层目录树不会触发递归深度限制"""
+    depth = 150
+    deep = temp_directory.joinpath("isaacsim", *["d"] * depth)
+    deep.mkdir(parents=True)
+    (deep / "__init__.py").touch()
+
+    old_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(100)
+    try:
+        found = find_all_init_paths(temp_directory, ["isaacsim."])
+    finally:
+        sys.setrecursionlimit(old_limit)
+
+    assert found == [(deep, Path(*["d"] * depth), "isaacsim")]
+
+
+def test_find_all_init_paths_with_walk_rules(temp_directory):
+    """测试剪枝规则、最大深度与找到首个包后停止，并统计跳过的目录数"""
+
+    ext_dir = temp_directory / "isaacsim.ext"
+    ns_dir = ext_dir / "isaacsim"
+    for package in ("a/pkg", "b/pkg", "x/y/z/deep"):
+        (ns_dir / package).mkdir(parents=True)
+        (ns_dir / package / "__init__.py").touch()
+    for junk in ("__pycache__", ".git/objects", "data/meshes", "a/docs"):
+        (ns_dir / junk).mkdir(parents=True)
+
+    stats = WalkStats()
+    found = find_all_init_paths(ext_dir, ["isaacsim."], WalkRules(), stats)
+    assert [rel.as_posix() for _, rel, _ in found] == ["a/pkg", "b/pkg", "x/y/z/deep"]
+    assert stats.skipped == 0
+
+    rules = WalkRules(prune=("__pycache__", ".*", "data", "docs"), max_depth=2)
+    stats = WalkStats()
+    found = find_all_init_paths(ext_dir, ["isaacsim."], rules, stats)
+    assert [rel.as_posix() for _, rel, _ in found] == ["a/pkg", "b/pkg"]
+    assert (stats.pruned, stats.depth_limited) == (4, 1)
+
+    rules = rules._replace(stop_at_first_package=True)
+    stats = WalkStats()
+    found = find_all_init_paths(ext_dir, ["isaacsim."], rules, stats)
+    assert [rel.as_posix() for _, rel, _ in found] == ["a/pkg"]
+    assert stats.stopped == 2  # 尚未进入的 b 与 x
+
+
+def test_walk_rules_do_not_prune_packages(temp_directory):
+    """测试名称匹配剪枝规则的目录本身是包时仍会被找到"""
+
+    ext_dir = temp_directory / "omni.physx.tests"
+    for package in ("physx/tests", "asset/data"):
+        (ext_dir / "omni" / package).mkdir(parents=True)
+        (ext_dir / "omni" / package / "__init__.py").touch()
+    (ext_dir / "omni" / "asset" / "docs").mkdir()
+
+    stats = WalkStats()
+    found = find_all_init_paths(
+        ext_dir, ["omni."], WalkRules.from_config({}), stats
+    )
+    assert [rel.as_posix() for _, rel, _ in found] == ["asset/data", "physx/tests"]
+    assert stats.pruned == 1
+
+
+def test_discover_extensions_parallel_is_deterministic(temp_directory):
+    """测试并行发现阶段的结果与串行一致且顺序确定"""
+    exts_dir = temp_directory / "exts"
+    for i in range(20):
+        pkg = exts_dir / f"isaacsim.ext{i:02d}" / "isaacsim" / f"pkg{i:02d}"
+        pkg.mkdir(parents=True)
+        (pkg / "__init__.py").touch()
+    (exts_dir / "not_a_dir.txt").touch()
+    ext_configs = [
+        {
+            "name": "test.exts",
+            "exts_dir": exts_dir,
+            "prefix": ["isaacsim."],
+            "description": "测试扩展",
+        },
+        {
+            "name": "test.missing",
+            "exts_dir": temp_directory / "missing",
+            "prefix": ["isaacsim."],
+            "description": "不存在的扩展目录",
+        },
+    ]
+
+    serial = discover_extensions(ext_configs, jobs=1)
+    parallel = discover_extensions(ext_configs, jobs=8)
+
+    assert serial == parallel
+    assert [scan.ext_dir.name for scan in parallel] == [
+        f"isaacsim.ext{i:02d}" for i in range(20)
+    ]
+    assert all(len(scan.packages) == 1 for scan in parallel)
+
+
+def test_discover_extensions_with_scan_index(monkeypatch, temp_directory):
+    """测试扫描索引：只重新扫描指纹变化的扩展，并报告被删除扩展的旧子包"""
+
+    monkeypatch.setattr(
+        isaacsim_links.core,
+        "get_scan_index_path",
+        lambda: temp_directory / "scan_index.json",
+    )
+    exts_dir = temp_directory / "exts"
+    for name in ("a", "b", "c"):
+        pkg = exts_dir / f"isaacsim.{name}" / "isaacsim" / name
+        pkg.mkdir(parents=True)
+        (pkg / "__init__.py").touch()
+    ext_configs = [
+        {
+            "name": "test.exts",
+            "exts_dir": exts_dir,
+            "prefix": ["isaacsim."],
+            "description": "测试扩展",
+        }
+    ]
+
+    index = ScanIndex.load()
+    first = discover_extensions(ext_configs, index=index)
+    assert all(scan.rescanned for scan in first)
+    index.save()
+
+    # 无变化时全部命中索引
+    index = ScanIndex.load()
+    second = discover_extensions(ext_configs, index=index)
+    assert not any(scan.rescanned for scan in second)
+    assert [scan.packages for scan in second] == [scan.packages for scan in first]
+    assert not index.dirty
+
+    # 替换一个扩展、删除一个扩展
+    shutil.rmtree(exts_dir / "isaacsim.b")
+    new_pkg = exts_dir / "isaacsim.b" / "isaacsim" / "b2"
+    new_pkg.mkdir(parents=True)
+    (new_pkg / "__init__.py").touch()
+    shutil.rmtree(exts_dir / "isaacsim.c")
+
+    index = ScanIndex.load()
+    third = discover_extensions(ext_configs, index=index)
+    assert {scan.ext_dir.name: scan.rescanned for scan in third} == {
+        "isaacsim.a": False,
+        "isaacsim.b": True,
+    }
+    assert sorted(rel.as_posix() for _, rel, _ in index.stale_packages) == ["b", "c"]
+
+
+def test_site_packages_context_overrides_base_paths(temp_directory):
+    """测试 site_packages_context 只在上下文中替换 site-packages"""
+    default = get_base_paths()["site_packages"]
+    with site_packages_context(temp_directory):
+        paths = get_base_paths()
+        assert paths["site_packages"] == temp_directory
+        assert paths["isaacsim_site_packages"] == temp_directory / "isaacsim"
+    assert get_base_paths()["site_packages"] == default
+
+
+def test_site_packages_context_makes_path_absolute(monkeypatch, temp_directory):
+    """测试相对的 site-packages 路径会转换为绝对路径"""
+    monkeypatch.chdir(temp_directory)
+    with site_packages_context(Path("relenv") / "sp"):
+        paths = get_base_paths()
+        assert paths["site_packages"] == temp_directory / "relenv" / "sp"
+        assert paths["omni_site_packages"].is_absolute()
+
+
+def test_discovery_cache_scans_shared_install_once(monkeypatch, temp_directory):
+    """测试指向同一安装的多个环境只扫描一次，结果映射回各自的路径"""
+
+    real_exts = temp_directory / "install" / "exts"
+    for i in range(4):
+        pkg = real_exts / f"isaacsim.ext{i}" / "isaacsim" / f"pkg{i}"
+        pkg.mkdir(parents=True)
+        (pkg / "__init__.py").touch()
+    env_exts = []
+    for env in ("env1", "env2"):
+        env_dir = temp_directory / env
+        env_dir.mkdir()
+        try:
+            (env_dir / "exts").symlink_to(real_exts, target_is_directory=True)
+        except OSError:
+            pytest.skip("当前环境无法创建符号链接")
+        env_exts.append(env_dir / "exts")
+
+    calls = []
+    original = isaacsim_links.core.find_all_init_paths
+
+    def counting_find(ext_dir, prefixes, *args):
+        calls.append(os.path.realpath(ext_dir))
+        return original(ext_dir, prefixes, *args)
+
+    monkeypatch.setattr(isaacsim_links.core, "find_all_init_paths", counting_find)
+    cache = DiscoveryCache()
+    results = [
+        discover_extensions(
+            [
+                {
+                    "name": "test.exts",
+                    "exts_dir": exts_dir,
+                    "prefix": ["isaacsim."],
+                    "description": "测试扩展",
+                }
+            ],
+            jobs=4,
+            cache=cache,
+        )
+        for exts_dir in env_exts
+    ]
+
+    assert sorted(calls) == sorted(set(calls)) and len(calls) == 4
+    for exts_dir, discovered in zip(env_exts, results):
+        for scan in discovered:
+            assert all(
+                code_path.is_relative_to(exts_dir) for code_path, _, _ in scan.packages
+            )
+    assert [[s.packages[0][1] for s in r] for r in results] == [
+        [Path(f"pkg{i}") for i in range(4)]
+    ] * 2
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_for_each_environment_skips_same_directory(temp_directory, caplog):
+    """测试解析后是同一目录的环境只处理一次"""
+    real = temp_directory / "venv" / "site-packages"
+    real.mkdir(parents=True)
+    alias = temp_directory / "venv-link"
+    alias.symlink_to(temp_directory / "venv")
+    other = temp_directory / "other"
+    other.mkdir()
+
+    seen = []
+    results = for_each_environment(
+        [real, alias / "site-packages", other, real],
+        lambda: seen.append(get_base_paths()["site_packages"]) or len(seen),
+    )
+
+    assert sorted(seen) == sorted([real, other])
+    assert list(results) == [str(real), str(other)]
+    assert "是同一目录" in caplog.text
+
+
+def test_read_envs_file(temp_directory):
+    """测试环境列表文件：忽略注释和空行，相对路径相对于文件所在目录"""
+    envs_file = temp_directory / "envs.txt"
+    envs_file.write_text(
+        "# Isaac Sim 环境\n"
+        "/opt/envs/a/lib/python3.10/site-packages\n"
+        "\n"
+        "envs/b/site-packages  # 相对路径\n"
+    )
+
+    assert read_envs_file(envs_file) == [
+        Path("/opt/envs/a/lib/python3.10/site-packages"),
+        temp_directory / "envs" / "b" / "site-packages",
+    ]
+
+
+def test_resolve_link_conflicts_prefers_highest_version_and_outer_link():
+    """测试冲突解析：同名扩展保留最高版本，其余按发现顺序，内层链接让位于外层链接"""
+
+    assert parse_extension_name("isaacsim.foo-1.10.0") == ("isaacsim.foo", (1, 10, 0))
+    assert parse_extension_name("omni.kit.bar-105.1.2+lx64") == (
+        "omni.kit.bar",
+        (105, 1, 2),
+    )
+    assert parse_extension_name("isaacsim.core.api") == ("isaacsim.core.api", ())
+    assert parse_extension_name("omni.foo-2d-1.0.0") == ("omni.foo-2d", (1, 0, 0))
+    assert parse_extension_name("omni.foo-2d") == ("omni.foo-2d", ())
+    assert parse_extension_name("omni.foo-1.2.0-rc1") == ("omni.foo", (1, 2, 0))
+
+    def planned(link, extension):
+        return PlannedLink(
+            Path("/exts", extension, link), Path("/site", link), True, extension, "c"
+        )
+
+    candidates = [
+        planned("isaacsim/foo", "isaacsim.foo-1.9.0"),
+        planned("isaacsim/foo", "isaacsim.foo-1.10.0"),
+        planned("isaacsim/foo", "isaacsim.foo-1.2.0"),
+        # exts 中不带版本的目录先于 extscache 中的副本发现，不按版本比较
+        planned("isaacsim/bar", "isaacsim.bar"),
+        planned("isaacsim/bar", "isaacsim.bar-2.0.0"),
+        planned("isaacsim/baz", "isaacsim.baz-1.0.0"),
+        planned("isaacsim/baz", "isaacsim.qux-9.0.0"),
+        planned("isaacsim/core", "isaacsim.core-1.0.0"),
+        planned("isaacsim/core/prims", "isaacsim.core.prims"),
+        planned("isaacsim/core/utils/types", "isaacsim.core.utils"),
+        planned("isaacsim/core_api", "isaacsim.core_api"),
+    ]
+    kept, conflicts = resolve_link_conflicts(candidates)
+
+    assert [(e.link.as_posix(), e.extension) for e in kept] == [
+        ("/site/isaacsim/foo", "isaacsim.foo-1.10.0"),
+        ("/site/isaacsim/bar", "isaacsim.bar"),
+        ("/site/isaacsim/baz", "isaacsim.baz-1.0.0"),
+        ("/site/isaacsim/core", "isaacsim.core-1.0.0"),
+        ("/site/isaacsim/core_api", "isaacsim.core_api"),
+    ]
+    assert sorted((c.link.as_posix(), c.extension) for c in conflicts) == [
+        ("/site/isaacsim/bar", "isaacsim.bar-2.0.0"),
+        ("/site/isaacsim/baz", "isaacsim.qux-9.0.0"),
+        ("/site/isaacsim/core/prims", "isaacsim.core.prims"),
+        ("/site/isaacsim/core/utils/types", "isaacsim.core.utils"),
+        ("/site/isaacsim/foo", "isaacsim.foo-1.2.0"),
+        ("/site/isaacsim/foo", "isaacsim.foo-1.9.0"),
+    ]
+
+
+def test_discover_extensions_selects_one_version(temp_directory):
+    """测试版本去重：每个扩展只扫描按策略选出的一个版本"""
+
+    exts_dir = temp_directory / "extscache"
+    for name in (
+        "isaacsim.bar",
+        "isaacsim.foo-1.2.0",
+        "isaacsim.foo-1.10.0",
+        "isaacsim.foo-1.3.1",
+    ):
+        pkg = exts_dir / name / "isaacsim" / name.split("-")[0].split(".")[1]
+        pkg.mkdir(parents=True)
+        (pkg / "__init__.py").touch()
+    ext_dirs = sorted(exts_dir.iterdir())
+
+    def names(policy):
+        return [d.name for d in select_extension_versions(ext_dirs, policy)]
+
+    assert names("highest") == ["isaacsim.bar", "isaacsim.foo-1.10.0"]
+    assert names("lowest") == ["isaacsim.bar", "isaacsim.foo-1.2.0"]
+    assert names("all") == [d.name for d in ext_dirs]
+    with pytest.raises(ValueError):
+        select_extension_versions(ext_dirs, "newest")
+
+    ext_config = {
+        "name": "test.extscache",
+        "exts_dir": exts_dir,
+        "prefix": ["isaacsim."],
+        "description": "测试扩展缓存",
+        "versions": "highest",
+    }
+    discovered = discover_extensions([ext_config])
+    assert [scan.ext_dir.name for scan in discovered] == names("highest")
+    # 显式指定的策略覆盖配置
+    discovered = discover_extensions([ext_config], version_policy="all")
+    assert len(discovered) == 4
+
+
+def test_discover_extensions_from_manifests(monkeypatch, temp_directory):
+    """测试清单模式：按 extension.toml 发现子包，没有可用清单的扩展回退到目录遍历"""
+
+    if isaacsim_links.core.tomllib is None:
+        pytest.skip("需要 tomllib 或 tomli")
+    exts_dir = temp_directory / "exts"
+
+    def make_ext(name, packages, manifest=None):
+        ext_dir = exts_dir / name
+        for package in packages:
+            pkg = ext_dir / Path(*package.split("."))
+            pkg.mkdir(parents=True)
+            (pkg / "__init__.py").touch()
+        if manifest is not None:
+            (ext_dir / "config").mkdir(parents=True)
+            (ext_dir / "config" / "extension.toml").write_text(manifest)
+        return ext_dir
+
+    manifest_ext = make_ext(
+        "isaacsim.a",
+        ["isaacsim.a.core", "isaacsim.a.core.impl"],
+        '[package]\nversion = "1.0.0"\n\n'
+        '[[python.module]]\nname = "isaacsim.a.core"\n\n'
+        '[[python.module]]\nname = "isaacsim.a.core.impl"\n\n'
+        '[[python.module]]\nname = "omni.not.in.prefix"\n',
+    )
+    # 清单模式下不会进入的大目录
+    for i in range(5):
+        (manifest_ext / "data" / f"d{i}").mkdir(parents=True)
+    make_ext("isaacsim.b", ["isaacsim.b"])  # 没有清单
+    make_ext(
+        "isaacsim.c",
+        ["isaacsim.c"],
+        '[[python.module]]\nname = "isaacsim.c.missing"\n',  # 清单与目录不一致
+    )
+
+    walked = []
+    original = isaacsim_links.core.find_all_init_paths
+
+    def counting_find(ext_dir, prefixes, *args):
+        walked.append(ext_dir.name)
+        return original(ext_dir, prefixes, *args)
+
+    monkeypatch.setattr(isaacsim_links.core, "find_all_init_paths", counting_find)
+    ext_config = {
+        "name": "test.exts",
+        "exts_dir": exts_dir,
+        "prefix": ["isaacsim."],
+        "description": "测试扩展",
+    }
+    discovered = discover_extensions([ext_config], jobs=4, discovery="manifest")
+
+    assert sorted(walked) == ["isaacsim.b", "isaacsim.c"]
+    assert {
+        scan.ext_dir.name: [(rel.as_posix(), ns) for _, rel, ns in scan.packages]
+        for scan in discovered
+    } == {
+        "isaacsim.a": [("a/core", "isaacsim")],
+        "isaacsim.b": [("b", "isaacsim")],
+        "isaacsim.c": [("c", "isaacsim")],
+    }
+    assert discovered[0].packages[0][0] == manifest_ext / "isaacsim" / "a" / "core"
+
+
+def test_build_link_plan_does_not_touch_filesystem(monkeypatch, temp_directory):
+    """测试计划阶段区分新建、替换、冲突和需要新建的目录，且不修改文件系统"""
+
+    target = temp_directory / "site" / "isaacsim"
+    target.mkdir(parents=True)
+    monkeypatch.setattr(isaacsim_links.core, "get_target_base", lambda ns: target)
+
+    src = temp_directory / "src"
+    (src / "a").mkdir(parents=True)
+    (target / "recorded").symlink_to(src / "a")
+    (target / "foreign").mkdir()
+
+    def scan(name, *rel_paths):
+        packages = [(src / name, Path(rel), "isaacsim") for rel in rel_paths]
+        config = {"name": "test.exts"}
+        return ExtensionScan(config, temp_directory / name, packages, True)
+
+    session = RecordSession(links={str(target / "recorded")})
+    discovered = [
+        scan("ext1", "core/prims", "recorded", "foreign"),
+        scan("ext2", "core/prims"),
+    ]
+    before = sorted(p.name for p in target.iterdir())
+
+    plan = build_link_plan(discovered, session)
+
+    assert sorted(p.name for p in target.iterdir()) == before
+    assert [e.link for e in plan.create] == [target / "core" / "prims"]
+    assert [e.link for e in plan.replace] == [target / "recorded"]
+    assert plan.directories == [target / "core"]
+    assert sorted((c.link.name, c.extension) for c in plan.conflicts) == [
+        ("foreign", "ext1"),
+        ("prims", "ext2"),
+    ]
+    assert json.loads(json.dumps(plan.to_dict()))["directories"] == [
+        str(target / "core")
+    ]
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_nested_link_is_kept_when_outer_link_is_blocked(exts_env):
+    """测试外层链接位置已被真实目录占用时，其内的链接仍会被创建"""
+    exts_env.add_extension("core")
+    prims = exts_env.add_extension("core.prims")
+    real_core = exts_env.link("core")
+    real_core.mkdir()
+    (real_core / "__init__.py").touch()
+
+    with site_packages_context(exts_env.site_packages):
+        plan = plan_links()
+        assert [e.link for e in plan.create] == [exts_env.link("core.prims")]
+        assert [(c.link, c.reason) for c in plan.conflicts] == [
+            (real_core, "链接目标位置已存在")
+        ]
+        assert create_links() == 1
+    assert os.readlink(exts_env.link("core.prims")) == str(prims)
+    assert not real_core.is_symlink()
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_repair_links_fixes_only_drifted_links(exts_env, link_writes):
+    """测试修复模式只修复有偏差的链接，健康的安装不做任何写操作"""
+    sources = {name: exts_env.add_extension(name) for name in ("a", "b", "c")}
+    links = {name: exts_env.link(name) for name in sources}
+    with site_packages_context(exts_env.site_packages):
+        create_links()
+        record_mtime = os.stat(isaacsim_links.core.get_record_file_path()).st_mtime_ns
+
+        link_writes.clear()
+        assert repair_links() == 0
+        assert link_writes == []
+        assert (
+            os.stat(isaacsim_links.core.get_record_file_path()).st_mtime_ns
+            == record_mtime
+        )
+
+        # 制造偏差：删除一个链接，改指向一个链接，记录一个不再需要的链接
+        os.unlink(links["a"])
+        os.unlink(links["b"])
+        os.symlink(sources["c"], links["b"])
+        stale = exts_env.link("stale")
+        os.symlink(exts_env.exts_dir, stale)
+        with RecordSession.load() as session:
+            session.add_link(stale, exts_env.exts_dir)
+
+        link_writes.clear()
+        assert repair_links() == 2
+        assert sorted(link_writes) == ["symlink", "symlink", "unlink", "unlink"]
+        assert not stale.exists()
+        for name, link in links.items():
+            assert os.readlink(link) == str(sources[name])
+        assert check_links().drifted is False
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_repair_keeps_record_of_replaced_stale_link(exts_env):
+    """测试已被真实目录替换的过期链接保留在原处，也保留在记录中"""
+    exts_env.add_extension("a")
+    stale = exts_env.link("stale")
+    with site_packages_context(exts_env.site_packages):
+        create_links()
+        with RecordSession.load() as session:
+            session.add_link(stale, exts_env.exts_dir)
+        stale.mkdir()
+
+        assert repair_links() == 0
+        assert stale.is_dir() and not stale.is_symlink()
+        assert str(stale) in load_record()[0]
+        assert check_links().foreign == [str(stale)]
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_incremental_create_keeps_directory_of_renamed_extension(exts_env):
+    """测试扩展改名后，过期链接清理不会删除新链接所在的目录"""
+    exts_env.add_extension("grp.a")
+    with site_packages_context(exts_env.site_packages):
+        assert create_links() == 1
+        shutil.rmtree(exts_env.exts_dir / "isaacsim.grp.a")
+        source_b = exts_env.add_extension("grp.b")
+
+        assert create_links() == 1
+        assert not exts_env.link("grp.a").is_symlink()
+        assert os.readlink(exts_env.link("grp.b")) == str(source_b)
+        assert check_links().drifted is False
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_incremental_create_removes_links_of_deleted_exts_dir(exts_env):
+    """测试整个扩展目录被删除后，增量创建会清理其扩展留下的链接"""
+    physics_dir = exts_env.site_packages / "isaacsim" / "extsPhysics"
+    exts_env.configs.append(make_ext_config("test.extsPhysics", physics_dir))
+    exts_env.add_extension("a")
+    exts_env.add_extension("physics.a", exts_dir=physics_dir)
+
+    with site_packages_context(exts_env.site_packages):
+        assert create_links() == 2
+        shutil.rmtree(physics_dir)
+        assert create_links() == 0
+        assert not os.path.lexists(exts_env.link("physics.a"))
+        assert exts_env.link("a").is_symlink()
+        assert check_links().drifted is False
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_rescan_fills_in_missing_sources(exts_env):
+    """测试旧记录中缺少的源路径在重新扫描或修复时补全，之后能发现被改指向的链接"""
+    sources = {name: exts_env.add_extension(name) for name in ("a", "b")}
+
+    def drop_sources():
+        record_file = isaacsim_links.core.get_record_file_path()
+        with open(record_file) as f:
+            record = json.load(f)
+        del record["sources"]
+        with open(record_file, "w") as f:
+            json.dump(record, f)
+
+    link_a = exts_env.link("a")
+    with site_packages_context(exts_env.site_packages):
+        assert create_links() == 2
+        for refresh in (lambda: create_links(incremental=False), repair_links):
+            drop_sources()
+            assert refresh() == 0
+            assert load_record(False, True)[2] == {
+                str(exts_env.link(name)): str(source)
+                for name, source in sources.items()
+            }
+
+        os.unlink(link_a)
+        os.symlink(sources["b"], link_a)
+        assert [entry[0] for entry in check_links().retargeted] == [str(link_a)]
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_full_rescan_keeps_matching_links(exts_env, link_writes):
+    """测试完整重新扫描时，已指向正确源的链接计入 unchanged，不重建链接也不改写记录"""
+    for name in ("a", "b"):
+        exts_env.add_extension(name)
+
+    with site_packages_context(exts_env.site_packages):
+        assert create_links() == 2
+        record = isaacsim_links.core.get_record_file_path()
+        record_mtime = os.stat(record).st_mtime_ns
+
+        plan = plan_links(incremental=False)
+        assert plan.is_empty() and plan.unchanged == 2
+
+        link_writes.clear()
+        assert create_links(incremental=False) == 0
+        assert link_writes == []
+        assert os.stat(record).st_mtime_ns == record_mtime
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_write_links_bulk_creates_each_parent_once(monkeypatch, temp_directory):
+    """测试批量写入只创建一次每个缺失的父目录，并记录目录和链接"""
+
+    src = temp_directory / "src"
+    src.mkdir()
+    target = temp_directory / "target"
+    target.mkdir()
+    rel_paths = ["core/prims", "core/api", "core/utils/types", "physics"]
+    links = [
+        PlannedLink(src, target / rel, True, "ext", "test.exts") for rel in rel_paths
+    ]
+
+    mkdir_calls = []
+    original_mkdir = os.mkdir
+
+    def counting_mkdir(path, *args, **kwargs):
+        mkdir_calls.append(Path(path))
+        return original_mkdir(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "mkdir", counting_mkdir)
+
+    session = RecordSession()
+    assert write_links_bulk(links, session) == 4
+
+    expected_dirs = [target / "core", target / "core" / "utils"]
+    assert mkdir_calls == expected_dirs
+    assert session.directories == {str(d) for d in expected_dirs}
+    assert session.links == {str(target / rel) for rel in rel_paths}
+    assert all((target / rel).is_symlink() for rel in rel_paths)
+
+
+def test_prune_empty_directories_lists_each_directory_once(
+    monkeypatch, temp_directory
+):
+    """测试自底向上清理：每个目录最多列举一次，非空目录及其祖先被保留"""
+
+    root = temp_directory / "isaacsim"
+    parents = []
+    for i in range(5):
+        parent = root / "core" / f"pkg{i}"
+        parent.mkdir(parents=True)
+        parents.append(parent)
+    (root / "keep" / "sub").mkdir(parents=True)
+    (root / "keep" / "file.py").touch()
+    parents.append(root / "keep" / "sub")
+
+    listed = []
+    original_scandir = os.scandir
+
+    def counting_scandir(path="."):
+        listed.append(Path(path))
+        return original_scandir(path)
+
+    with monkeypatch.context() as m:
+        m.setattr(os, "scandir", counting_scandir)
+        removed, failed = prune_empty_directories(
+            parents, [root / "core", root / "keep", root / "missing"], stop_dirs=[root]
+        )
+
+    assert len(listed) == len(set(listed))
+    assert removed == {str(p) for p in parents[:5]} | {
+        str(root / "core"),
+        str(root / "keep" / "sub"),
+    }
+    assert failed == {str(root / "keep")}
+    assert sorted(p.name for p in root.iterdir()) == ["keep"]
 
 
 def should_run_symlink_test():
@@ -107,20 +1092,162 @@ def test_create_symlink_safely(monkeypatch, temp_directory):
     with open(source_file, "w") as f:
         f.write("Test content")
 
-    # 记录创建的链接
-    links_created = set()
-
-    # 模拟记录加载函数，总是返回空集合
-    def mock_load_record():
-        return set()
-
-    # 应用模拟
-    monkeypatch.setattr("isaacsim_links.core.load_record", mock_load_record)
+    # 使用空的内存记录会话，不读写记录文件
+    session = RecordSession()
 
     # 测试创建链接
-    result = create_symlink_safely(source_file, link_path, links_created)
+    result = create_symlink_safely(source_file, link_path, session)
 
     # 验证结果
     assert result  # 应该成功创建
-    assert str(link_path) in links_created  # 应该记录链接
+    assert session.has_link(link_path)  # 应该记录链接
     assert link_path.exists() or link_path.is_symlink()  # 链接应该存在
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows" and not is_admin(),
+    reason="在Windows上需要管理员权限或开发者模式才能创建符号链接",
+)
+def test_create_symlink_safely_keeps_matching_link(monkeypatch, temp_directory):
+    """测试已指向正确源的记录链接保持不变，指向其他源的链接被替换"""
+    source = temp_directory / "source"
+    other = temp_directory / "other"
+    source.mkdir()
+    other.mkdir()
+    link_path = temp_directory / "link"
+    os.symlink(source, link_path)
+    session = RecordSession(links={str(link_path)})
+
+    unlinked = []
+    original_unlink = os.unlink
+    monkeypatch.setattr(
+        os, "unlink", lambda path, **kw: unlinked.append(path) or original_unlink(path)
+    )
+    monkeypatch.setattr(Path, "unlink", lambda self, **kw: unlinked.append(self))
+
+    assert not create_symlink_safely(source, link_path, session)
+    assert unlinked == []
+    assert session.source_of(link_path) == str(source)
+
+    monkeypatch.undo()
+    assert create_symlink_safely(other, link_path, session)
+    assert os.readlink(link_path) == str(other)
+
+
+def test_pth_mode_creates_no_symlinks(temp_directory):
+    """测试 .pth 模式只写入一个 .pth 文件，解释器通过它即可导入扩展中的子包"""
+    import subprocess
+
+    site_packages = temp_directory / "site-packages"
+    (site_packages / "omni").mkdir(parents=True)
+    (site_packages / "isaacsim").mkdir()
+    # site-packages 中的 isaacsim 是常规包，需要由查找器补充 __path__
+    (site_packages / "isaacsim" / "__init__.py").write_text("ROOT = True\n")
+    for pkg in (
+        site_packages / "isaacsim/exts/isaacsim.core.prims/isaacsim/core/prims",
+        site_packages / "omni/extscore/omni.kit.app/omni/kit/app",
+    ):
+        pkg.mkdir(parents=True)
+        (pkg / "__init__.py").touch()
+
+    with site_packages_context(site_packages):
+        assert create_links(mode="pth") == 2
+        assert create_links(mode="pth") == 0  # 内容未变化时不重写
+    pth_file = site_packages / "isaacsim_links.pth"
+    hook_file = site_packages / "isaacsim_links_pth_hook.py"
+    assert pth_file.is_file() and hook_file.is_file()
+    assert not any(
+        os.path.islink(os.path.join(dirpath, name))
+        for dirpath, dirnames, filenames in os.walk(site_packages)
+        for name in dirnames + filenames
+    )
+
+    # 目标环境中没有安装 isaacsim_links 时，.pth 使用写入的查找器模块
+    code = (
+        f"import site, sys; site.addsitedir({str(site_packages)!r})\n"
+        "import isaacsim, isaacsim.core.prims, omni.kit.app\n"
+        "assert isaacsim.ROOT\n"
+        "assert 'isaacsim_links' not in sys.modules\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-I", "-c", code],
+        cwd=temp_directory,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stderr == ""
+
+    with site_packages_context(site_packages):
+        remove_links()
+    assert not pth_file.exists() and not hook_file.exists()
+
+
+def test_index_finder_imports_without_symlinks(temp_directory):
+    """测试模块索引与 IndexFinder：按索引导入扩展子包，不修改 site-packages"""
+    import subprocess
+
+    site_packages = temp_directory / "site-packages"
+    (site_packages / "omni").mkdir(parents=True)
+    (site_packages / "isaacsim").mkdir()
+    (site_packages / "isaacsim" / "__init__.py").write_text("ROOT = True\n")
+    prims = site_packages / "isaacsim/exts/isaacsim.core.prims/isaacsim/core/prims"
+    prims.mkdir(parents=True)
+    (prims / "__init__.py").touch()
+    (prims / "xform.py").write_text("VALUE = 42\n")
+    app = site_packages / "omni/extscore/omni.kit.app/omni/kit/app"
+    app.mkdir(parents=True)
+    (app / "__init__.py").touch()
+    before = sorted(p for p in site_packages.rglob("*"))
+
+    index_path = temp_directory / "cache" / "module_index.idx"
+    with site_packages_context(site_packages):
+        build_module_index(index_path=index_path)
+    assert sorted(p for p in site_packages.rglob("*")) == before
+
+    code = (
+        "import sys\n"
+        f"sys.path.insert(0, {str(site_packages)!r})\n"
+        "import isaacsim_links.finder as finder\n"
+        f"f = finder.install({str(index_path)!r})\n"
+        "import isaacsim, isaacsim.core.prims.xform, omni.kit.app\n"
+        "assert isaacsim.ROOT and isaacsim.core.prims.xform.VALUE == 42\n"
+        "assert f.extension_of('omni.kit.app') == 'omni.kit.app'\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_module_index_binary_search(temp_directory):
+    """测试模块索引的二分查找：精确匹配、祖先判断与缺失的模块"""
+
+    modules = {
+        f"isaacsim.ext{i:03d}.pkg": (f"/exts/ext{i:03d}/isaacsim", f"ext{i:03d}")
+        for i in range(0, 300, 3)
+    }
+    modules["omni.kit.app"] = ("/exts/omni.kit.app/omni/kit/app", "omni.kit.app")
+    modules["carb"] = ("/exts/carb/carb", "carb.ext")
+    index_path = temp_directory / "module_index.idx"
+    write_index(index_path, modules)
+
+    with ModuleIndex(index_path) as index:
+        assert [name for name, _ in index] == sorted(modules)
+        for name, (source, extension) in modules.items():
+            assert index.lookup(name) == (source, extension)
+        assert index.lookup("isaacsim.ext001.pkg") is None
+        assert index.lookup("isaacsim") is None
+        assert index.lookup("zzz") is None
+        assert index.has_descendants("isaacsim")
+        assert index.has_descendants("omni.kit")
+        assert not index.has_descendants("omni.kit.app")
+        assert not index.has_descendants("isaacsim.ext001")
+        assert not index.has_descendants("omni.k")
+
+    (temp_directory / "bad.idx").write_text("not an index\n")
+    with pytest.raises(ValueError):
+        ModuleIndex(temp_directory / "bad.idx")
@@ -0,0 +1,107 @@
+"""
+计时与系统调用统计的测试
+"""
+
+import json
+import os
+
+from isaacsim_links import core
+from isaacsim_links.instrument import Instrumentation
+
+
+def test_instrumentation_counts_calls_per_phase(tmp_path):
+    """测试调用按阶段计数，退出后恢复原始函数"""
+    original_stat = os.stat
+    collector = Instrumentation()
+    with collector.activate():
+        with collector.phase("discovery"):
+            os.stat(tmp_path)
+            os.listdir(tmp_path)
+        with collector.phase("apply"):
+            os.symlink(tmp_path, tmp_path / "link")
+            with open(tmp_path / "file", "w"):
+                pass
+        os.lstat(tmp_path / "link")
+    os.stat(tmp_path)  # 退出后不再计数
+
+    assert os.stat is original_stat
+    assert collector.calls == {
+        "discovery": {"stat": 1, "listdir": 1},
+        "apply": {"symlink": 1, "open": 1},
+        "other": {"lstat": 1},
+    }
+    assert set(collector.phase_times) == {"discovery", "apply"}
+
+
+def test_instrumentation_counts_pathlib_calls(tmp_path):
+    """测试 pathlib 的文件系统操作同样被计数 (Python 3.10 经由 _NormalAccessor)"""
+    collector = Instrumentation()
+    directory = tmp_path / "dir"
+    with collector.activate():
+        directory.mkdir()
+        assert directory.exists()
+        (directory / "file").touch()
+        (directory / "file").unlink()
+        directory.rmdir()
+
+    counts = collector.calls["other"]
+    assert counts["mkdir"] == 1 and counts["rmdir"] == 1 and counts["unlink"] == 1
+    assert counts["stat"] >= 1
+
+
+def test_config_time_is_wall_time_span():
+    """测试配置耗时是其扩展扫描的墙钟跨度，并行扫描的耗时不重复累加"""
+    collector = Instrumentation()
+    collector.record_extension("exts", "a", 10.0, 12.0)
+    collector.record_extension("exts", "b", 10.5, 12.5)
+    collector.record_extension("cache", "c", 11.0, 11.5)
+
+    assert collector.config_times == {"exts": 2.5, "cache": 0.5}
+    assert collector.extension_times[("exts", "b")] == 2.0
+
+
+def test_create_and_remove_links_report(monkeypatch, tmp_path):
+    """测试 create_links/remove_links 填充各阶段与每个扩展的统计"""
+    site_packages = tmp_path / "site-packages"
+    exts_dir = site_packages / "isaacsim" / "exts"
+    (site_packages / "omni").mkdir(parents=True)
+    for name in ("a", "b"):
+        pkg = exts_dir / f"isaacsim.{name}" / "isaacsim" / name
+        pkg.mkdir(parents=True)
+        (pkg / "__init__.py").touch()
+    monkeypatch.setattr(
+        core,
+        "get_ext_configs",
+        lambda: [
+            {
+                "name": "test.exts",
+                "exts_dir": exts_dir,
+                "prefix": ["isaacsim."],
+                "description": "测试扩展",
+            }
+        ],
+    )
+
+    with core.site_packages_context(site_packages):
+        created = Instrumentation()
+        assert core.create_links(instrumentation=created) == 2
+        removed = Instrumentation()
+        core.remove_links(instrumentation=removed)
+
+    assert created.calls["apply"]["symlink"] == 2
+    assert created.calls["discovery"]["scandir"] >= 2
+    assert "open" in created.calls["record"]
+    assert set(created.extension_times) == {
+        ("test.exts", "isaacsim.a"),
+        ("test.exts", "isaacsim.b"),
+    }
+    assert list(created.config_times) == ["test.exts"]
+    assert removed.calls["apply"]["unlink"] >= 2
+    assert "prune" in removed.phase_times
+
+    report = json.loads(json.dumps(created.to_dict()))
+    assert [e["extension"] for e in report["extensions"]] == sorted(
+        (e["extension"] for e in report["extensions"]),
+        key=lambda name: -created.extension_times[("test.exts", name)],
+    )
+    assert "isaacsim.a" in created.format_report()
@@ -0,0 +1,71 @@
+"""
+日志配置的测试
+"""
+
+import io
+import logging
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from isaacsim_links import logger as logger_module
+from isaacsim_links.cli import main
+from isaacsim_links.logger import configure_logging, logger, stop_logging
+
+
+@pytest.fixture(autouse=True)
+def restore_logger():
+    yield
+    logger_module._remove_handler()
+    logger.setLevel(logging.NOTSET)
+
+
+def test_queue_logging_formats_off_the_calling_thread():
+    """测试队列模式下消息由监听线程格式化，stop_logging 后剩余记录全部写出"""
+    formatted_in = []
+
+    class Probe:
+        def __str__(self):
+            formatted_in.append(threading.current_thread())
+            return "probe"
+
+    stream = io.StringIO()
+    configure_logging(logging.DEBUG, use_queue=True, stream=stream)
+    logger.debug("创建链接: %s", Probe())
+    stop_logging()
+
+    assert "创建链接: probe" in stream.getvalue()
+    # pytest 的日志捕获会在调用线程中格式化，这里只要求写出发生在监听线程
+    assert any(t is not threading.current_thread() for t in formatted_in)
+
+    # 停止后台线程之后的日志直接写出
+    logger.info("完成")
+    assert stream.getvalue().endswith("完成\n")
+
+
+def test_debug_messages_are_not_formatted_at_info_level():
+    """测试默认级别下逐条的 DEBUG 消息不会被格式化"""
+    stream = io.StringIO()
+    configure_logging(logging.INFO, stream=stream)
+
+    class Probe:
+        def __str__(self):
+            raise AssertionError("DEBUG 消息不应被格式化")
+
+    logger.debug("找到有效路径: %s", Probe())
+    assert stream.getvalue() == ""
+
+
+@pytest.mark.parametrize(
+    "flag, level",
+    [("-q", logging.WARNING), ("-v", logging.DEBUG), (None, logging.INFO)],
+)
+def test_cli_verbosity_flags(flag, level):
+    """测试 -q/-v 选项设置日志级别"""
+    argv = ["isaacsim-links", "--remove"] + ([flag] if flag else [])
+    with patch("isaacsim_links.core.remove_links", return_value=0):
+        with patch.object(sys, "argv", argv):
+            assert main() == 0
+    assert logger.level == level
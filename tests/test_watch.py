@@ -0,0 +1,174 @@
+"""
+扩展目录监视的测试
+"""
+
+import contextvars
+import sys
+import threading
+import time
+
+import pytest
+
+from isaacsim_links import core
+from isaacsim_links.watch import InotifyWatcher, PollingWatcher, watch
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify 仅在 Linux 上可用"
+)
+def test_inotify_watcher_reports_new_extension(tmp_path):
+    """测试 inotify 监视器报告扩展目录中新增的扩展"""
+    watcher = InotifyWatcher([tmp_path])
+    try:
+        assert watcher.wait(0.05) == []
+        (tmp_path / "isaacsim.new").mkdir()
+        assert watcher.wait(1.0) == [tmp_path / "isaacsim.new"]
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify 仅在 Linux 上可用"
+)
+def test_inotify_watcher_reports_created_directory(tmp_path):
+    """测试 inotify 监视器通过父目录报告尚未创建的目录被创建"""
+    missing = tmp_path / "extscache"
+    watcher = InotifyWatcher([missing])
+    try:
+        (tmp_path / "record.json").touch()
+        missing.mkdir()
+        assert watcher.wait(1.0) == [tmp_path / "record.json", missing]
+    finally:
+        watcher.close()
+
+
+def test_polling_watcher_reports_changed_directory(tmp_path):
+    """测试轮询监视器通过目录 mtime 发现变化"""
+    watcher = PollingWatcher([tmp_path], interval=0.01)
+    assert watcher.wait(0.05) == []
+    time.sleep(0.01)  # 确保 mtime 发生变化
+    (tmp_path / "isaacsim.new").mkdir()
+    assert watcher.wait(1.0) == [tmp_path]
+
+
+def _start_watch(site_packages, stop, result):
+    with core.site_packages_context(site_packages):
+        context = contextvars.copy_context()
+    thread = threading.Thread(
+        target=lambda: result.append(
+            context.run(watch, debounce=0.05, stop_event=stop)
+        )
+    )
+    thread.start()
+    return thread
+
+
+def test_watch_links_new_extension(monkeypatch, tmp_path):
+    """测试 watch 在新增扩展后增量创建其链接"""
+    site_packages = tmp_path / "site-packages"
+    exts_dir = site_packages / "isaacsim" / "exts"
+    exts_dir.mkdir(parents=True)
+    (site_packages / "omni").mkdir()
+
+    def add_extension(name):
+        pkg = exts_dir / f"isaacsim.{name}" / "isaacsim" / name
+        pkg.mkdir(parents=True)
+        (pkg / "__init__.py").touch()
+
+    add_extension("a")
+    monkeypatch.setattr(
+        core,
+        "get_ext_configs",
+        lambda: [
+            {
+                "name": "test.exts",
+                "exts_dir": exts_dir,
+                "prefix": ["isaacsim."],
+                "description": "测试扩展",
+            }
+        ],
+    )
+    monkeypatch.setattr(
+        "isaacsim_links.watch.make_watcher",
+        lambda paths, poll_interval: PollingWatcher(paths, 0.01),
+    )
+
+    stop = threading.Event()
+    result = []
+    thread = _start_watch(site_packages, stop, result)
+    try:
+        link = site_packages / "isaacsim" / "b"
+        deadline = time.monotonic() + 5
+        while not (site_packages / "isaacsim" / "a").is_symlink():
+            assert time.monotonic() < deadline, "首次同步超时"
+            time.sleep(0.01)
+        time.sleep(0.02)
+        add_extension("b")
+        while not link.is_symlink():
+            assert time.monotonic() < deadline, "新增扩展未被链接"
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        thread.join(5)
+
+    assert result == [1]
+    assert link.resolve() == (exts_dir / "isaacsim.b" / "isaacsim" / "b").resolve()
+
+
+def test_watch_survives_sync_errors_and_late_extension_dir(monkeypatch, tmp_path):
+    """测试同步出错后继续监视，并发现启动后才创建的扩展目录"""
+    site_packages = tmp_path / "site-packages"
+    exts_dir = site_packages / "isaacsim" / "exts"
+    cache_dir = site_packages / "isaacsim" / "extscache"
+    exts_dir.mkdir(parents=True)
+    (site_packages / "omni").mkdir()
+    monkeypatch.setattr(
+        core,
+        "get_ext_configs",
+        lambda: [
+            {
+                "name": f"test.{exts.name}",
+                "exts_dir": exts,
+                "prefix": ["isaacsim."],
+                "description": "测试扩展",
+            }
+            for exts in (exts_dir, cache_dir)
+        ],
+    )
+    monkeypatch.setattr(
+        "isaacsim_links.watch.make_watcher",
+        lambda paths, poll_interval: PollingWatcher(paths, 0.01),
+    )
+    create_links = core.create_links
+    calls = []
+
+    def flaky_create_links(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            raise RuntimeError("基础路径不存在")
+        return create_links(**kwargs)
+
+    monkeypatch.setattr(core, "create_links", flaky_create_links)
+
+    stop = threading.Event()
+    result = []
+    thread = _start_watch(site_packages, stop, result)
+    try:
+        link = site_packages / "isaacsim" / "c"
+        deadline = time.monotonic() + 5
+        while not calls:
+            assert time.monotonic() < deadline, "首次同步超时"
+            time.sleep(0.01)
+        pkg = cache_dir / "isaacsim.c-1.0.0" / "isaacsim" / "c"
+        pkg.mkdir(parents=True)
+        (pkg / "__init__.py").touch()
+        while not link.is_symlink():
+            assert time.monotonic() < deadline, "新建的扩展目录未被链接"
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        thread.join(5)
+
+    assert not thread.is_alive()
+    assert result and result[0] >= 1
+    assert link.resolve() == pkg.resolve()